@@ -0,0 +1,254 @@
+from qgis.core import NULL
+import definitions as d
+
+#rule table for determining the way type of a way segment
+#
+#every rule is a pair of a condition list and a result. The rules of a list are checked in order, the first rule with all conditions matching wins.
+#A result is a way type, "delete_feature" or a nested rule list that is checked next. A rule with an empty condition list always matches.
+#
+#conditions are (key, operator, value) tuples:
+#  - key: a tag (e.g. "highway"), a side resolved tag with "*" as placeholder for the side (e.g. "cycleway:*:lane" matches "cycleway:lane", "cycleway:both:lane" and "cycleway:left:lane" or "cycleway:right:lane" depending on the "side" of the feature), "access(<mode>)" or "separation(<mode>)"
+#  - operator: "=", "!=", "in", "not in", "contains", "empty" or "not empty"
+#  - ("any", [condition, ...]) matches if one of the conditions matches
+#
+#rule tables for regional variants can be defined the same way and passed to compileRules()
+delete_feature = 'delete'
+
+bicycle_access_list = ('yes', 'permissive', 'designated', 'use_sidepath', 'optional_sidepath', 'discouraged')
+access_yes_list = ('yes', 'designated', 'permissive')
+separation_none_list = (NULL, 'no', 'none')
+separation_physical_list = ('kerb', 'tree_row')
+
+#separated cycle ways along roads: cycle track (separated by kerb or tree row) or protected cycle lane (separated by other objects)
+separated_cycle_way_rules = [
+    ([('separation(motor_vehicle)', 'not in', separation_none_list)], [
+        ([('separation(motor_vehicle)', 'contains', separation_physical_list)], 'cycle track'),
+        ([], 'cycle lane (protected)')
+    ]),
+    ([], 'cycle track')
+]
+
+way_type_rules = [
+    #exclude segments with no public bicycle access
+    ([('access(bicycle)', 'not empty', None), ('access(bicycle)', 'not in', bicycle_access_list)], delete_feature),
+    #exclude informal paths without explicit bicycle access
+    ([('highway', '=', 'path'), ('informal', '=', 'yes'), ('bicycle', '=', NULL)], delete_feature),
+
+    #before determining the way type according to highway tagging, first check for some specific way types that are tagged independend from "highway":
+    ([('any', [('footway', '=', 'crossing'), ('cycleway', '=', 'crossing'), ('path', '=', 'crossing'), ('bridleway', '=', 'crossing')])], 'crossing'),
+    ([('any', [('footway', '=', 'link'), ('cycleway', '=', 'link'), ('path', '=', 'link'), ('bridleway', '=', 'link')])], 'link'),
+    #features with a "side" attribute are representing a cycleway or footway adjacent to the road with offset geometry - treat them as separate path, not as a bicycle road
+    ([('bicycle_road', '=', 'yes'), ('side', 'empty', None)], 'bicycle road'),
+
+    #for all other cases: derive way type according to their primary "highway" tagging:
+    #for footways (with bicycle access):
+    ([('highway', 'in', ('footway', 'pedestrian', 'bridleway', 'steps'))], [
+        ([('bicycle', 'in', access_yes_list)], 'shared footway'),
+        ([], delete_feature) #don't process ways with restricted bicycle access
+    ]),
+    #for path:
+    ([('highway', '=', 'path')], [
+        ([('foot', '=', 'designated'), ('bicycle', '!=', 'designated')], 'shared footway'),
+        ([('segregated', '=', 'yes')], 'segregated path'),
+        ([], 'shared path')
+    ]),
+    #for cycleways:
+    ([('highway', '=', 'cycleway')], [
+        ([('foot', 'in', access_yes_list)], 'shared path'),
+        ([('separation(foot)', '=', 'no')], 'segregated path'),
+        #use the geometrically determined sidepath value, if is_sidepath isn't specified
+        ([('is_sidepath', 'not in', ('yes', 'no'))], [
+            ([('proc_sidepath', '=', 'yes')], 'cycle track'),
+            ([], 'cycle path')
+        ]),
+        ([('is_sidepath', '=', 'yes')], separated_cycle_way_rules),
+        ([], 'cycle path')
+    ]),
+    #for service roads/tracks:
+    ([('highway', 'in', ('service', 'track'))], 'track or service'),
+
+    #for regular roads:
+    #if this feature don't represent a cycle lane, it's a center line representing the shared road
+    #distinguish shared roads (without lane markings) and shared traffic lanes (with lane markings)
+    #(assume that there are lane markings on primary and secondary roads, even if not tagged explicitely)
+    ([('side', 'empty', None)], [
+        ([('any', [('lane_markings', '=', 'yes'), ('highway', 'in', ('motorway', 'trunk', 'primary', 'secondary'))])], 'shared traffic lane'),
+        ([], 'shared road')
+    ]),
+    ([('type', '=', 'sidewalk')], 'shared footway'),
+    #for cycle lanes
+    ([('cycleway:*', '=', 'lane')], [
+        ([('cycleway:lanes', 'contains', ('no|lane|no',))], 'cycle lane (central)'),
+        ([('separation(motor_vehicle)', 'not in', separation_none_list)], 'cycle lane (protected)'),
+        ([('cycleway:*:lane', '=', 'exclusive')], 'cycle lane (exclusive)'),
+        ([], 'cycle lane (advisory)')
+    ]),
+    #for cycle tracks
+    ([('cycleway:*', '=', 'track')], [
+        ([('cycleway:*:foot', 'in', access_yes_list)], 'shared path'),
+        ([('cycleway:*:segregated', '=', 'yes')], 'segregated path'),
+        ([('cycleway:*:segregated', '=', 'no')], 'shared path'),
+        ([('separation(foot)', '=', 'no')], 'segregated path'),
+        ([], separated_cycle_way_rules)
+    ]),
+    #for shared bus lanes
+    ([('cycleway:*', '=', 'share_busway')], 'shared bus lane'),
+    #for other vales - no cycle way
+    ([('sidewalk:*:bicycle', '=', 'yes')], 'shared footway'),
+    ([('any', [('lane_markings', '=', 'yes'), ('highway', 'in', ('primary', 'secondary'))])], 'shared traffic lane'),
+    ([], 'shared road')
+]
+
+
+
+#get the value of a tag or derived attribute of a feature - every value is read only once per feature and stored in "tags"
+def getTagValue(feature, tags, key):
+    if key in tags:
+        return(tags[key])
+    if key.startswith('access('):
+        value = d.getAccess(feature, key[7:-1])
+    elif key.startswith('separation('):
+        value = d.deriveSeparation(feature, key[11:-1])
+    elif '*' in key:
+        #side resolved tags: list of the values for the whole way, for both sides and for the side of the feature
+        value = [getTagValue(feature, tags, key.replace(':*', '')), getTagValue(feature, tags, key.replace('*', 'both'))]
+        side = getTagValue(feature, tags, 'side')
+        if side in ('left', 'right'):
+            value.append(getTagValue(feature, tags, key.replace('*', side)))
+    else:
+        value = feature.attribute(key)
+    tags[key] = value
+    return(value)
+
+
+
+#compile a condition into a function of a single value
+def compileOperator(operator, reference):
+    if operator == '=':
+        return(lambda value: value == reference)
+    if operator == '!=':
+        return(lambda value: value != reference)
+    if operator == 'in':
+        return(lambda value: value in reference)
+    if operator == 'not in':
+        return(lambda value: value not in reference)
+    if operator == 'contains':
+        return(lambda value: bool(value) and any(part in value for part in reference))
+    if operator == 'empty':
+        return(lambda value: not value)
+    if operator == 'not empty':
+        return(lambda value: bool(value))
+    raise ValueError('Unknown operator "' + str(operator) + '" in way type rules')
+
+
+
+#compile a condition into a function of a feature and its tag cache
+def compileCondition(condition):
+    if condition[0] == 'any':
+        tests = [compileCondition(sub_condition) for sub_condition in condition[1]]
+        return(lambda feature, tags: any(test(feature, tags) for test in tests))
+    key, operator, reference = condition
+    match = compileOperator(operator, reference)
+    if '*' in key and not key.startswith(('access(', 'separation(')):
+        #a side resolved tag matches if one of its values matches
+        return(lambda feature, tags: any(match(value) for value in getTagValue(feature, tags, key)))
+    return(lambda feature, tags: match(getTagValue(feature, tags, key)))
+
+
+
+#compile a list of conditions into a function that checks all of them
+def compileConditions(conditions):
+    tests = [compileCondition(condition) for condition in conditions]
+    if not tests:
+        return(lambda feature, tags: True)
+    if len(tests) == 1:
+        return(tests[0])
+    return(lambda feature, tags: all(test(feature, tags) for test in tests))
+
+
+
+#readable description of a condition (for rule statistics)
+def getConditionLabel(condition):
+    if condition[0] == 'any':
+        return('(' + ' or '.join(getConditionLabel(sub_condition) for sub_condition in condition[1]) + ')')
+    key, operator, reference = condition
+    if operator in ('empty', 'not empty'):
+        return(key + ' ' + operator)
+    if type(reference) == tuple:
+        reference = '|'.join(str(value) for value in reference)
+    return(key + ' ' + operator + ' ' + str(reference))
+
+
+
+#get the tag key of a rule, if it only checks one plain tag against one or more values - such rules can be looked up in a dictionary
+def getSwitchKey(conditions):
+    if len(conditions) != 1 or conditions[0][0] == 'any':
+        return(None)
+    key, operator, reference = conditions[0]
+    if operator not in ('=', 'in') or '*' in key or '(' in key:
+        return(None)
+    return(key)
+
+
+
+#compile a rule list: consecutive rules that check the same plain tag are combined to a dictionary lookup, all other rules are checked in order
+def compileRuleList(rules, classifier, parent_label):
+    compiled_rules = []
+    for conditions, result in rules:
+        label = ' & '.join(getConditionLabel(condition) for condition in conditions)
+        if not label:
+            label = '(else)'
+        if parent_label:
+            label = parent_label + ' > ' + label
+        rule_id = len(classifier['labels'])
+        classifier['labels'].append(label + ' -> ' + (str(result) if type(result) != list else '...'))
+        classifier['hits'].append(0)
+        if type(result) == list:
+            result = compileRuleList(result, classifier, label)
+
+        key = getSwitchKey(conditions)
+        if key:
+            values = conditions[0][2] if conditions[0][1] == 'in' else (conditions[0][2],)
+            if not compiled_rules or compiled_rules[-1][0] != 'switch' or compiled_rules[-1][1] != key:
+                compiled_rules.append(('switch', key, {}))
+            for value in values:
+                compiled_rules[-1][2].setdefault(value, (result, rule_id))
+        else:
+            compiled_rules.append(('test', compileConditions(conditions), (result, rule_id)))
+    return(compiled_rules)
+
+
+
+#compile a rule table into a classifier with rule hit counters
+def compileRules(rules):
+    classifier = {'labels': [], 'hits': []}
+    classifier['rules'] = compileRuleList(rules, classifier, '')
+    return(classifier)
+
+
+
+#determine the way type of a feature with a compiled rule table (returns NULL if no rule matches)
+def classifyWayType(feature, classifier):
+    tags = {}
+    hits = classifier['hits']
+    result = classifier['rules']
+    while type(result) == list:
+        rules = result
+        result = NULL
+        for kind, test, match in rules:
+            if kind == 'switch':
+                match = match.get(getTagValue(feature, tags, test))
+                if match == None:
+                    continue
+            elif not test(feature, tags):
+                continue
+            result, rule_id = match
+            hits[rule_id] += 1
+            break
+    return(result)
+
+
+
+#list of rules and the number of features they matched
+def getRuleStatistics(classifier):
+    return([(classifier['labels'][i], classifier['hits'][i]) for i in range(len(classifier['labels']))])
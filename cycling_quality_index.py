@@ -16,8 +16,26 @@ from console.console import _console
 project_dir = os.path.dirname(_console.console.tabEditorWidget.currentWidget().path) + '/'
 dir_input = project_dir + 'data/way_import'
 dir_output = project_dir + 'data/cycling_quality_index'
-file_format = '.geojson'
+dir_intermediate = project_dir + 'data/intermediate/'
+dir_checkpoints = project_dir + 'data/checkpoints/'
+dir_sidepath_cache = project_dir + 'data/sidepath_cache/'
+file_format = '.geojson' #format of the input files: '.geojson' or '.parquet' (GeoParquet, needs QGIS with GDAL 3.5 or newer)
+output_file_format = '.geojson' #format of the output file: '.geojson', '.parquet' (GeoParquet with native attribute types and ZSTD compression, much faster to save and load for large regions) or '.gpkg' - GeoJSON and GeoParquet are written as GeoJSON sequence (.geojsonseq) during the processing and converted at the end, so if the processing is aborted, the features saved so far can still be read from the .geojsonseq file
 multi_input = False #if "True", it's possible to merge different import files stored in the input directory, marked with an ascending number starting with 1 at the end of the filename (e.g. way_import1.geojson, way_import2.geojson etc.) - can be used to process different areas at the same time or to process a larger area that can't be downloaded in one file
+input_filter = None #if set to a bounding box [min. longitude, min. latitude, max. longitude, max. latitude] or to the path of a file with polygons (e.g. project_dir + 'data/area.geojson'), only ways intersecting it are read from the input files
+vectorized_scoring = False #if "True", index and factors are calculated for all features of a way type at once with NumPy instead of feature by feature (results are identical, but much faster on large data sets)
+parameter_sweep = False #if "True", the index is additionally calculated for every parameter variant in "sweep_variant_list" (see parameter.py) and saved as "index_<name>" - all other processing is done only once, the variants are calculated with vectorized scoring and summary statistics are saved at data/cycling_quality_index_sweep.csv
+explain_index = False #if "True", a breakdown of the index is saved for every way as json string in "index_explanation" (base index, factors, index points per factor and the gradient of the index for every parameter entry used) - aggregated sensitivities of the mean index for every parameter entry are saved at data/cycling_quality_index_sensitivity.csv (uses vectorized scoring)
+spatial_sort = False #if "True", the ways are sorted along a Hilbert curve (a space-filling curve) after reading, so spatially adjacent ways, check points and roads are processed together and written next to each other to the output - speeds up the sidepath check and reading the output on large data sets
+tile_size = 0 #if > 0, the input is split into square tiles of this size (in meters) that are processed one after another and stitched together afterwards - limits the memory needed for large areas
+sidepath_cache = False #if "True", the results of the sidepath check are cached on disk - they only depend on the geometries, some attributes and the sidepath buffer parameters, so runs with changed scoring parameters can skip the sidepath check
+checkpoints = False #if "True", the results of the sidepath check, the split line bundles and the way types are saved as checkpoints - if a run is aborted, the next run with the same input data and parameters resumes from the latest checkpoint (checkpoints are deleted after a successful run)
+store_intermediate = False #if "True", intermediate layers are stored as SQLite files in the intermediate directory (memory mapped instead of read into memory) and released as soon as they are processed - slower, but regions that don't fit into memory can be processed
+preview_mode = False #if "True", only ways intersecting the current map canvas extent are processed (ways around it are read for the sidepath check), saved at data/cycling_quality_index_preview (in the output file format) and displayed as "Cycling Quality Index (preview)" - for quick feedback on tagging or parameter changes in a small area (overrides "input_filter")
+interactive_session = False #if "True", the results are kept in the QGIS python console after a run - after editing parameter.py, the next run only recalculates the steps affected by the changed parameters (only the index, if only values of scoring parameters are changed) and updates the displayed layer (not with tiles, uses vectorized scoring)
+vector_tiles = False #if "True", the output is additionally exported as vector tile pyramid (MBTiles) at data/cycling_quality_index.mbtiles, e.g. for web maps (zoom levels and attributes at low zoom levels see parameter.py)
+background_task = False #if "True", the processing runs as a background task, so QGIS stays responsive - the progress is shown in the task manager, where the task can be canceled, and the output is displayed when the task is finished
+print_rule_statistics = False #if "True", the number of way segments matched by every rule of the way type rule table is printed (for profiling and checking rule tables)
 
 if project_dir not in sys.path:
     sys.path.append(project_dir)
@@ -28,6 +46,15 @@ importlib.reload(p)
 import definitions as d
 importlib.reload(d)
 
+import scoring as s
+importlib.reload(s)
+
+import classification as c
+importlib.reload(c)
+
+#parameters as loaded, to detect changed parameters in interactive sessions
+parameter_snapshot = d.getParameterSnapshot(p)
+
 
 
 #--------------------------------
@@ -38,115 +65,91 @@ print(time.strftime('%H:%M:%S', time.localtime()), 'Start processing:')
 
 print(time.strftime('%H:%M:%S', time.localtime()), 'Read data...')
 
+#coordinate transformations use the transform context of the project, it's read here in the main thread (the project is not accessed during the processing)
+d.transform_context = QgsProject.instance().transformContext()
+
+#only attributes used for the analysis and ways inside the input filter are read from the input files
+input_filter_geometry = d.getInputFilter(input_filter)
+if input_filter and input_filter_geometry == None:
+    print(time.strftime('%H:%M:%S', time.localtime()), '[!] Warning: Input filter "' + str(input_filter) + '" is not valid, all ways are read.')
+
+#preview mode: only ways in the current map canvas extent are written to the output, ways in a surrounding halo are only used for the sidepath check
+preview_extent = None
+if preview_mode:
+    transform = QgsCoordinateTransform(iface.mapCanvas().mapSettings().destinationCrs(), QgsCoordinateReferenceSystem(p.crs_metric), QgsProject.instance())
+    preview_extent = transform.transformBoundingBox(iface.mapCanvas().extent())
+    preview_halo_extent = QgsRectangle(preview_extent)
+    preview_halo_extent.grow(p.sidepath_buffer_size * 2) #halo: twice the sidepath check distance, as for tiles
+    input_filter_geometry = (QgsGeometry.fromRect(preview_halo_extent), QgsCoordinateReferenceSystem(p.crs_metric))
+    dir_output += '_preview'
+    print(time.strftime('%H:%M:%S', time.localtime()), '   Preview: read ways in the map extent only...')
+
 #multiple input files can be merged to one single input
+#in tiled processing, the input files are not read here, but tile by tile from disk (see d.getTileInput)
+layer_way_input = None
+input_path_list = []
+input_attributes_list = list(p.attributes_list)
 if multi_input:
-    input_data = []
+    input_files = []
     i = 1
     while exists(dir_input + str(i) + file_format):
-        print(time.strftime('%H:%M:%S', time.localtime()), '   Read input file ' + str(i) + '...')
-        layer_way_input = QgsVectorLayer(dir_input + str(i) + file_format + '|geometrytype=LineString', 'way input', 'ogr')
-        layer_way_input = processing.run('native:retainfields', { 'INPUT' : layer_way_input, 'FIELDS' : p.attributes_list, 'OUTPUT': 'memory:'})['OUTPUT']
-        input_data.append(layer_way_input)
+        input_files.append(dir_input + str(i) + file_format)
         i += 1
-    if input_data:
-        print(time.strftime('%H:%M:%S', time.localtime()), '   Merge input files...')
-        layer_way_input = processing.run('native:mergevectorlayers', { 'LAYERS' : input_data, 'OUTPUT': 'memory:'})['OUTPUT']
-        layer_way_input = processing.run('native:deleteduplicategeometries', {'INPUT': layer_way_input, 'OUTPUT': dir_input + file_format })
-    else:
+    if input_files and tile_size:
+        print(time.strftime('%H:%M:%S', time.localtime()), '   ' + str(len(input_files)) + ' input files are read tile by tile...')
+        input_path_list = input_files
+    elif input_files:
+        #input files are read in parallel, ways contained in several files are only added once
+        print(time.strftime('%H:%M:%S', time.localtime()), '   Read and merge ' + str(len(input_files)) + ' input files...')
+        layer_way_input, input_stats = d.readInputFiles(input_files, p.attributes_list, p.version_attributes_list, input_filter_geometry)
+        for i in range(len(input_files)):
+            if input_stats[i] == None:
+                print(time.strftime('%H:%M:%S', time.localtime()), '[!] Warning: Input file "' + input_files[i] + '" is not valid and is skipped.')
+            else:
+                print(time.strftime('%H:%M:%S', time.localtime()), '      Input file ' + str(i + 1) + ': ' + str(input_stats[i]['ways']) + ' ways, ' + str(input_stats[i]['duplicates']) + ' duplicates removed, ' + str(input_stats[i]['replaced']) + ' older duplicates replaced')
+        if layer_way_input != None:
+            print(time.strftime('%H:%M:%S', time.localtime()), '   ' + str(layer_way_input.featureCount()) + ' unique ways in all input files.')
+            input_path_list = input_files
+    if not input_path_list:
         print(time.strftime('%H:%M:%S', time.localtime()), '[!] Warning: No valid input files at "' + dir_input + '*' + file_format + '". Use ascending numbers starting with 1 at the end of the file names.')
         if exists(dir_input + file_format):
             print(time.strftime('%H:%M:%S', time.localtime()), '[!] Warning: Continuing with input file "' + dir_input + file_format + '".')
 
-if not exists(dir_input + file_format):
-    if multi_input:
-        print(time.strftime('%H:%M:%S', time.localtime()), '[!] Error: No valid input files at "' + dir_input + '*' + file_format + '".')
+#-----------------------------------------
+#      P r o c e s s i n g   S t e p s
+#-----------------------------------------
+
+#process a layer of ways (the whole input or a tile of it) and return the layer with index, factors and all derived attributes
+#with a checkpoint prefix, the results of steps 1 to 3 are saved as checkpoints and the processing resumes from the latest one (if available)
+#with an interactive session, the results of step 3 and the scoring input are kept in the session - if the session stage is 4, the processing continues from the kept results of step 3
+#with a progress (see d.createProgress), the progress of the processing steps is reported and the processing is aborted, if the task is canceled
+def processWays(layer_way_input, intermediate_dir, checkpoint_prefix, session=None, progress=None):
+    if session != None and session['stage'] >= 4:
+        layer = session['layer_step3'].materialize(QgsFeatureRequest())
     else:
-        print(time.strftime('%H:%M:%S', time.localtime()), '[!] Error: No valid input file at "' + dir_input + file_format + '".')
-else:
-    layer_way_input = QgsVectorLayer(dir_input + file_format + '|geometrytype=LineString', 'way input', 'ogr')
-
-    print(time.strftime('%H:%M:%S', time.localtime()), 'Reproject data...')
-    layer = processing.run('native:reprojectlayer', { 'INPUT' : layer_way_input, 'TARGET_CRS' : QgsCoordinateReferenceSystem(p.crs_metric), 'OUTPUT': 'memory:'})['OUTPUT']
-
-    #prepare attributes
-    print(time.strftime('%H:%M:%S', time.localtime()), 'Prepare data...')
-    #delete unneeded attributes
-    layer = processing.run('native:retainfields', { 'INPUT' : layer, 'FIELDS' : p.attributes_list, 'OUTPUT': 'memory:'})['OUTPUT']
-
-    #list of new attributes, important for calculating cycling quality index
-    new_attributes_dict = {
-    'way_type': 'String',
-    'index': 'Int',
-    'index_10': 'Int',
-    'stress_level': 'Int',
-    'offset': 'Double',
-    'offset_cycleway_left': 'Double',
-    'offset_cycleway_right': 'Double',
-    'offset_sidewalk_left': 'Double',
-    'offset_sidewalk_right': 'Double',
-    'type': 'String',
-    'side': 'String',
-    'proc_width': 'Double',
-    'proc_surface': 'String',
-    'proc_smoothness': 'String',
-    'proc_oneway': 'String',
-    'proc_sidepath': 'String',
-    'proc_highway': 'String',
-    'proc_maxspeed': 'Int',
-    'proc_traffic_mode_left': 'String',
-    'proc_traffic_mode_right': 'String',
-    'proc_separation_left': 'String',
-    'proc_separation_right': 'String',
-    'proc_buffer_left': 'Double',
-    'proc_buffer_right': 'Double',
-    'proc_mandatory': 'String',
-    'proc_traffic_sign': 'String',
-    'fac_width': 'Double',
-    'fac_surface': 'Double',
-    'fac_highway': 'Double',
-    'fac_maxspeed': 'Double',
-    'fac_protection_level': 'Double',
-    'prot_level_separation_left': 'Double',
-    'prot_level_separation_right': 'Double',
-    'prot_level_buffer_left': 'Double',
-    'prot_level_buffer_right': 'Double',
-    'prot_level_left': 'Double',
-    'prot_level_right': 'Double',
-    'base_index': 'Int',
-    'fac_1': 'Double',
-    'fac_2': 'Double',
-    'fac_3': 'Double',
-    'fac_4': 'Double',
-    'data_bonus': 'String',
-    'data_malus': 'String',
-    'data_incompleteness': 'Double',
-    'data_missing': 'String',
-    'data_missing_width': 'Int',
-    'data_missing_surface': 'Int',
-    'data_missing_smoothness': 'Int',
-    'data_missing_maxspeed': 'Int',
-    'data_missing_parking': 'Int',
-    'data_missing_lit': 'Int',
-    'filter_usable': 'Int',
-    'filter_way_type': 'String'
-    }
-    for attr in list(new_attributes_dict.keys()):
-        p.attributes_list.append(attr)
-
-    #make sure all attributes are existing in the table to prevent errors when asking for a missing one
-    with edit(layer):
-        for attr in p.attributes_list:
-            if layer.fields().indexOf(attr) == -1:
-                if attr in new_attributes_dict:
-                    if new_attributes_dict[attr] == 'Double':
-                        layer.dataProvider().addAttributes([QgsField(attr, QVariant.Double)])
-                    elif new_attributes_dict[attr] == 'Int':
-                        layer.dataProvider().addAttributes([QgsField(attr, QVariant.Int)])
+        print(time.strftime('%H:%M:%S', time.localtime()), 'Reproject data...')
+        layer = d.runProcessing('native:reprojectlayer', { 'INPUT' : layer_way_input, 'TARGET_CRS' : QgsCoordinateReferenceSystem(p.crs_metric)}, 'reprojected', intermediate_dir)
+        if spatial_sort:
+            #all derived layers (paths, roads, check points) keep the order of the features
+            print(time.strftime('%H:%M:%S', time.localtime()), '   Sort ways spatially...')
+            layer = d.sortLayerSpatially(layer, 'sorted', intermediate_dir)
+
+        #prepare attributes (unneeded attributes are not read from the input files)
+        print(time.strftime('%H:%M:%S', time.localtime()), 'Prepare data...')
+        #make sure all attributes are existing in the table to prevent errors when asking for a missing one
+        with edit(layer):
+            for attr in p.attributes_list:
+                if layer.fields().indexOf(attr) == -1:
+                    if attr in new_attributes_dict:
+                        if new_attributes_dict[attr] == 'Double':
+                            layer.dataProvider().addAttributes([QgsField(attr, QVariant.Double)])
+                        elif new_attributes_dict[attr] == 'Int':
+                            layer.dataProvider().addAttributes([QgsField(attr, QVariant.Int)])
+                        else:
+                            layer.dataProvider().addAttributes([QgsField(attr, QVariant.String)])
                     else:
                         layer.dataProvider().addAttributes([QgsField(attr, QVariant.String)])
-                else:
-                    layer.dataProvider().addAttributes([QgsField(attr, QVariant.String)])
-        layer.updateFields()
+            layer.updateFields()
 
     id_way_type = layer.fields().indexOf('way_type')
     id_index = layer.fields().indexOf('index')
@@ -192,18 +195,25 @@ else:
     id_fac_4 = layer.fields().indexOf('fac_4')
     id_data_bonus = layer.fields().indexOf('data_bonus')
     id_data_malus = layer.fields().indexOf('data_malus')
-    id_data_incompleteness = layer.fields().indexOf('data_incompleteness')
     id_data_missing = layer.fields().indexOf('data_missing')
-    id_data_missing_width = layer.fields().indexOf('data_missing_width')
-    id_data_missing_surface = layer.fields().indexOf('data_missing_surface')
-    id_data_missing_smoothness = layer.fields().indexOf('data_missing_smoothness')
-    id_data_missing_maxspeed = layer.fields().indexOf('data_missing_maxspeed')
-    id_data_missing_parking = layer.fields().indexOf('data_missing_parking')
-    id_data_missing_lit = layer.fields().indexOf('data_missing_lit')
     id_filter_usable = layer.fields().indexOf('filter_usable')
     id_filter_way_type = layer.fields().indexOf('filter_way_type')
 
-    QgsProject.instance().addMapLayer(layer, False)
+    #resume from the latest checkpoint of the same input and parameters (if available)
+    checkpoint_stage = 0
+    if session != None and session['stage'] >= 4:
+        print(time.strftime('%H:%M:%S', time.localtime()), 'Continue with the results of step 3 of the interactive session...')
+        checkpoint_stage = 3
+    elif checkpoint_prefix:
+        checkpoint_stage, layer_checkpoint = d.loadCheckpoint(checkpoint_prefix, categories)
+        if checkpoint_stage:
+            print(time.strftime('%H:%M:%S', time.localtime()), 'Resume from checkpoint after step ' + str(checkpoint_stage) + '...')
+            layer = layer_checkpoint
+            del layer_checkpoint
+
+    #the layer is registered in the processing context for selections in step 2
+    if checkpoint_stage < 2:
+        d.addContextLayer(layer)
 
 
 
@@ -211,159 +221,238 @@ else:
     #1: Check paths whether they are sidepath (a path along a road) #
     #---------------------------------------------------------------#
 
-    print(time.strftime('%H:%M:%S', time.localtime()), 'Sidepath check...')
-    print(time.strftime('%H:%M:%S', time.localtime()), '   Create way layers...')
-    #create path layer: check all path, footways or cycleways for their sidepath status
-    layer_path = processing.run('qgis:extractbyexpression', { 'INPUT' : layer, 'EXPRESSION' : '"highway" IS \'cycleway\' OR "highway" IS \'footway\' OR "highway" IS \'path\' OR "highway" IS \'bridleway\' OR "highway" IS \'steps\'', 'OUTPUT': 'memory:'})['OUTPUT']
-    #create road layer: extract all other highway types (except tracks)
-    layer_roads = processing.run('qgis:extractbyexpression', { 'INPUT' : layer, 'EXPRESSION' : '"highway" IS NOT \'cycleway\' AND "highway" IS NOT \'footway\' AND "highway" IS NOT \'path\' AND "highway" IS NOT \'bridleway\' AND "highway" IS NOT \'steps\' AND "highway" IS NOT \'track\'', 'OUTPUT': 'memory:'})['OUTPUT']
-
-    print(time.strftime('%H:%M:%S', time.localtime()), '   Create check points...')
-    #create "check points" along each segment (to check for near/parallel highways at every checkpoint)
-    layer_path_points = processing.run('native:pointsalonglines', {'INPUT' : layer_path, 'DISTANCE' : p.sidepath_buffer_distance, 'OUTPUT': 'memory:'})['OUTPUT']
-    layer_path_points_endpoints = processing.run('native:extractspecificvertices', { 'INPUT' : layer_path, 'VERTICES' : '-1', 'OUTPUT': 'memory:'})['OUTPUT']
-    layer_path_points = processing.run('native:mergevectorlayers', { 'LAYERS' : [layer_path_points, layer_path_points_endpoints], 'OUTPUT': 'memory:'})['OUTPUT']
-    #create "check buffers" (to check for near/parallel highways with in the given distance)
-    layer_path_points_buffers = processing.run('native:buffer', { 'INPUT' : layer_path_points, 'DISTANCE' : p.sidepath_buffer_size, 'OUTPUT': 'memory:'})['OUTPUT']
-    QgsProject.instance().addMapLayer(layer_path_points_buffers, False)
-
-    print(time.strftime('%H:%M:%S', time.localtime()), '   Check for adjacent roads...')
-
-    #for all check points: Save nearby road id's, names and highway classes in a dict
-    sidepath_dict = {}
-    for buffer in layer_path_points_buffers.getFeatures():
-        buffer_id = buffer.attribute('id')
-        buffer_layer = buffer.attribute('layer')
-        if not buffer_id in sidepath_dict:
-            sidepath_dict[buffer_id] = {}
-            sidepath_dict[buffer_id]['checks'] = 1
-            sidepath_dict[buffer_id]['id'] = {}
-            sidepath_dict[buffer_id]['highway'] = {}
-            sidepath_dict[buffer_id]['name'] = {}
-            sidepath_dict[buffer_id]['maxspeed'] = {}
-        else:
-            sidepath_dict[buffer_id]['checks'] += 1
-        layer_path_points_buffers.removeSelection()
-        layer_path_points_buffers.select(buffer.id())
-        processing.run('native:selectbylocation', {'INPUT' : layer_roads, 'INTERSECT' : QgsProcessingFeatureSourceDefinition(layer_path_points_buffers.id(), selectedFeaturesOnly=True), 'METHOD' : 0, 'PREDICATE' : [0,6]})
-
-        id_list = []
-        highway_list = []
-        name_list = []
-        maxspeed_dict = {}
-        for road in layer_roads.selectedFeatures():
-            road_layer = road.attribute('layer')
-            if buffer_layer != road_layer:
-                continue #only consider geometries in the same layer
-            road_id = road.attribute('id')
-            road_highway = road.attribute('highway')
-            road_name = road.attribute('name')
-            road_maxspeed = d.getNumber(road.attribute('maxspeed'))
-            if not road_id in id_list:
-                id_list.append(road_id)
-            if not road_highway in highway_list:
-                highway_list.append(road_highway)
-            if not road_highway in maxspeed_dict or maxspeed_dict[road_highway] < road_maxspeed:
-                maxspeed_dict[road_highway] = road_maxspeed
-            if not road_name in name_list:
-                name_list.append(road_name)
-        for road_id in id_list:
-            if road_id in sidepath_dict[buffer_id]['id']:
-                sidepath_dict[buffer_id]['id'][road_id] += 1
-            else:
-                sidepath_dict[buffer_id]['id'][road_id] = 1
-        for road_highway in highway_list:
-            if road_highway in sidepath_dict[buffer_id]['highway']:
-                sidepath_dict[buffer_id]['highway'][road_highway] += 1
-            else:
-                sidepath_dict[buffer_id]['highway'][road_highway] = 1
-        for road_name in name_list:
-            if road_name in sidepath_dict[buffer_id]['name']:
-                sidepath_dict[buffer_id]['name'][road_name] += 1
-            else:
-                sidepath_dict[buffer_id]['name'][road_name] = 1
-
-        for highway in maxspeed_dict.keys():
-            if not highway in sidepath_dict[buffer_id]['maxspeed'] or sidepath_dict[buffer_id]['maxspeed'][highway] < maxspeed_dict[highway]:
-                sidepath_dict[buffer_id]['maxspeed'][highway] = maxspeed_dict[highway]
-
-    highway_class_list = ['motorway', 'motorway_link', 'trunk', 'trunk_link', 'primary', 'primary_link', 'secondary', 'secondary_link', 'tertiary', 'tertiary_link', 'unclassified', 'residential', 'road', 'living_street', 'service', 'pedestrian', NULL]
-
-    #a path is considered a sidepath if at least two thirds of its check points are found to be close to road segments with the same OSM ID, highway class or street name
-    with edit(layer):
+    if checkpoint_stage < 1:
+        d.setProgress(progress, 'sidepath check', 0)
+        #plan the sidepath check: only paths that need results of the geometric check get check points (see d.getSidepathCheckParts)
+        sidepath_plan_classifier = c.compileRules(c.way_type_rules)
+        path_count = 0
+        check_id_list = []
         for feature in layer.getFeatures():
-            hw = feature.attribute('highway')
-            maxspeed = feature.attribute('maxspeed')
-            if maxspeed == 'walk' or (not maxspeed and hw == 'living_street'):
-                maxspeed = 10
-            if maxspeed == 'none':
-                maxspeed = 299
-            if not maxspeed and hw == 'living_street':
-                maxspeed = 10
-            if not hw in ['cycleway', 'footway', 'path', 'bridleway', 'steps']:
-                layer.changeAttributeValue(feature.id(), id_proc_highway, hw)
-                layer.changeAttributeValue(feature.id(), id_proc_maxspeed, d.getNumber(maxspeed))
+            if feature.attribute('highway') not in ['cycleway', 'footway', 'path', 'bridleway', 'steps']:
                 continue
-            id = feature.attribute('id')
-            is_sidepath = feature.attribute('is_sidepath')
-            if feature.attribute('footway') == 'sidewalk':
-                is_sidepath = 'yes'
-            is_sidepath_of = feature.attribute('is_sidepath:of')
-            checks = sidepath_dict[id]['checks']
-
-            if not is_sidepath:
-                is_sidepath = 'no'
-
-                for road_id in sidepath_dict[id]['id'].keys():
-                    if checks <= 2:
-                        if sidepath_dict[id]['id'][road_id] == checks:
-                            is_sidepath = 'yes'
-                    else:
-                        if sidepath_dict[id]['id'][road_id] >= checks * 0.66:
-                            is_sidepath = 'yes'
-
-                if is_sidepath != 'yes':
-                    for highway in sidepath_dict[id]['highway'].keys():
-                        if checks <= 2:
-                            if sidepath_dict[id]['highway'][highway] == checks:
-                                is_sidepath = 'yes'
+            path_count += 1
+            if d.getSidepathCheckParts(feature, c.classifyWayType(feature, sidepath_plan_classifier) == c.delete_feature):
+                check_id_list.append(feature.id())
+
+        #use cached results of the sidepath check, if the geometries, relevant attributes, checked paths and buffer parameters haven't changed
+        sidepath_cache_path = None
+        if sidepath_cache:
+            sidepath_cache_path = dir_sidepath_cache + d.getSidepathKey(layer, [p.sidepath_buffer_size, p.sidepath_buffer_distance, check_id_list]) + '.json'
+        if sidepath_cache_path and d.loadSidepathResults(sidepath_cache_path, layer, categories):
+            print(time.strftime('%H:%M:%S', time.localtime()), 'Sidepath check: use cached results...')
+        else:
+            print(time.strftime('%H:%M:%S', time.localtime()), 'Sidepath check...')
+            print(time.strftime('%H:%M:%S', time.localtime()), '   ' + str(len(check_id_list)) + ' of ' + str(path_count) + ' paths need a geometric check.')
+            print(time.strftime('%H:%M:%S', time.localtime()), '   Create way layers...')
+            #create path layer: check the planned path, footways or cycleways for their sidepath status
+            layer.selectByIds(check_id_list)
+            layer_path = d.runProcessing('native:saveselectedfeatures', { 'INPUT' : layer}, 'path', intermediate_dir)
+            layer.removeSelection()
+            #create road layer: extract all other highway types (except tracks)
+            layer_roads = d.runProcessing('qgis:extractbyexpression', { 'INPUT' : layer, 'EXPRESSION' : '"highway" IS NOT \'cycleway\' AND "highway" IS NOT \'footway\' AND "highway" IS NOT \'path\' AND "highway" IS NOT \'bridleway\' AND "highway" IS NOT \'steps\' AND "highway" IS NOT \'track\''}, 'roads', intermediate_dir)
+            #road layers are partitioned by their OSM "layer" value: only roads in the same layer as a check point are candidates for adjacent roads (e.g. no roads below a bridge)
+            layer_roads_dict = {}
+            id_road_layer = layer_roads.fields().indexOf('layer')
+            for road_layer_index, road_layer in enumerate(sorted(layer_roads.uniqueValues(id_road_layer), key=str)):
+                layer_roads_dict[road_layer] = d.runProcessing('qgis:extractbyexpression', { 'INPUT' : layer_roads, 'EXPRESSION' : '"layer" IS ' + QgsExpression.quotedValue(road_layer)}, 'roads_layer' + str(road_layer_index), intermediate_dir)
+            #the road partitions are queried for every check point through spatial indexes built in memory - they only hold bounding boxes, so they are small, even if the partitions are stored as files
+            road_index_dict = {road_layer: QgsSpatialIndex(layer_roads_dict[road_layer].getFeatures(QgsFeatureRequest().setNoAttributes())) for road_layer in layer_roads_dict}
+
+            print(time.strftime('%H:%M:%S', time.localtime()), '   Create check points...')
+            #create "check points" along each segment (to check for near/parallel highways at every checkpoint)
+            layer_path_points = d.runProcessing('native:pointsalonglines', {'INPUT' : layer_path, 'DISTANCE' : p.sidepath_buffer_distance}, 'path_points', intermediate_dir)
+            layer_path_points_endpoints = d.runProcessing('native:extractspecificvertices', { 'INPUT' : layer_path, 'VERTICES' : '-1'}, 'path_endpoints', intermediate_dir)
+            layer_path_points = d.runProcessing('native:mergevectorlayers', { 'LAYERS' : [layer_path_points, layer_path_points_endpoints]}, 'path_points_merged', intermediate_dir)
+            #create "check buffers" (to check for near/parallel highways with in the given distance)
+            layer_path_points_buffers = d.runProcessing('native:buffer', { 'INPUT' : layer_path_points, 'DISTANCE' : p.sidepath_buffer_size}, 'path_points_buffers', intermediate_dir)
+
+            print(time.strftime('%H:%M:%S', time.localtime()), '   Check for adjacent roads...')
+
+            #check points of a path are evaluated beginning with the endpoints, then the middle and further bisections
+            #if the sidepath status of a path isn't tagged and it can't reach the majority of checks any more, the evaluation of the path stops early (it is no sidepath and no other results are needed then)
+            early_exit_id_set = set()
+            tagged_id_set = set()
+            for feature in layer.getFeatures(QgsFeatureRequest().setFilterFids(check_id_list)):
+                if 'sidepath' in d.getSidepathCheckParts(feature, False):
+                    early_exit_id_set.add(feature.attribute('id'))
+                else:
+                    tagged_id_set.add(feature.attribute('id'))
+            early_exit_id_set -= tagged_id_set
+            id_distance = layer_path_points_buffers.fields().indexOf('distance')
+            buffer_dict = {}
+            for buffer in layer_path_points_buffers.getFeatures():
+                distance = buffer.attribute(id_distance) if id_distance != -1 else 0
+                buffer_dict.setdefault(buffer.attribute('id'), []).append((buffer.id(), buffer.attribute('layer'), distance if isinstance(distance, (int, float)) else 0))
+
+            #for all check points: Save nearby road id's, names and highway classes in a dict
+            sidepath_dict = {}
+            query_count = 0
+            skipped_count = 0
+            for buffer_index, buffer_id in enumerate(buffer_dict):
+                if buffer_index % 100 == 0:
+                    d.setProgress(progress, 'sidepath check', buffer_index / len(buffer_dict))
+                buffer_list = buffer_dict[buffer_id]
+                checks = len(buffer_list)
+                position_list = sorted(range(checks), key=lambda i: buffer_list[i][2])
+                check_results = [None] * checks
+                check_counts = {'id': {}, 'highway': {}, 'name': {}}
+                for n, index in enumerate(d.getBisectionOrder(checks)):
+                    if buffer_id in early_exit_id_set and d.isNoSidepath(check_counts, checks, checks - n):
+                        skipped_count += checks - n
+                        break
+                    position = position_list[index]
+                    buffer_fid, buffer_layer = buffer_list[position][0], buffer_list[position][1]
+                    id_list = []
+                    highway_list = []
+                    name_list = []
+                    maxspeed_dict = {}
+                    #only consider geometries in the same layer
+                    road_list = []
+                    layer_roads_partition = layer_roads_dict.get(buffer_layer)
+                    if layer_roads_partition != None:
+                        #candidates from the spatial index are checked against the exact geometry of the check buffer
+                        buffer_geometry = layer_path_points_buffers.getFeature(buffer_fid).geometry()
+                        road_id_list = sorted(road_index_dict[buffer_layer].intersects(buffer_geometry.boundingBox()))
+                        road_list = [road for road in layer_roads_partition.getFeatures(QgsFeatureRequest().setFilterFids(road_id_list)) if buffer_geometry.intersects(road.geometry())]
+                        query_count += 1
+                    for road in road_list:
+                        road_id = road.attribute('id')
+                        road_highway = road.attribute('highway')
+                        road_name = road.attribute('name')
+                        road_maxspeed = d.getNumber(road.attribute('maxspeed'))
+                        if not road_id in id_list:
+                            id_list.append(road_id)
+                        if not road_highway in highway_list:
+                            highway_list.append(road_highway)
+                        if not road_highway in maxspeed_dict or maxspeed_dict[road_highway] < road_maxspeed:
+                            maxspeed_dict[road_highway] = road_maxspeed
+                        if not road_name in name_list:
+                            name_list.append(road_name)
+                    check_results[position] = (id_list, highway_list, name_list, maxspeed_dict)
+                    for key, value_list in [('id', id_list), ('highway', highway_list), ('name', name_list)]:
+                        for value in value_list:
+                            check_counts[key][value] = check_counts[key].get(value, 0) + 1
+
+                #results are summed up in the order of the check points along the path (the order of names with the same frequency matters for the name transfer)
+                sidepath_dict[buffer_id] = {}
+                sidepath_dict[buffer_id]['checks'] = checks
+                sidepath_dict[buffer_id]['id'] = {}
+                sidepath_dict[buffer_id]['highway'] = {}
+                sidepath_dict[buffer_id]['name'] = {}
+                sidepath_dict[buffer_id]['maxspeed'] = {}
+                for check_result in check_results:
+                    if check_result == None:
+                        continue
+                    id_list, highway_list, name_list, maxspeed_dict = check_result
+                    for road_id in id_list:
+                        if road_id in sidepath_dict[buffer_id]['id']:
+                            sidepath_dict[buffer_id]['id'][road_id] += 1
                         else:
-                            if sidepath_dict[id]['highway'][highway] >= checks * 0.66:
-                                is_sidepath = 'yes'
-
-                if is_sidepath != 'yes':
-                    for name in sidepath_dict[id]['name'].keys():
-                        if checks <= 2:
-                            if sidepath_dict[id]['name'][name] == checks:
-                                is_sidepath = 'yes'
+                            sidepath_dict[buffer_id]['id'][road_id] = 1
+                    for road_highway in highway_list:
+                        if road_highway in sidepath_dict[buffer_id]['highway']:
+                            sidepath_dict[buffer_id]['highway'][road_highway] += 1
                         else:
-                            if sidepath_dict[id]['name'][name] >= checks * 0.66:
-                                is_sidepath = 'yes'
+                            sidepath_dict[buffer_id]['highway'][road_highway] = 1
+                    for road_name in name_list:
+                        if road_name in sidepath_dict[buffer_id]['name']:
+                            sidepath_dict[buffer_id]['name'][road_name] += 1
+                        else:
+                            sidepath_dict[buffer_id]['name'][road_name] = 1
+
+                    for highway in maxspeed_dict.keys():
+                        if not highway in sidepath_dict[buffer_id]['maxspeed'] or sidepath_dict[buffer_id]['maxspeed'][highway] < maxspeed_dict[highway]:
+                            sidepath_dict[buffer_id]['maxspeed'][highway] = maxspeed_dict[highway]
+            print(time.strftime('%H:%M:%S', time.localtime()), '   ' + str(query_count) + ' check points evaluated, ' + str(skipped_count) + ' skipped (early exit).')
+
+            highway_class_list = ['motorway', 'motorway_link', 'trunk', 'trunk_link', 'primary', 'primary_link', 'secondary', 'secondary_link', 'tertiary', 'tertiary_link', 'unclassified', 'residential', 'road', 'living_street', 'service', 'pedestrian', NULL]
+
+            #a path is considered a sidepath if at least two thirds of its check points are found to be close to road segments with the same OSM ID, highway class or street name
+            with edit(layer):
+                for feature in layer.getFeatures():
+                    hw = feature.attribute('highway')
+                    maxspeed = feature.attribute('maxspeed')
+                    if maxspeed == 'walk' or (not maxspeed and hw == 'living_street'):
+                        maxspeed = 10
+                    if maxspeed == 'none':
+                        maxspeed = 299
+                    if not maxspeed and hw == 'living_street':
+                        maxspeed = 10
+                    if not hw in ['cycleway', 'footway', 'path', 'bridleway', 'steps']:
+                        layer.changeAttributeValue(feature.id(), id_proc_highway, d.encodeValue(categories['proc_highway'], hw))
+                        layer.changeAttributeValue(feature.id(), id_proc_maxspeed, d.getNumber(maxspeed))
+                        continue
+                    id = feature.attribute('id')
+                    is_sidepath = feature.attribute('is_sidepath')
+                    if feature.attribute('footway') == 'sidewalk':
+                        is_sidepath = 'yes'
+                    is_sidepath_of = feature.attribute('is_sidepath:of')
+                    #paths without check points (not needed according to the plan) have no adjacent roads
+                    if not id in sidepath_dict:
+                        sidepath_dict[id] = {'checks': 0, 'id': {}, 'highway': {}, 'name': {}, 'maxspeed': {}}
+                    checks = sidepath_dict[id]['checks']
+
+                    if not is_sidepath:
+                        is_sidepath = 'no'
+
+                        for road_id in sidepath_dict[id]['id'].keys():
+                            if checks <= 2:
+                                if sidepath_dict[id]['id'][road_id] == checks:
+                                    is_sidepath = 'yes'
+                            else:
+                                if sidepath_dict[id]['id'][road_id] >= checks * 0.66:
+                                    is_sidepath = 'yes'
+
+                        if is_sidepath != 'yes':
+                            for highway in sidepath_dict[id]['highway'].keys():
+                                if checks <= 2:
+                                    if sidepath_dict[id]['highway'][highway] == checks:
+                                        is_sidepath = 'yes'
+                                else:
+                                    if sidepath_dict[id]['highway'][highway] >= checks * 0.66:
+                                        is_sidepath = 'yes'
+
+                        if is_sidepath != 'yes':
+                            for name in sidepath_dict[id]['name'].keys():
+                                if checks <= 2:
+                                    if sidepath_dict[id]['name'][name] == checks:
+                                        is_sidepath = 'yes'
+                                else:
+                                    if sidepath_dict[id]['name'][name] >= checks * 0.66:
+                                        is_sidepath = 'yes'
+
+                    layer.changeAttributeValue(feature.id(), id_proc_sidepath, is_sidepath)
+
+                    #derive the highway class of the associated road
+                    if not is_sidepath_of and is_sidepath == 'yes':
+                        if len(sidepath_dict[id]['highway']):
+                            max_value = max(sidepath_dict[id]['highway'].values())
+                            max_keys = [key for key, value in sidepath_dict[id]['highway'].items() if value == max_value]
+                            min_index = len(highway_class_list) - 1
+                            for key in max_keys:
+                                if highway_class_list.index(key) < min_index:
+                                    min_index = highway_class_list.index(key)
+                            is_sidepath_of = highway_class_list[min_index]
 
-            layer.changeAttributeValue(feature.id(), id_proc_sidepath, is_sidepath)
+                    layer.changeAttributeValue(feature.id(), id_proc_highway, d.encodeValue(categories['proc_highway'], is_sidepath_of))
 
-            #derive the highway class of the associated road
-            if not is_sidepath_of and is_sidepath == 'yes':
-                if len(sidepath_dict[id]['highway']):
-                    max_value = max(sidepath_dict[id]['highway'].values())
-                    max_keys = [key for key, value in sidepath_dict[id]['highway'].items() if value == max_value]
-                    min_index = len(highway_class_list) - 1
-                    for key in max_keys:
-                        if highway_class_list.index(key) < min_index:
-                            min_index = highway_class_list.index(key)
-                    is_sidepath_of = highway_class_list[min_index]
+                    if is_sidepath == 'yes' and is_sidepath_of and is_sidepath_of in sidepath_dict[id]['maxspeed']:
+                        maxspeed = sidepath_dict[id]['maxspeed'][is_sidepath_of]
+                        if maxspeed:
+                            layer.changeAttributeValue(feature.id(), id_proc_maxspeed, d.getNumber(maxspeed))
+                    #transfer names to sidepath
+                    if is_sidepath == 'yes' and len(sidepath_dict[id]['name']):
+                        name = max(sidepath_dict[id]['name'], key=lambda k: sidepath_dict[id]['name'][k]) #the most frequent name in the surrounding
+                        if name:
+                            layer.changeAttributeValue(feature.id(), layer.fields().indexOf('name'), name)
 
-            layer.changeAttributeValue(feature.id(), id_proc_highway, is_sidepath_of)
+            #release intermediate layers of the sidepath check
+            del layer_path, layer_roads, layer_roads_dict, road_index_dict, layer_path_points, layer_path_points_endpoints, layer_path_points_buffers, sidepath_dict
+            if sidepath_cache_path:
+                d.saveSidepathResults(sidepath_cache_path, layer, categories)
+        if checkpoint_prefix:
+            d.saveCheckpoint(checkpoint_prefix, 1, layer, categories)
 
-            if is_sidepath == 'yes' and is_sidepath_of and is_sidepath_of in sidepath_dict[id]['maxspeed']:
-                maxspeed = sidepath_dict[id]['maxspeed'][is_sidepath_of]
-                if maxspeed:
-                    layer.changeAttributeValue(feature.id(), id_proc_maxspeed, d.getNumber(maxspeed))
-            #transfer names to sidepath
-            if is_sidepath == 'yes' and len(sidepath_dict[id]['name']):
-                name = max(sidepath_dict[id]['name'], key=lambda k: sidepath_dict[id]['name'][k]) #the most frequent name in the surrounding
-                if name:
-                    layer.changeAttributeValue(feature.id(), layer.fields().indexOf('name'), name)
 
 
 
@@ -371,136 +460,135 @@ else:
     #2: Split and shift attributes/geometries for sidepath mapped on the centerline #
     #-------------------------------------------------------------------------------#
 
-    print(time.strftime('%H:%M:%S', time.localtime()), 'Split line bundles...')
-    with edit(layer):
-        for feature in layer.getFeatures():
-            highway = feature.attribute('highway')
-            cycleway = feature.attribute('cycleway')
-            cycleway_both = feature.attribute('cycleway:both')
-            cycleway_left = feature.attribute('cycleway:left')
-            cycleway_right = feature.attribute('cycleway:right')
-            sidewalk_bicycle = feature.attribute('sidewalk:bicycle')
-            sidewalk_both_bicycle = feature.attribute('sidewalk:both:bicycle')
-            sidewalk_left_bicycle = feature.attribute('sidewalk:left:bicycle')
-            sidewalk_right_bicycle = feature.attribute('sidewalk:right:bicycle')
-
-            offset_cycleway_left = offset_cycleway_right = offset_sidewalk_left = offset_sidewalk_right = 0
-            side = NULL
-
-            #TODO: more precise offset calculation taking "parking:", "placement", "width:lanes" and other Tags into account
-            if p.offset_distance == 'realistic':
-                #use road width as offset for the new geometry
-                width = d.getNumber(feature.attribute('width'))
-
-                #use default road width if width isn't specified
-                if not width:
-                    if highway in p.default_highway_width_dict:
-                        width = p.default_highway_width_dict[highway]
-                    else:
-                        width = p.default_highway_width_fallback
+    if checkpoint_stage < 2:
+        print(time.strftime('%H:%M:%S', time.localtime()), 'Split line bundles...')
+        d.setProgress(progress, 'split line bundles', 0)
+        with edit(layer):
+            for feature in layer.getFeatures():
+                highway = feature.attribute('highway')
+                cycleway = feature.attribute('cycleway')
+                cycleway_both = feature.attribute('cycleway:both')
+                cycleway_left = feature.attribute('cycleway:left')
+                cycleway_right = feature.attribute('cycleway:right')
+                sidewalk_bicycle = feature.attribute('sidewalk:bicycle')
+                sidewalk_both_bicycle = feature.attribute('sidewalk:both:bicycle')
+                sidewalk_left_bicycle = feature.attribute('sidewalk:left:bicycle')
+                sidewalk_right_bicycle = feature.attribute('sidewalk:right:bicycle')
+
+                offset_cycleway_left = offset_cycleway_right = offset_sidewalk_left = offset_sidewalk_right = 0
+                side = NULL
+
+                #TODO: more precise offset calculation taking "parking:", "placement", "width:lanes" and other Tags into account
+                if p.offset_distance == 'realistic':
+                    #use road width as offset for the new geometry
+                    width = d.getNumber(feature.attribute('width'))
+
+                    #use default road width if width isn't specified
+                    if not width:
+                        if highway in p.default_highway_width_dict:
+                            width = p.default_highway_width_dict[highway]
+                        else:
+                            width = p.default_highway_width_fallback
+
+                #offset for cycleways
+                if highway != 'cycleway':
+                    #offset for left cycleways
+                    if cycleway in ['lane', 'track', 'share_busway'] or cycleway_both in ['lane', 'track', 'share_busway'] or cycleway_left in ['lane', 'track', 'share_busway']:
+                        #option 1: offset of sidepath lines according to real distances on the ground
+                        if p.offset_distance == 'realistic':
+                            offset_cycleway_left = width / 2
+                        #option 2: static offset as defined in the variable
+                        else:
+                            offset_cycleway_left = d.getNumber(p.offset_distance)
+                        layer.changeAttributeValue(feature.id(), id_offset_cycleway_left, offset_cycleway_left)
+
+                    #offset for right cycleways
+                    if cycleway in ['lane', 'track', 'share_busway'] or cycleway_both in ['lane', 'track', 'share_busway'] or cycleway_right in ['lane', 'track', 'share_busway']:
+                        if p.offset_distance == 'realistic':
+                            offset_cycleway_right = width / 2
+                        else:
+                            offset_cycleway_right = d.getNumber(p.offset_distance)
+                        layer.changeAttributeValue(feature.id(), id_offset_cycleway_right, offset_cycleway_right)
 
-            #offset for cycleways
-            if highway != 'cycleway':
-                #offset for left cycleways
-                if cycleway in ['lane', 'track', 'share_busway'] or cycleway_both in ['lane', 'track', 'share_busway'] or cycleway_left in ['lane', 'track', 'share_busway']:
-                    #option 1: offset of sidepath lines according to real distances on the ground
+                #offset for shared footways
+                #offset for left sidewalks
+                if sidewalk_bicycle in ['yes', 'designated', 'permissive'] or sidewalk_both_bicycle in ['yes', 'designated', 'permissive'] or sidewalk_left_bicycle in ['yes', 'designated', 'permissive']:
                     if p.offset_distance == 'realistic':
-                        offset_cycleway_left = width / 2
-                    #option 2: static offset as defined in the variable
+                        #use larger offset than for cycleways to get nearby, parallel lines in case both (cycleway and sidewalk) exist
+                        offset_sidewalk_left = width / 2 + 2
                     else:
-                        offset_cycleway_left = d.getNumber(p.offset_distance)
-                    layer.changeAttributeValue(feature.id(), id_offset_cycleway_left, offset_cycleway_left)
+                        #TODO: double offset if cycleway exists on same side
+                        offset_sidewalk_left = d.getNumber(p.offset_distance)
+                    layer.changeAttributeValue(feature.id(), id_offset_sidewalk_left, offset_sidewalk_left)
 
-                #offset for right cycleways
-                if cycleway in ['lane', 'track', 'share_busway'] or cycleway_both in ['lane', 'track', 'share_busway'] or cycleway_right in ['lane', 'track', 'share_busway']:
+                #offset for right sidewalks
+                if sidewalk_bicycle in ['yes', 'designated', 'permissive'] or sidewalk_both_bicycle in ['yes', 'designated', 'permissive'] or sidewalk_right_bicycle in ['yes', 'designated', 'permissive']:
                     if p.offset_distance == 'realistic':
-                        offset_cycleway_right = width / 2
+                        offset_sidewalk_right = width / 2 + 2
                     else:
-                        offset_cycleway_right = d.getNumber(p.offset_distance)
-                    layer.changeAttributeValue(feature.id(), id_offset_cycleway_right, offset_cycleway_right)
-
-            #offset for shared footways
-            #offset for left sidewalks
-            if sidewalk_bicycle in ['yes', 'designated', 'permissive'] or sidewalk_both_bicycle in ['yes', 'designated', 'permissive'] or sidewalk_left_bicycle in ['yes', 'designated', 'permissive']:
-                if p.offset_distance == 'realistic':
-                    #use larger offset than for cycleways to get nearby, parallel lines in case both (cycleway and sidewalk) exist
-                    offset_sidewalk_left = width / 2 + 2
-                else:
-                    #TODO: double offset if cycleway exists on same side
-                    offset_sidewalk_left = d.getNumber(p.offset_distance)
-                layer.changeAttributeValue(feature.id(), id_offset_sidewalk_left, offset_sidewalk_left)
-
-            #offset for right sidewalks
-            if sidewalk_bicycle in ['yes', 'designated', 'permissive'] or sidewalk_both_bicycle in ['yes', 'designated', 'permissive'] or sidewalk_right_bicycle in ['yes', 'designated', 'permissive']:
-                if p.offset_distance == 'realistic':
-                    offset_sidewalk_right = width / 2 + 2
-                else:
-                    offset_sidewalk_right = d.getNumber(p.offset_distance)
-                layer.changeAttributeValue(feature.id(), id_offset_sidewalk_right, offset_sidewalk_right)
-
-        processing.run('qgis:selectbyexpression', {'INPUT' : layer, 'EXPRESSION' : '\"offset_cycleway_left\" IS NOT NULL'})
-        offset_cycleway_left_layer = processing.run('native:offsetline', {'INPUT': QgsProcessingFeatureSourceDefinition(layer.id(), selectedFeaturesOnly=True), 'DISTANCE': QgsProperty.fromExpression('"offset_cycleway_left"'), 'OUTPUT': 'memory:'})['OUTPUT']
-        processing.run('qgis:selectbyexpression', {'INPUT' : layer, 'EXPRESSION' : '\"offset_cycleway_right\" IS NOT NULL'})
-        offset_cycleway_right_layer = processing.run('native:offsetline', {'INPUT': QgsProcessingFeatureSourceDefinition(layer.id(), selectedFeaturesOnly=True), 'DISTANCE': QgsProperty.fromExpression('-"offset_cycleway_right"'), 'OUTPUT': 'memory:'})['OUTPUT']
-        processing.run('qgis:selectbyexpression', {'INPUT' : layer, 'EXPRESSION' : '\"offset_sidewalk_left\" IS NOT NULL'})
-        offset_sidewalk_left_layer = processing.run('native:offsetline', {'INPUT': QgsProcessingFeatureSourceDefinition(layer.id(), selectedFeaturesOnly=True), 'DISTANCE': QgsProperty.fromExpression('"offset_sidewalk_left"'), 'OUTPUT': 'memory:'})['OUTPUT']
-        processing.run('qgis:selectbyexpression', {'INPUT' : layer, 'EXPRESSION' : '\"offset_sidewalk_right\" IS NOT NULL'})
-        offset_sidewalk_right_layer = processing.run('native:offsetline', {'INPUT': QgsProcessingFeatureSourceDefinition(layer.id(), selectedFeaturesOnly=True), 'DISTANCE': QgsProperty.fromExpression('-"offset_sidewalk_right"'), 'OUTPUT': 'memory:'})['OUTPUT']
-
-        #TODO: offset als Attribut überschreiben
-        #eigenständige Attribute ableiten
-
-        layer.updateFields()
-
-    #derive attributes for offset ways
-    for side in ['left', 'right']:
-        for type in ['cycleway', 'sidewalk']:
-            layer_name = 'offset_' + type + '_' + side + '_layer'
-            exec("%s = %s" % ('offset_layer', layer_name))
-            with edit(offset_layer):
-                for feature in offset_layer.getFeatures():
-                    offset_layer.changeAttributeValue(feature.id(), id_offset, feature.attribute('offset_' + type + '_' + side))
-                    offset_layer.changeAttributeValue(feature.id(), id_type, type)
-                    offset_layer.changeAttributeValue(feature.id(), id_side, side)
-                    #this offset geometries are sidepath
-                    offset_layer.changeAttributeValue(feature.id(), id_proc_sidepath, 'yes')
-                    offset_layer.changeAttributeValue(feature.id(), id_proc_highway, feature.attribute('highway'))
-                    offset_layer.changeAttributeValue(feature.id(), id_proc_maxspeed, feature.attribute('maxspeed'))
-
-                    offset_layer.changeAttributeValue(feature.id(), offset_layer.fields().indexOf('width'), d.deriveAttribute(feature, 'width', type, side, 'float'))
-                    offset_layer.changeAttributeValue(feature.id(), offset_layer.fields().indexOf('oneway'), d.deriveAttribute(feature, 'oneway', type, side, 'str'))
-                    offset_layer.changeAttributeValue(feature.id(), offset_layer.fields().indexOf('oneway:bicycle'), d.deriveAttribute(feature, 'oneway:bicycle', type, side, 'str'))
-                    offset_layer.changeAttributeValue(feature.id(), offset_layer.fields().indexOf('traffic_sign'), d.deriveAttribute(feature, 'traffic_sign', type, side, 'str'))
-
-                    #surface and smoothness of cycle lanes are usually the same as on the road (if not explicitely tagged)
-                    if type != 'cycleway' or (type == 'cycleway' and ((feature.attribute('cycleway:' + side) == 'track' or feature.attribute('cycleway:both') == 'track' or feature.attribute('cycleway') == 'track') or feature.attribute(type + ':' + side + ':surface') != NULL or feature.attribute(type + ':both:surface') != NULL or feature.attribute(type + ':surface') != NULL)):
-                        offset_layer.changeAttributeValue(feature.id(), offset_layer.fields().indexOf('surface'), d.deriveAttribute(feature, 'surface', type, side, 'str'))
-                    if type != 'cycleway' or (type == 'cycleway' and ((feature.attribute('cycleway:' + side) == 'track' or feature.attribute('cycleway:both') == 'track' or feature.attribute('cycleway') == 'track') or feature.attribute(type + ':' + side + ':smoothness') != NULL or feature.attribute(type + ':both:smoothness') != NULL or feature.attribute(type + ':smoothness') != NULL)):
-                        offset_layer.changeAttributeValue(feature.id(), offset_layer.fields().indexOf('smoothness'), d.deriveAttribute(feature, 'smoothness', type, side, 'str'))
-
-                    if type == 'cycleway':
-                        offset_layer.changeAttributeValue(feature.id(), offset_layer.fields().indexOf('separation'), d.deriveAttribute(feature, 'separation', type, side, 'str'))
-                        offset_layer.changeAttributeValue(feature.id(), offset_layer.fields().indexOf('separation:both'), d.deriveAttribute(feature, 'separation:both', type, side, 'str'))
-                        offset_layer.changeAttributeValue(feature.id(), offset_layer.fields().indexOf('separation:left'), d.deriveAttribute(feature, 'separation:left', type, side, 'str'))
-                        offset_layer.changeAttributeValue(feature.id(), offset_layer.fields().indexOf('separation:right'), d.deriveAttribute(feature, 'separation:right', type, side, 'str'))
+                        offset_sidewalk_right = d.getNumber(p.offset_distance)
+                    layer.changeAttributeValue(feature.id(), id_offset_sidewalk_right, offset_sidewalk_right)
+
+            d.runAlgorithm('qgis:selectbyexpression', {'INPUT' : layer, 'EXPRESSION' : '\"offset_cycleway_left\" IS NOT NULL'})
+            offset_cycleway_left_layer = d.runProcessing('native:offsetline', {'INPUT': QgsProcessingFeatureSourceDefinition(layer.id(), selectedFeaturesOnly=True), 'DISTANCE': QgsProperty.fromExpression('"offset_cycleway_left"')}, 'offset_cycleway_left', intermediate_dir)
+            d.runAlgorithm('qgis:selectbyexpression', {'INPUT' : layer, 'EXPRESSION' : '\"offset_cycleway_right\" IS NOT NULL'})
+            offset_cycleway_right_layer = d.runProcessing('native:offsetline', {'INPUT': QgsProcessingFeatureSourceDefinition(layer.id(), selectedFeaturesOnly=True), 'DISTANCE': QgsProperty.fromExpression('-"offset_cycleway_right"')}, 'offset_cycleway_right', intermediate_dir)
+            d.runAlgorithm('qgis:selectbyexpression', {'INPUT' : layer, 'EXPRESSION' : '\"offset_sidewalk_left\" IS NOT NULL'})
+            offset_sidewalk_left_layer = d.runProcessing('native:offsetline', {'INPUT': QgsProcessingFeatureSourceDefinition(layer.id(), selectedFeaturesOnly=True), 'DISTANCE': QgsProperty.fromExpression('"offset_sidewalk_left"')}, 'offset_sidewalk_left', intermediate_dir)
+            d.runAlgorithm('qgis:selectbyexpression', {'INPUT' : layer, 'EXPRESSION' : '\"offset_sidewalk_right\" IS NOT NULL'})
+            offset_sidewalk_right_layer = d.runProcessing('native:offsetline', {'INPUT': QgsProcessingFeatureSourceDefinition(layer.id(), selectedFeaturesOnly=True), 'DISTANCE': QgsProperty.fromExpression('-"offset_sidewalk_right"')}, 'offset_sidewalk_right', intermediate_dir)
+
+            #TODO: offset als Attribut überschreiben
+            #eigenständige Attribute ableiten
+
+            layer.updateFields()
+
+        #derive attributes for offset ways
+        #side specific attributes are resolved once per feature (see d.getSideView)
+        offset_key_dict = {
+            'cycleway': ['width', 'oneway', 'oneway:bicycle', 'traffic_sign', 'surface', 'smoothness', 'separation', 'separation:both', 'separation:left', 'separation:right', 'buffer', 'buffer:both', 'buffer:left', 'buffer:right', 'traffic_mode:both', 'traffic_mode:left', 'traffic_mode:right', 'surface:colour'],
+            'sidewalk': ['width', 'oneway', 'oneway:bicycle', 'traffic_sign', 'surface', 'smoothness']
+        }
+        offset_layer_dict = {
+            'cycleway': {'left': offset_cycleway_left_layer, 'right': offset_cycleway_right_layer},
+            'sidewalk': {'left': offset_sidewalk_left_layer, 'right': offset_sidewalk_right_layer}
+        }
+        for side in ['left', 'right']:
+            for type in ['cycleway', 'sidewalk']:
+                offset_layer = offset_layer_dict[type][side]
+                offset_field_ids = {key: offset_layer.fields().indexOf(key) for key in offset_key_dict[type]}
+                with edit(offset_layer):
+                    for feature in offset_layer.getFeatures():
+                        offset_layer.changeAttributeValue(feature.id(), id_offset, feature.attribute('offset_' + type + '_' + side))
+                        offset_layer.changeAttributeValue(feature.id(), id_type, type)
+                        offset_layer.changeAttributeValue(feature.id(), id_side, side)
+                        #this offset geometries are sidepath
+                        offset_layer.changeAttributeValue(feature.id(), id_proc_sidepath, 'yes')
+                        offset_layer.changeAttributeValue(feature.id(), id_proc_highway, d.encodeValue(categories['proc_highway'], feature.attribute('highway')))
+                        offset_layer.changeAttributeValue(feature.id(), id_proc_maxspeed, feature.attribute('maxspeed'))
+
+                        side_view = d.getSideView(feature, type, offset_key_dict[type], side_list=[side])[side]
+                        #surface and smoothness of cycle lanes are usually the same as on the road (if not explicitely tagged)
+                        cycleway_track = type == 'cycleway' and (feature.attribute('cycleway:' + side) == 'track' or feature.attribute('cycleway:both') == 'track' or feature.attribute('cycleway') == 'track')
+                        for key in offset_key_dict[type]:
+                            if key in ['surface', 'smoothness'] and type == 'cycleway' and not cycleway_track and side_view[key] == NULL:
+                                continue
+                            offset_layer.changeAttributeValue(feature.id(), offset_field_ids[key], d.getTypedValue(side_view[key], 'float' if key == 'width' else 'str'))
+
+        #TODO: Attribute mit "both" auf left und right aufteilen?
+
+        #TODO: clean up offset layers
+
+        #merge vanilla and offset layers
+        layer_centerline = layer
+        layer = d.runProcessing('native:mergevectorlayers', {'LAYERS' : [layer_centerline, offset_cycleway_left_layer, offset_cycleway_right_layer, offset_sidewalk_left_layer, offset_sidewalk_right_layer]}, 'merged', intermediate_dir)
+
+        #release intermediate layers that are not needed anymore
+        d.releaseContextLayer(layer_centerline)
+        del layer_centerline, offset_layer, offset_layer_dict, offset_cycleway_left_layer, offset_cycleway_right_layer, offset_sidewalk_left_layer, offset_sidewalk_right_layer
+        if checkpoint_prefix:
+            d.saveCheckpoint(checkpoint_prefix, 2, layer, categories)
 
-                        offset_layer.changeAttributeValue(feature.id(), offset_layer.fields().indexOf('buffer'), d.deriveAttribute(feature, 'buffer', type, side, 'str'))
-                        offset_layer.changeAttributeValue(feature.id(), offset_layer.fields().indexOf('buffer:both'), d.deriveAttribute(feature, 'buffer:both', type, side, 'str'))
-                        offset_layer.changeAttributeValue(feature.id(), offset_layer.fields().indexOf('buffer:left'), d.deriveAttribute(feature, 'buffer:left', type, side, 'str'))
-                        offset_layer.changeAttributeValue(feature.id(), offset_layer.fields().indexOf('buffer:right'), d.deriveAttribute(feature, 'buffer:right', type, side, 'str'))
-
-                        offset_layer.changeAttributeValue(feature.id(), offset_layer.fields().indexOf('traffic_mode:both'), d.deriveAttribute(feature, 'traffic_mode:both', type, side, 'str'))
-                        offset_layer.changeAttributeValue(feature.id(), offset_layer.fields().indexOf('traffic_mode:left'), d.deriveAttribute(feature, 'traffic_mode:left', type, side, 'str'))
-                        offset_layer.changeAttributeValue(feature.id(), offset_layer.fields().indexOf('traffic_mode:right'), d.deriveAttribute(feature, 'traffic_mode:right', type, side, 'str'))
-
-                        offset_layer.changeAttributeValue(feature.id(), offset_layer.fields().indexOf('surface:colour'), d.deriveAttribute(feature, 'surface:colour', type, side, 'str'))
-
-    #TODO: Attribute mit "both" auf left und right aufteilen?
-
-    #TODO: clean up offset layers
-
-    #merge vanilla and offset layers
-    layer = processing.run('native:mergevectorlayers', {'LAYERS' : [layer, offset_cycleway_left_layer, offset_cycleway_right_layer, offset_sidewalk_left_layer, offset_sidewalk_right_layer], 'OUTPUT': 'memory:'})['OUTPUT']
 
 
 
@@ -508,182 +596,31 @@ else:
     #3: Determine way type for every way segment #
     #--------------------------------------------#
 
-    print(time.strftime('%H:%M:%S', time.localtime()), 'Determine way type...')
-    with edit(layer):
-        for feature in layer.getFeatures():
+    if checkpoint_stage < 3:
+        print(time.strftime('%H:%M:%S', time.localtime()), 'Determine way type...')
+        d.setProgress(progress, 'way type', 0)
+        #the way type is derived from a rule table (see classification.py), that is compiled to a lookup structure once
+        way_type_classifier = c.compileRules(c.way_type_rules)
+        with edit(layer):
+            for feature in layer.getFeatures():
+                way_type = c.classifyWayType(feature, way_type_classifier)
+                #exclude segments with no (public) bicycle access
+                if way_type == c.delete_feature:
+                    layer.deleteFeature(feature.id())
+                elif way_type:
+                    layer.changeAttributeValue(feature.id(), id_way_type, d.encodeValue(categories['way_type'], way_type))
 
-            #exclude segments with no public bicycle access
-            if d.getAccess(feature, 'bicycle') and d.getAccess(feature, 'bicycle') not in ['yes', 'permissive', 'designated', 'use_sidepath', 'optional_sidepath', 'discouraged']:
-                layer.deleteFeature(feature.id())
+            layer.updateFields()
 
-            #exclude informal paths without explicit bicycle access
-            if feature.attribute('highway') == 'path' and feature.attribute('informal') == 'yes' and feature.attribute('bicycle') == NULL:
-                layer.deleteFeature(feature.id())
+        if print_rule_statistics:
+            print(time.strftime('%H:%M:%S', time.localtime()), '   Way type rule statistics:')
+            for rule, hits in c.getRuleStatistics(way_type_classifier):
+                print('      ' + str(hits) + ' x ' + rule)
+        if checkpoint_prefix:
+            d.saveCheckpoint(checkpoint_prefix, 3, layer, categories)
+        if session != None:
+            session['layer_step3'] = layer.materialize(QgsFeatureRequest())
 
-            way_type = ''
-            highway = feature.attribute('highway')
-            segregated = feature.attribute('segregated')
-
-            bicycle = feature.attribute('bicycle')
-            foot = feature.attribute('foot')
-            vehicle = feature.attribute('vehicle')
-            is_sidepath = feature.attribute('is_sidepath')
-
-            #before determining the way type according to highway tagging, first check for some specific way types that are tagged independend from "highway":
-            if feature.attribute('bicycle_road') == 'yes':
-                #features with a "side" attribute are representing a cycleway or footway adjacent to the road with offset geometry - treat them as separate path, not as a bicycle road
-                side = feature.attribute('side')
-                if not side:
-                    way_type = 'bicycle road'
-            if feature.attribute('footway') == 'link' or feature.attribute('cycleway') == 'link' or feature.attribute('path') == 'link' or feature.attribute('bridleway') == 'link':
-                way_type = 'link'
-            if feature.attribute('footway') == 'crossing' or feature.attribute('cycleway') == 'crossing' or feature.attribute('path') == 'crossing' or feature.attribute('bridleway') == 'crossing':
-                way_type = 'crossing'
-
-            #for all other cases: derive way type according to their primary "highway" tagging:
-            if way_type == '':
-                #for footways (with bicycle access):
-                if highway in ['footway', 'pedestrian', 'bridleway', 'steps']:
-                    if bicycle in ['yes', 'designated', 'permissive']:
-                        way_type = 'shared footway'
-                    else:
-                        layer.deleteFeature(feature.id()) #don't process ways with restricted bicycle access
-
-                #for path:
-                elif highway == 'path':
-                    if foot == 'designated' and bicycle != 'designated':
-                        way_type = 'shared footway'
-                    else:
-                        if segregated == 'yes':
-                            way_type = 'segregated path'
-                        else:
-                            way_type = 'shared path'
-
-                #for cycleways:
-                elif highway == 'cycleway':
-                    if foot in ['yes', 'designated', 'permissive']:
-                        way_type = 'shared path'
-                    else:
-                        separation_foot = d.deriveSeparation(feature, 'foot')
-                        if separation_foot == 'no':
-                            way_type = 'segregated path'
-                        else:
-                            if not is_sidepath in ['yes', 'no']:
-                                #Use the geometrically determined sidepath value, if is_sidepath isn't specified
-                                if feature.attribute('proc_sidepath') == 'yes':
-                                    way_type = 'cycle track'
-                                else:
-                                    way_type = 'cycle path'
-
-                            elif is_sidepath == 'yes':
-                                separation_motor_vehicle = d.deriveSeparation(feature, 'motor_vehicle')
-                                if not separation_motor_vehicle in [NULL, 'no', 'none']:
-                                    if 'kerb' in separation_motor_vehicle or 'tree_row' in separation_motor_vehicle:
-                                        way_type = 'cycle track'
-                                    else:
-                                        way_type = 'cycle lane (protected)'
-                                else:
-                                    way_type = 'cycle track'
-                            else:
-                                way_type = 'cycle path'
-
-                #for service roads/tracks:
-                elif highway == 'service' or highway == 'track':
-                    way_type = 'track or service'
-
-                #for regular roads:
-                else:
-                    cycleway = feature.attribute('cycleway')
-                    cycleway_both = feature.attribute('cycleway:both')
-                    cycleway_left = feature.attribute('cycleway:left')
-                    cycleway_right = feature.attribute('cycleway:right')
-                    bicycle = feature.attribute('bicycle')
-                    side = feature.attribute('side') #features with a "side" attribute are representing a cycleway or footway adjacent to the road with offset geometry
-                    #if this feature don't represent a cycle lane, it's a center line representing the shared road
-                    if not side:
-                        #distinguish shared roads (without lane markings) and shared traffic lanes (with lane markings)
-                        #(assume that there are lane markings on primary and secondary roads, even if not tagged explicitely)
-                        lane_markings = feature.attribute('lane_markings')
-                        if lane_markings == 'yes' or (lane_markings != 'yes' and highway in ['motorway', 'trunk', 'primary', 'secondary']):
-                            way_type = 'shared traffic lane'
-                        else:
-                            way_type = 'shared road'
-                    else:
-                        type = feature.attribute('type')
-                        if type == 'sidewalk':
-                            way_type = 'shared footway'
-                        else:
-                            #for cycle lanes
-                            if cycleway == 'lane' or cycleway_both == 'lane' or (side == 'right' and cycleway_right == 'lane') or (side == 'left' and cycleway_left == 'lane'):
-                                cycleway_lanes = feature.attribute('cycleway:lanes')
-                                if cycleway_lanes and 'no|lane|no' in cycleway_lanes:
-                                    way_type = 'cycle lane (central)'
-                                else:
-                                    separation_motor_vehicle = d.deriveSeparation(feature, 'motor_vehicle')
-                                    if not separation_motor_vehicle in [NULL, 'no', 'none']:
-                                        way_type = 'cycle lane (protected)'
-                                    else:
-                                        cycleway_lane = feature.attribute('cycleway:lane')
-                                        cycleway_both_lane = feature.attribute('cycleway:both:lane')
-                                        cycleway_left_lane = feature.attribute('cycleway:left:lane')
-                                        cycleway_right_lane = feature.attribute('cycleway:right:lane')
-                                        if cycleway_lane == 'exclusive' or cycleway_both_lane == 'exclusive' or (side == 'right' and cycleway_right_lane == 'exclusive') or (side == 'left' and cycleway_left_lane == 'exclusive'):
-                                            way_type = 'cycle lane (exclusive)'
-                                        else:
-                                            way_type = 'cycle lane (advisory)'
-                            #for cycle tracks
-                            elif cycleway == 'track' or cycleway_both == 'track' or (side == 'right' and cycleway_right == 'track') or (side == 'left' and cycleway_left == 'track'):
-                                cycleway_foot = feature.attribute('cycleway:foot')
-                                cycleway_both_foot = feature.attribute('cycleway:both:foot')
-                                cycleway_left_foot = feature.attribute('cycleway:left:foot')
-                                cycleway_right_foot = feature.attribute('cycleway:right:foot')
-                                if cycleway_foot in ['yes', 'designated', 'permissive'] or cycleway_both_foot in ['yes', 'designated', 'permissive'] or (side == 'right' and cycleway_right_foot in ['yes', 'designated', 'permissive']) or (side == 'left' and cycleway_left_foot in ['yes', 'designated', 'permissive']):
-                                    way_type = 'shared path'
-                                else:
-                                    cycleway_segregated = feature.attribute('cycleway:segregated')
-                                    cycleway_both_segregated = feature.attribute('cycleway:both:segregated')
-                                    cycleway_left_segregated = feature.attribute('cycleway:left:segregated')
-                                    cycleway_right_segregated = feature.attribute('cycleway:right:segregated')
-                                    if cycleway_segregated == 'yes' or cycleway_both_segregated == 'yes' or (side == 'right' and cycleway_right_segregated == 'yes') or (side == 'left' and cycleway_left_segregated == 'yes'):
-                                        way_type = 'segregated path'
-                                    elif cycleway_segregated == 'no' or cycleway_both_segregated == 'no' or (side == 'right' and cycleway_right_segregated == 'no') or (side == 'left' and cycleway_left_segregated == 'no'):
-                                        way_type = 'shared path'
-                                    else:
-                                        separation_foot = d.deriveSeparation(feature, 'foot')
-                                        if separation_foot == 'no':
-                                            way_type = 'segregated path'
-                                        else:
-                                            separation_motor_vehicle = d.deriveSeparation(feature, 'motor_vehicle')
-                                            if not separation_motor_vehicle in [NULL, 'no', 'none']:
-                                                if 'kerb' in separation_motor_vehicle or 'tree_row' in separation_motor_vehicle:
-                                                    way_type = 'cycle track'
-                                                else:
-                                                    way_type = 'cycle lane (protected)'
-                                            else:
-                                                way_type = 'cycle track'
-                            #for shared bus lanes
-                            elif cycleway == 'share_busway' or cycleway_both == 'share_busway' or (side == 'right' and cycleway_right == 'share_busway') or (side == 'left' and cycleway_left == 'share_busway'):
-                                way_type = 'shared bus lane'
-                            #for other vales - no cycle way
-                            else:
-                                sidewalk_bicycle = feature.attribute('sidewalk:bicycle')
-                                sidewalk_both_bicycle = feature.attribute('sidewalk:both:bicycle')
-                                sidewalk_left_bicycle = feature.attribute('sidewalk:left:bicycle')
-                                sidewalk_right_bicycle = feature.attribute('sidewalk:right:bicycle')
-                                if sidewalk_bicycle == 'yes' or sidewalk_both_bicycle == 'yes' or (side == 'right' and sidewalk_right_bicycle == 'yes') or (side == 'left' and sidewalk_left_bicycle == 'yes'):
-                                    way_type = 'shared footway'
-                                else:
-                                    lane_markings = feature.attribute('lane_markings')
-                                    if lane_markings == 'yes' or (lane_markings != 'yes' and highway in ['primary', 'secondary']):
-                                        way_type = 'shared traffic lane'
-                                    else:
-                                        way_type = 'shared road'
-            if way_type == '':
-                way_type = NULL
-            else:
-                layer.changeAttributeValue(feature.id(), id_way_type, way_type)
-
-        layer.updateFields()
 
 
 
@@ -692,12 +629,27 @@ else:
     #----------------------------------------------------#
 
     print(time.strftime('%H:%M:%S', time.localtime()), 'Derive attributes/calculate index...')
+    d.setProgress(progress, 'attributes and index', 0)
+    feature_count = layer.featureCount()
+    #input values for the vectorized index calculation
+    scoring_columns = s.createScoringColumns()
+    #membership tests for way types are done with sets
+    cycle_lane_way_types = {'cycle lane (advisory)', 'cycle lane (exclusive)', 'cycle lane (protected)', 'cycle lane (central)'}
+    #missing values, bonus and malus are collected as bit masks and only decoded to strings for the output
+    missing_bits = d.flag_tables['data_missing']['bits']
+    bonus_bits = d.flag_tables['data_bonus']['bits']
+    malus_bits = d.flag_tables['data_malus']['bits']
+    #separate attributes for single missing values are only set if needed
+    data_missing_field_list = [(missing_bits[value], layer.fields().indexOf('data_missing_' + value)) for value in ['width', 'surface', 'smoothness', 'maxspeed', 'parking', 'lit'] if 'data_missing_' + value in required_attributes]
     with edit(layer):
-        for feature in layer.getFeatures():
-            way_type = feature.attribute('way_type')
+        for feature_index, feature in enumerate(layer.getFeatures()):
+            if feature_index % 1000 == 0:
+                d.setProgress(progress, 'attributes and index', feature_index / feature_count)
+            way_type = d.decodeValue(categories['way_type'], feature.attribute('way_type'))
             side = feature.attribute('side')
             is_sidepath = feature.attribute('proc_sidepath')
-            data_missing = ''
+            data_missing = 0
+            data_missing_repeated = 0 #missing values added a second time (they are weighted twice for the data incompleteness)
 
             #-------------
             #Derive oneway status. Can be one of the values in oneway_value_list (oneway applies to all vehicles, also for bicycles) or '*_motor_vehicles' (value applies to motor vehicles only)
@@ -708,15 +660,15 @@ else:
             oneway = feature.attribute('oneway')
             oneway_bicycle = feature.attribute('oneway:bicycle')
             cycleway_oneway = feature.attribute('cycleway:oneway')
-            if way_type in ['cycle path', 'cycle track', 'shared path', 'segregated path', 'shared footway', 'crossing', 'link', 'cycle lane (advisory)', 'cycle lane (exclusive)', 'cycle lane (protected)', 'cycle lane (central)']:
+            if way_type in {'cycle path', 'cycle track', 'shared path', 'segregated path', 'shared footway', 'crossing', 'link', 'cycle lane (advisory)', 'cycle lane (exclusive)', 'cycle lane (protected)', 'cycle lane (central)'}:
                 if oneway in oneway_value_list:
                     proc_oneway = oneway
                 elif cycleway_oneway in oneway_value_list:
                     proc_oneway = cycleway_oneway
                 else:
-                    if way_type in ['cycle track', 'shared path', 'shared footway'] and side:
+                    if way_type in {'cycle track', 'shared path', 'shared footway'} and side:
                         proc_oneway = p.default_oneway_cycle_track
-                    elif 'cycle lane' in way_type:
+                    elif way_type in cycle_lane_way_types:
                         proc_oneway = p.default_oneway_cycle_lane
                     else:
                         proc_oneway = 'no'
@@ -724,7 +676,7 @@ else:
                     proc_oneway = oneway_bicycle
             if way_type == 'shared bus lane':
                 proc_oneway = 'yes' #shared bus lanes are represented by own geometry for the lane, and lanes are for oneway use only (usually)
-            if way_type in ['shared road', 'shared traffic lane', 'bicycle road', 'track or service']:
+            if way_type in {'shared road', 'shared traffic lane', 'bicycle road', 'track or service'}:
                 if not oneway_bicycle or oneway == oneway_bicycle:
                     if oneway in oneway_value_list:
                         proc_oneway = oneway
@@ -740,20 +692,21 @@ else:
                         proc_oneway = 'yes'
             if not proc_oneway:
                 proc_oneway = 'unknown'
-            layer.changeAttributeValue(feature.id(), id_proc_oneway, proc_oneway)
+            proc_oneway_code = d.encodeValue(categories['proc_oneway'], proc_oneway)
+            layer.changeAttributeValue(feature.id(), id_proc_oneway, proc_oneway_code)
 
             #-------------
             #Derive width. Use explicitely tagged attributes, derive from other attributes or use default values.
             #-------------
 
             proc_width = NULL
-            if way_type in ['cycle path', 'cycle track', 'shared path', 'shared footway', 'crossing', 'link', 'cycle lane (advisory)', 'cycle lane (exclusive)', 'cycle lane (protected)', 'cycle lane (central)']:
+            if way_type in {'cycle path', 'cycle track', 'shared path', 'shared footway', 'crossing', 'link', 'cycle lane (advisory)', 'cycle lane (exclusive)', 'cycle lane (protected)', 'cycle lane (central)'}:
                 #width for cycle lanes and sidewalks have already been derived from original tags when calculating way offsets
                 proc_width = d.getNumber(feature.attribute('cycleway:width')) #check for cycleway:width first for cases, where segregated isn't tagged correctly
                 if not proc_width:
                     proc_width = d.getNumber(feature.attribute('width'))
                     if not proc_width:
-                        if way_type in ['cycle path', 'shared path', 'cycle lane (protected)']:
+                        if way_type in {'cycle path', 'shared path', 'cycle lane (protected)'}:
                             proc_width = p.default_highway_width_dict['path']
                         elif way_type == 'shared footway':
                             proc_width = p.default_highway_width_dict['footway']
@@ -761,8 +714,7 @@ else:
                             proc_width = p.default_highway_width_dict['cycleway']
                         if proc_width and proc_oneway == 'no':
                             proc_width *= 1.6 #default values are for oneways - if the way isn't a oneway, widen the default
-                        data_missing = d.addDelimitedValue(data_missing, 'width')
-                        layer.changeAttributeValue(feature.id(), id_data_missing_width, 1)
+                        data_missing |= missing_bits['width']
             if way_type == 'segregated path':
                 highway = feature.attribute('highway')
                 if highway == 'path':
@@ -775,8 +727,7 @@ else:
                                 proc_width = width - footway_width
                             else:
                                 proc_width = width / 2
-                        data_missing = d.addDelimitedValue(data_missing, 'width')
-                        layer.changeAttributeValue(feature.id(), id_data_missing_width, 1)
+                        data_missing |= missing_bits['width']
 
                 else:
                     proc_width = d.getNumber(feature.attribute('width'))
@@ -784,11 +735,11 @@ else:
                     proc_width = p.default_highway_width_dict['path']
                     if proc_oneway == 'no':
                         proc_width *= 1.6
-                    data_missing = d.addDelimitedValue(data_missing, 'width')
-                    layer.changeAttributeValue(feature.id(), id_data_missing_width, 1)
-            if way_type in ['shared road', 'shared traffic lane', 'shared bus lane', 'bicycle road', 'track or service']:
+                    data_missing_repeated |= data_missing & missing_bits['width']
+                    data_missing |= missing_bits['width']
+            if way_type in {'shared road', 'shared traffic lane', 'shared bus lane', 'bicycle road', 'track or service'}:
                 #on shared traffic or bus lanes, use a width value based on lane width, not on carriageway width
-                if way_type in ['shared traffic lane', 'shared bus lane']:
+                if way_type in {'shared traffic lane', 'shared bus lane'}:
                     width_lanes = feature.attribute('width:lanes')
                     width_lanes_forward = feature.attribute('width:lanes:forward')
                     width_lanes_backward = feature.attribute('width:lanes:backward')
@@ -805,7 +756,7 @@ else:
                             proc_width = p.default_width_bus_lane
                         else:
                             proc_width = p.default_width_traffic_lane
-                            data_missing = d.addDelimitedValue(data_missing, 'width:lanes')
+                            data_missing |= missing_bits['width:lanes']
 
                 if not proc_width:
                     #effective width (usable width of a road for flowing traffic) can be mapped explicitely
@@ -915,49 +866,18 @@ else:
                                     cycleway_left_width = cycleway_both_width
 
                             #cycleway buffers must also be subtracted from the road width
-                            cycleway_buffer = feature.attribute('cycleway:buffer')
-                            cycleway_left_buffer = feature.attribute('cycleway:left:buffer')
-                            cycleway_right_buffer = feature.attribute('cycleway:right:buffer')
-                            cycleway_both_buffer = feature.attribute('cycleway:both:buffer')
-                            cycleway_buffer_left = feature.attribute('cycleway:buffer:left')
-                            cycleway_left_buffer_left = feature.attribute('cycleway:left:buffer:left')
-                            cycleway_right_buffer_left = feature.attribute('cycleway:right:buffer:left')
-                            cycleway_both_buffer_left = feature.attribute('cycleway:both:buffer:left')
-                            cycleway_buffer_right = feature.attribute('cycleway:buffer:right')
-                            cycleway_left_buffer_right = feature.attribute('cycleway:left:buffer:right')
-                            cycleway_right_buffer_right = feature.attribute('cycleway:right:buffer:right')
-                            cycleway_both_buffer_right = feature.attribute('cycleway:both:buffer:right')
-                            cycleway_buffer_both = feature.attribute('cycleway:buffer:both')
-                            cycleway_left_buffer_both = feature.attribute('cycleway:left:buffer:both')
-                            cycleway_right_buffer_both = feature.attribute('cycleway:right:buffer:both')
-                            cycleway_both_buffer_both = feature.attribute('cycleway:both:buffer:both')
+                            cycleway_view = d.getSideView(feature, 'cycleway', [], ['buffer'])
 
                             if cycleway_right == 'lane':
                                 if not cycleway_right_width:
                                     cycleway_right_width = p.default_width_cycle_lane
-                                for buffer_tag in [cycleway_right_buffer_left, cycleway_right_buffer_both, cycleway_right_buffer, cycleway_both_buffer_left, cycleway_both_buffer_both, cycleway_both_buffer, cycleway_buffer_left, cycleway_buffer_both, cycleway_buffer]:
-                                    if not cycleway_right_buffer_left:
-                                        cycleway_right_buffer_left = buffer_tag
-                                    else:
-                                        break
-                                for buffer_tag in [cycleway_right_buffer_right, cycleway_right_buffer_both, cycleway_right_buffer, cycleway_both_buffer_right, cycleway_both_buffer_both, cycleway_both_buffer, cycleway_buffer_right, cycleway_buffer_both, cycleway_buffer]:
-                                    if not cycleway_right_buffer_right:
-                                        cycleway_right_buffer_right = buffer_tag
-                                    else:
-                                        break
+                                cycleway_right_buffer_left = cycleway_view['right']['buffer:left']
+                                cycleway_right_buffer_right = cycleway_view['right']['buffer:right']
                             if cycleway_left == 'lane':
                                 if not cycleway_left_width:
                                     cycleway_left_width = p.default_width_cycle_lane
-                                for buffer_tag in [cycleway_left_buffer_left, cycleway_left_buffer_both, cycleway_left_buffer, cycleway_both_buffer_left, cycleway_both_buffer_both, cycleway_both_buffer, cycleway_buffer_left, cycleway_buffer_both, cycleway_buffer]:
-                                    if not cycleway_left_buffer_left:
-                                        cycleway_left_buffer_left = buffer_tag
-                                    else:
-                                        break
-                                for buffer_tag in [cycleway_left_buffer_right, cycleway_left_buffer_both, cycleway_left_buffer, cycleway_both_buffer_right, cycleway_both_buffer_both, cycleway_both_buffer, cycleway_buffer_right, cycleway_buffer_both, cycleway_buffer]:
-                                    if not cycleway_left_buffer_right:
-                                        cycleway_left_buffer_right = buffer_tag
-                                    else:
-                                        break
+                                cycleway_left_buffer_left = cycleway_view['left']['buffer:left']
+                                cycleway_left_buffer_right = cycleway_view['left']['buffer:right']
                         if not cycleway_right_width:
                             cycleway_right_width = 0
                         if not cycleway_left_width:
@@ -981,8 +901,7 @@ else:
                             #assume that oneway roads are narrower
                             if 'yes' in proc_oneway:
                                 width = round(width / 1.6, 1)
-                            data_missing = d.addDelimitedValue(data_missing, 'width')
-                            layer.changeAttributeValue(feature.id(), id_data_missing_width, 1)
+                            data_missing |= missing_bits['width']
 
                         buffer = d.getNumber(cycleway_right_buffer_left) + d.getNumber(cycleway_right_buffer_right) + d.getNumber(cycleway_left_buffer_left) + d.getNumber(cycleway_left_buffer_right)
                         proc_width = width - d.getNumber(cycleway_right_width) - d.getNumber(cycleway_left_width) - buffer
@@ -1000,11 +919,10 @@ else:
                                     proc_width = min(proc_width, 4)
                                 #mark "parking" as a missing value if there are no parking tags on regular roads
                                 #TODO: Differentiate between inner and outer urban areas/city limits - out of cities, there is usually no need to map street parking
-                                data_missing = d.addDelimitedValue(data_missing, 'parking')
-                                layer.changeAttributeValue(feature.id(), id_data_missing_parking, 1)
+                                data_missing |= missing_bits['parking']
 
                         #if width was derived from a default, the result should not be less than the default width of a motorcar lane
-                        if proc_width < p.default_width_traffic_lane and 'width' in data_missing:
+                        if proc_width < p.default_width_traffic_lane and data_missing & missing_bits['width']:
                             proc_width = p.default_width_traffic_lane
 
             if not proc_width:
@@ -1043,8 +961,7 @@ else:
                                 proc_surface = p.default_highway_surface_dict[highway]
                             else:
                                 proc_surface = p.default_highway_surface_dict['path']
-                            data_missing = d.addDelimitedValue(data_missing, 'surface')
-                            layer.changeAttributeValue(feature.id(), id_data_missing_surface, 1)
+                            data_missing |= missing_bits['surface']
                     if not proc_smoothness:
                         proc_smoothness = feature.attribute('cycleway:smoothness')
                         if not proc_smoothness:
@@ -1052,14 +969,13 @@ else:
                             if smoothness:
                                 proc_smoothness = smoothness
                             else:
-                                data_missing = d.addDelimitedValue(data_missing, 'smoothness')
-                                layer.changeAttributeValue(feature.id(), id_data_missing_smoothness, 1)
+                                data_missing |= missing_bits['smoothness']
 
                 else:
                     #surface and smoothness for cycle lanes and sidewalks have already been derived from original tags when calculating way offsets
                     proc_surface = feature.attribute('surface')
                     if not proc_surface:
-                        if way_type in ['cycle lane (advisory)', 'cycle lane (exclusive)', 'cycle lane (protected)', 'cycle lane (central)']:
+                        if way_type in cycle_lane_way_types:
                             proc_surface = p.default_cycleway_surface_lanes
                         elif way_type == 'cycle track':
                             proc_surface = p.default_cycleway_surface_tracks
@@ -1075,13 +991,11 @@ else:
                                 proc_surface = p.default_highway_surface_dict[highway]
                             else:
                                 proc_surface = p.default_highway_surface_dict['path']
-                        data_missing = d.addDelimitedValue(data_missing, 'surface')
-                        layer.changeAttributeValue(feature.id(), id_data_missing_surface, 1)
+                        data_missing |= missing_bits['surface']
                     if not proc_smoothness:
                         proc_smoothness = feature.attribute('smoothness')
                         if not proc_smoothness:
-                            data_missing = d.addDelimitedValue(data_missing, 'smoothness')
-                            layer.changeAttributeValue(feature.id(), id_data_missing_smoothness, 1)
+                            data_missing |= missing_bits['smoothness']
 
             #if more than one surface value is tagged (delimited by a semicolon), use the weakest one
             if ';' in proc_surface:
@@ -1091,8 +1005,10 @@ else:
             if proc_smoothness not in p.smoothness_factor_dict:
                 proc_smoothness = NULL
             
-            layer.changeAttributeValue(feature.id(), id_proc_surface, proc_surface)
-            layer.changeAttributeValue(feature.id(), id_proc_smoothness, proc_smoothness)
+            proc_surface_code = d.encodeValue(categories['proc_surface'], proc_surface)
+            proc_smoothness_code = d.encodeValue(categories['proc_smoothness'], proc_smoothness)
+            layer.changeAttributeValue(feature.id(), id_proc_surface, proc_surface_code)
+            layer.changeAttributeValue(feature.id(), id_proc_smoothness, proc_smoothness_code)
 
             #-------------
             #Derive (physical) separation and buffer.
@@ -1131,24 +1047,24 @@ else:
                 if not traffic_mode_left:
                     if way_type == 'cycle path':
                         traffic_mode_left = 'no'
-                    elif way_type in ['cycle track', 'shared path', 'segregated path', 'shared footway'] and is_sidepath == 'yes':
+                    elif way_type in {'cycle track', 'shared path', 'segregated path', 'shared footway'} and is_sidepath == 'yes':
                         if ((side == 'right' and parking_right and parking_right != 'no') or (side == 'left' and parking_left and parking_left != 'no')) and traffic_mode_right != 'parking':
                             traffic_mode_left = 'parking'
                         else:
                             traffic_mode_left = 'motor_vehicle'
-                    elif 'cycle lane' in way_type or way_type in ['shared road', 'shared traffic lane', 'shared bus lane', 'crossing']:
+                    elif way_type in cycle_lane_way_types or way_type in {'shared road', 'shared traffic lane', 'shared bus lane', 'crossing'}:
                         traffic_mode_left = 'motor_vehicle'
                 if not traffic_mode_right:
                     if way_type == 'cycle path':
                         traffic_mode_right = 'no'
                     elif way_type == 'crossing':
                         traffic_mode_right = 'motor_vehicle'
-                    elif 'cycle lane' in way_type:
+                    elif way_type in cycle_lane_way_types:
                         if ((side == 'right' and parking_right and parking_right != 'no') or (side == 'left' and parking_left and parking_left != 'no')) and traffic_mode_left != 'parking':
                             traffic_mode_right = 'parking'
                         else:
                             traffic_mode_right = 'foot'
-                    elif way_type in ['cycle track', 'shared path', 'segregated path', 'shared footway'] and is_sidepath == 'yes':
+                    elif way_type in {'cycle track', 'shared path', 'segregated path', 'shared footway'} and is_sidepath == 'yes':
                         traffic_mode_right = 'foot'
                 separation_left = feature.attribute('separation:left')
                 separation_right = feature.attribute('separation:right')
@@ -1228,54 +1144,59 @@ else:
             traffic_sign = feature.attribute('traffic_sign')
             proc_traffic_sign = traffic_sign
 
-            if way_type in ['bicycle road', 'shared road', 'shared traffic lane', 'track or service']:
-                #if cycle lanes are present, mark center line as "use sidepath"
-                if cycleway in ['lane', 'share_busway'] or cycleway_both in ['lane', 'share_busway'] or ('yes' in proc_oneway and cycleway_right in ['lane', 'share_busway']):
-                    proc_mandatory = 'use_sidepath'
-                #if tracks are present, mark center line as "optional sidepath" - as well as if "bicycle" is explicitely tagged as "optional_sidepath"
-                elif cycleway == 'track' or cycleway_both == 'track' or ('yes' in proc_oneway and cycleway_right == 'track'):
-                    proc_mandatory = 'optional_sidepath'
-                if bicycle in ['use_sidepath', 'optional_sidepath']:
-                    proc_mandatory = bicycle
-            else:
-                if is_sidepath == 'yes':
-                    #derive mandatory use from the presence of traffic signs
-                    if traffic_sign:
-                        traffic_sign = d.getDelimitedValues(traffic_sign.replace(',', ';'), ';', 'string')
-                        for sign in traffic_sign:
-                            for mandatory_sign in p.not_mandatory_traffic_sign_list:
-                                if mandatory_sign in sign:
-                                    proc_mandatory = 'no'
-                            for mandatory_sign in p.mandatory_traffic_sign_list:
-                                if mandatory_sign in sign:
-                                    proc_mandatory = 'yes'
-
-            #mark cycle prohibitions
-            highway = feature.attribute('highway')
-            if highway in p.cycling_highway_prohibition_list or bicycle == 'no':
-                proc_mandatory = 'prohibited'
-
-            layer.changeAttributeValue(feature.id(), id_proc_mandatory, proc_mandatory)
             layer.changeAttributeValue(feature.id(), id_proc_traffic_sign, proc_traffic_sign)
 
+            #mandatory use is only derived if it is needed for the output
+            if 'proc_mandatory' in required_attributes:
+                if way_type in {'bicycle road', 'shared road', 'shared traffic lane', 'track or service'}:
+                    #if cycle lanes are present, mark center line as "use sidepath"
+                    if cycleway in ['lane', 'share_busway'] or cycleway_both in ['lane', 'share_busway'] or ('yes' in proc_oneway and cycleway_right in ['lane', 'share_busway']):
+                        proc_mandatory = 'use_sidepath'
+                    #if tracks are present, mark center line as "optional sidepath" - as well as if "bicycle" is explicitely tagged as "optional_sidepath"
+                    elif cycleway == 'track' or cycleway_both == 'track' or ('yes' in proc_oneway and cycleway_right == 'track'):
+                        proc_mandatory = 'optional_sidepath'
+                    if bicycle in ['use_sidepath', 'optional_sidepath']:
+                        proc_mandatory = bicycle
+                else:
+                    if is_sidepath == 'yes':
+                        #derive mandatory use from the presence of traffic signs
+                        if traffic_sign:
+                            traffic_sign = d.getDelimitedValues(traffic_sign.replace(',', ';'), ';', 'string')
+                            for sign in traffic_sign:
+                                for mandatory_sign in p.not_mandatory_traffic_sign_list:
+                                    if mandatory_sign in sign:
+                                        proc_mandatory = 'no'
+                                for mandatory_sign in p.mandatory_traffic_sign_list:
+                                    if mandatory_sign in sign:
+                                        proc_mandatory = 'yes'
+
+                #mark cycle prohibitions
+                highway = feature.attribute('highway')
+                if highway in p.cycling_highway_prohibition_list or bicycle == 'no':
+                    proc_mandatory = 'prohibited'
+
+                layer.changeAttributeValue(feature.id(), id_proc_mandatory, proc_mandatory)
+
             #-------------
             #add extra attributes to easy filter non-usable segments or by way type
             #-------------
-            filter_usable = 1
-            if proc_mandatory in ['prohibited', 'use_sidepath']:
-                filter_usable = 0
-            layer.changeAttributeValue(feature.id(), id_filter_usable, filter_usable)
-
-            filter_way_type = NULL
-            if way_type in ['cycle path', 'cycle track', 'shared path', 'segregated path', 'shared footway', 'cycle lane (protected)']:
-                filter_way_type = 'separated'
-            elif way_type in ['cycle lane (advisory)', 'cycle lane (exclusive)', 'cycle lane (central)', 'link', 'crossing']:
-                filter_way_type = 'cycle lanes'
-            elif way_type == 'bicycle road':
-                filter_way_type = 'bicycle road'
-            elif way_type in ['shared road', 'shared traffic lane', 'shared bus lane', 'track or service']:
-                filter_way_type = 'shared traffic'
-            layer.changeAttributeValue(feature.id(), id_filter_way_type, filter_way_type)
+            if 'filter_usable' in required_attributes:
+                filter_usable = 1
+                if proc_mandatory in ['prohibited', 'use_sidepath']:
+                    filter_usable = 0
+                layer.changeAttributeValue(feature.id(), id_filter_usable, filter_usable)
+
+            if 'filter_way_type' in required_attributes:
+                filter_way_type = NULL
+                if way_type in {'cycle path', 'cycle track', 'shared path', 'segregated path', 'shared footway', 'cycle lane (protected)'}:
+                    filter_way_type = 'separated'
+                elif way_type in {'cycle lane (advisory)', 'cycle lane (exclusive)', 'cycle lane (central)', 'link', 'crossing'}:
+                    filter_way_type = 'cycle lanes'
+                elif way_type == 'bicycle road':
+                    filter_way_type = 'bicycle road'
+                elif way_type in {'shared road', 'shared traffic lane', 'shared bus lane', 'track or service'}:
+                    filter_way_type = 'shared traffic'
+                layer.changeAttributeValue(feature.id(), id_filter_way_type, d.encodeValue(categories['filter_way_type'], filter_way_type))
 
 
 
@@ -1283,9 +1204,10 @@ else:
             #5: Calculate index and factors #
             #-------------------------------#
 
-            #human readable strings for significant good or bad factors
-            data_bonus = ''
-            data_malus = ''
+            #human readable strings for significant good or bad factors (bit masks, see d.flag_tables)
+            data_bonus = 0
+            data_malus = 0
+            motor_vehicle_access = d.getAccess(feature, 'motor_vehicle')
             #------------------------------------
             #Set base index according to way type
             #------------------------------------
@@ -1294,102 +1216,163 @@ else:
             else:
                 base_index = NULL
             #on roads with restricted motor vehicle access, overwrite the base index with a access-specific base index
-            if way_type in ['bicycle road', 'shared road', 'shared traffic lane', 'track or service']:
-                motor_vehicle_access = d.getAccess(feature, 'motor_vehicle')
+            if way_type in {'bicycle road', 'shared road', 'shared traffic lane', 'track or service'}:
                 if motor_vehicle_access in p.motor_vehicle_access_index_dict:
                     base_index = p.motor_vehicle_access_index_dict[motor_vehicle_access]
-                    data_bonus = d.addDelimitedValue(data_bonus, 'motor vehicle restricted')
+                    data_bonus |= bonus_bits['motor vehicle restricted']
             layer.changeAttributeValue(feature.id(), id_base_index, base_index)
 
-            #--------------------------------------------
-            #Calculate width factor according to way type
-            #--------------------------------------------
-            calc_width = NULL
-            minimum_factor = 0
-            #for dedicated ways for cycling
-            if way_type not in ['bicycle road', 'shared road', 'shared traffic lane', 'shared bus lane', 'track or service'] or d.getAccess(feature, 'motor_vehicle') == 'no':
-                calc_width = proc_width
-                #calculated width depends on the width/space per driving direction
-                if calc_width and not 'yes' in proc_oneway:
-                    calc_width /= 1.6
-
-            #for shared roads and lanes
-            else:
-                calc_width = proc_width
-                minimum_factor = 0.25 #on shared roads, there is a minimum width factor, because in case of doubt, other vehicles have to pass careful or can't overtake
-                if calc_width:
-                    if way_type == 'shared traffic lane':
-                        calc_width = max(calc_width - 2 + ((4.5 - calc_width) / 3), 0)
-                    elif way_type == 'shared bus lane':
-                        calc_width = max(calc_width - 3 + ((5.5 - calc_width) / 3), 0)
-                    else:
-                        if not 'yes' in proc_oneway:
-                            calc_width /= 1.6
-                        #TODO: Use a global 'optimum road width' variable for this?
-                        calc_width -= 2 #on motor vehicle roads, optimum width is 2m for a car + 1m for bicycle + 1.5m safety distance -> exactly 2m more than the optimum width on cycleways. Simply subtract 2m from the processed width to get a comparable width value that can be used with the following width factor formula
-
-            #Calculate width factor (logistic regression)
-            if calc_width:
-                #factor should not be negative and not 0, since the following logistic regression isn't working for 0
-                calc_width = max(0.001, calc_width)
-                #regular formula
-                if calc_width <= 3 or way_type in ['bicycle road', 'shared road', 'shared traffic lane', 'shared bus lane', 'track or service']:
-                    fac_width = 1.1 / (1 + 20 * math.e ** (-2.1 * calc_width))
-                #formula for extra wide ways (not used for shared roads and lanes)
-                else:
-                    fac_width = 2 / (1 + 1.8 * math.e ** (-0.24 * calc_width))
+            #mark maxspeed value as missing, if the way segment is a sidepath or independent road (except for service, track or pedestrian segments where maxspeed isn't necessary)
+            proc_highway_code = feature.attribute('proc_highway')
+            proc_highway = d.decodeValue(categories['proc_highway'], proc_highway_code)
+            proc_maxspeed = feature.attribute('proc_maxspeed')
+            if not proc_maxspeed and way_type != 'track or service' and feature.attribute('proc_sidepath') != 'no' and proc_highway not in {'pedestrian', 'service', 'track'}:
+                data_missing |= missing_bits['maxspeed']
 
-                #on roads with restricted motor vehicle access, the width factor has a lower weight, because it can be assumed that there is less traffic that shares the road width
-                if way_type in ['bicycle road', 'shared road', 'shared traffic lane', 'track or service'] and motor_vehicle_access in p.motor_vehicle_access_index_dict:
-                    fac_width = fac_width + ((1 - fac_width) / 2)
+            #--------------------------------------------------------------------------
+            #Factor group 4: miscellaneous attributes can result in an other bonus or malus
+            #--------------------------------------------------------------------------
+            fac_4 = NULL
+            if base_index != NULL:
+                fac_4 = 1
 
-                fac_width = round(max(minimum_factor, fac_width), 3)
-            else:
-                fac_width = NULL
-
-            layer.changeAttributeValue(feature.id(), id_fac_width, fac_width)
-
-            if fac_width > 1:
-                data_bonus = d.addDelimitedValue(data_bonus, 'wide width')
-            if fac_width and fac_width <= 0.5:
-                data_malus = d.addDelimitedValue(data_malus, 'narrow width')
-
-            #---------------------------------------
-            #Calculate surface and smoothness factor
-            #---------------------------------------
-            if proc_smoothness and proc_smoothness in p.smoothness_factor_dict:
-                fac_surface = p.smoothness_factor_dict[proc_smoothness]
-            elif proc_surface and proc_surface in p.surface_factor_dict:
-                fac_surface = p.surface_factor_dict[proc_surface]
-
-            layer.changeAttributeValue(feature.id(), id_fac_surface, fac_surface)
-
-            if fac_surface > 1:
-                data_bonus = d.addDelimitedValue(data_bonus, 'excellent surface')
-            if fac_surface and fac_surface <= 0.5:
-                data_malus = d.addDelimitedValue(data_malus, 'bad surface')
-
-            #------------------------------------------------
-            #Calculate highway (sidepath) and maxspeed factor
-            #------------------------------------------------
-            proc_highway = feature.attribute('proc_highway')
-            proc_maxspeed = feature.attribute('proc_maxspeed')
-            fac_highway = 1
-            fac_maxspeed = 1
-            if proc_highway and proc_highway in p.highway_factor_dict:
-                fac_highway = p.highway_factor_dict[proc_highway]
-            if proc_maxspeed:
-                for maxspeed in p.maxspeed_factor_dict.keys():
-                    if proc_maxspeed >= maxspeed:
-                        fac_maxspeed = p.maxspeed_factor_dict[maxspeed]
-            #mark maxspeed value as missing, if the way segment is a sidepath or independent road (except for service, track or pedestrian segments where maxspeed isn't necessary)
-            elif way_type != 'track or service' and feature.attribute('proc_sidepath') != 'no' and proc_highway not in ['pedestrian', 'service', 'track']:
-                data_missing = d.addDelimitedValue(data_missing, 'maxspeed')
-                layer.changeAttributeValue(feature.id(), id_data_missing_maxspeed, 1)
+                #bonus for sharrows/cycleway=shared lane markings
+                if way_type in {'shared road', 'shared traffic lane'}:
+                    if cycleway == 'shared_lane' or cycleway_both == 'shared_lane' or cycleway_left == 'shared_lane' or cycleway_right == 'shared_lane':
+                        fac_4 += 0.1
+                        data_bonus |= bonus_bits['shared lane markings']
 
-            layer.changeAttributeValue(feature.id(), id_fac_highway, fac_highway)
-            layer.changeAttributeValue(feature.id(), id_fac_maxspeed, fac_maxspeed)
+                #bonus for surface colour on shared traffic ways
+                if way_type in cycle_lane_way_types or way_type in {'crossing', 'shared bus lane', 'link', 'bicycle road'} or (way_type in {'shared path', 'segregated path'} and is_sidepath == 'yes'):
+                    surface_colour = feature.attribute('surface:colour')
+                    if surface_colour and surface_colour not in ['no', 'none', 'grey', 'gray', 'black']:
+                        if way_type == 'crossing':
+                            fac_4 += 0.15 #more bonus for coloured crossings
+                        else:
+                            fac_4 += 0.05
+                        data_bonus |= bonus_bits['surface colour']
 
+                #bonus for marked or signalled crossings
+                if way_type == 'crossing':
+                    crossing = feature.attribute('crossing')
+                    if not crossing:
+                        data_missing |= missing_bits['crossing']
+                    crossing_markings = feature.attribute('crossing:markings')
+                    if not crossing_markings:
+                        data_missing |= missing_bits['crossing_markings']
+                    if crossing in ['traffic_signals']:
+                        fac_4 += 0.2
+                        data_bonus |= bonus_bits['signalled crossing']
+                    elif crossing in ['marked', 'zebra'] or (crossing_markings and crossing_markings != 'no'):
+                        fac_4 += 0.1
+                        data_bonus |= bonus_bits['marked crossing']
+
+                #malus for missing street light
+                lit = feature.attribute('lit')
+                if not lit:
+                    data_missing |= missing_bits['lit']
+                if lit == 'no':
+                    fac_4 -= 0.1
+                    data_malus |= malus_bits['no street lighting']
+
+                #malus for cycle way along parking without buffer (danger of dooring)
+                #TODO: currently no information if parking is parallel parking - for this, a parking orientation lookup on the centerline is needed for separately mapped cycle ways
+                if ((traffic_mode_left == 'parking' and buffer_left and buffer_left < 1) or (traffic_mode_right == 'parking' and buffer_right and buffer_right < 1)) and (way_type in cycle_lane_way_types or (way_type in {'cycle track', 'shared path', 'segregated path'} and is_sidepath == 'yes')):
+                    #malus is 0 (buffer = 1m) .. 0.2 (buffer = 0m)
+                    diff = 0
+                    if traffic_mode_left == 'parking':
+                        diff = abs(buffer_left - 1) / 5
+                    if traffic_mode_right == 'parking':
+                        diff = abs(buffer_right - 1) / 5
+                    if traffic_mode_left == 'parking' and traffic_mode_right == 'parking':
+                        diff = abs(((buffer_left + buffer_right) / 2) - 1) / 5
+                    fac_4 -= diff
+                    data_malus |= malus_bits['insufficient dooring buffer']
+
+                #malus if bicycle is only "permissive"
+                if bicycle == 'permissive':
+                    fac_4 -= 0.2
+                    data_malus |= malus_bits['cycling not intended']
+
+            #the data incompleteness is calculated from the collected bit masks of missing values after this loop (in vectorized mode, they are part of the scoring input)
+            if not vectorized_scoring and 'data_incompleteness' in required_attributes:
+                s.addIncompletenessRow(scoring_columns, feature.id(), data_missing, data_missing_repeated)
+            #in vectorized mode, width, surface and highway factors and the index are calculated for all features at once after this loop
+            if vectorized_scoring:
+                s.addScoringRow(scoring_columns, fid=feature.id(), way_type=feature.attribute('way_type'), motor_vehicle_access=motor_vehicle_access, proc_width=proc_width, proc_oneway=proc_oneway_code, proc_surface=proc_surface_code, proc_smoothness=proc_smoothness_code, proc_highway=proc_highway_code, proc_maxspeed=proc_maxspeed, proc_sidepath=is_sidepath, fac_4=fac_4, data_bonus=data_bonus, data_malus=data_malus, data_missing=data_missing, data_missing_repeated=data_missing_repeated)
+            else:
+                #--------------------------------------------
+                #Calculate width factor according to way type
+                #--------------------------------------------
+                calc_width = NULL
+                minimum_factor = 0
+                #for dedicated ways for cycling
+                if way_type not in {'bicycle road', 'shared road', 'shared traffic lane', 'shared bus lane', 'track or service'} or motor_vehicle_access == 'no':
+                    calc_width = proc_width
+                    #calculated width depends on the width/space per driving direction
+                    if calc_width and not 'yes' in proc_oneway:
+                        calc_width /= 1.6
+
+                #for shared roads and lanes
+                else:
+                    calc_width = proc_width
+                    minimum_factor = 0.25 #on shared roads, there is a minimum width factor, because in case of doubt, other vehicles have to pass careful or can't overtake
+                    if calc_width:
+                        if way_type == 'shared traffic lane':
+                            calc_width = max(calc_width - 2 + ((4.5 - calc_width) / 3), 0)
+                        elif way_type == 'shared bus lane':
+                            calc_width = max(calc_width - 3 + ((5.5 - calc_width) / 3), 0)
+                        else:
+                            if not 'yes' in proc_oneway:
+                                calc_width /= 1.6
+                            #TODO: Use a global 'optimum road width' variable for this?
+                            calc_width -= 2 #on motor vehicle roads, optimum width is 2m for a car + 1m for bicycle + 1.5m safety distance -> exactly 2m more than the optimum width on cycleways. Simply subtract 2m from the processed width to get a comparable width value that can be used with the following width factor formula
+
+                #Calculate width factor (logistic regression)
+                if calc_width:
+                    #on roads with restricted motor vehicle access, the width factor has a lower weight (see scoring.getWidthFactor)
+                    restricted_access = way_type in {'bicycle road', 'shared road', 'shared traffic lane', 'track or service'} and motor_vehicle_access in p.motor_vehicle_access_index_dict
+                    fac_width = s.getWidthFactor(calc_width, way_type in {'bicycle road', 'shared road', 'shared traffic lane', 'shared bus lane', 'track or service'}, restricted_access, minimum_factor)
+                else:
+                    fac_width = NULL
+
+                layer.changeAttributeValue(feature.id(), id_fac_width, fac_width)
+
+                if fac_width > 1:
+                    data_bonus |= bonus_bits['wide width']
+                if fac_width and fac_width <= 0.5:
+                    data_malus |= malus_bits['narrow width']
+
+                #---------------------------------------
+                #Calculate surface and smoothness factor
+                #---------------------------------------
+                fac_surface = NULL
+                if proc_smoothness and proc_smoothness in p.smoothness_factor_dict:
+                    fac_surface = p.smoothness_factor_dict[proc_smoothness]
+                elif proc_surface and proc_surface in p.surface_factor_dict:
+                    fac_surface = p.surface_factor_dict[proc_surface]
+
+                layer.changeAttributeValue(feature.id(), id_fac_surface, fac_surface)
+
+                if fac_surface > 1:
+                    data_bonus |= bonus_bits['excellent surface']
+                if fac_surface and fac_surface <= 0.5:
+                    data_malus |= malus_bits['bad surface']
+
+                #------------------------------------------------
+                #Calculate highway (sidepath) and maxspeed factor
+                #------------------------------------------------
+                fac_highway = 1
+                fac_maxspeed = 1
+                if proc_highway and proc_highway in p.highway_factor_dict:
+                    fac_highway = p.highway_factor_dict[proc_highway]
+                if proc_maxspeed:
+                    for maxspeed in p.maxspeed_factor_dict.keys():
+                        if proc_maxspeed >= maxspeed:
+                            fac_maxspeed = p.maxspeed_factor_dict[maxspeed]
+
+                layer.changeAttributeValue(feature.id(), id_fac_highway, fac_highway)
+                layer.changeAttributeValue(feature.id(), id_fac_maxspeed, fac_maxspeed)
 #            #-------------------------------------------------
 #            #Calculate (physical) separation and buffer factor
 #            #-------------------------------------------------
@@ -1454,204 +1437,469 @@ else:
 
 
 
-            #---------------
-            #Calculate index
-            #---------------
-            index = NULL
-            index_10 = NULL
-            if base_index != NULL:
-                #factor 1: width and surface
-                #width and surface factors are weighted, so that low values have a stronger influence on the index
-                if fac_width and fac_surface:
-                    #fac_1 = (fac_width + fac_surface) / 2 #formula without weight factors
-                    weight_factor_width = max(1 - fac_width, 0) + 0.5 #max(1-x, 0) makes that only values below 1 are resulting in a stronger decrease of the index
-                    weight_factor_surface = max(1 - fac_surface, 0) + 0.5
-                    fac_1 = (weight_factor_width * fac_width + weight_factor_surface * fac_surface) / (weight_factor_width + weight_factor_surface)
-                elif fac_width:
-                    fac_1 = fac_width
-                elif fac_surface:
-                    fac_1 = fac_surface
-                else:
-                    fac_1 = 1
-                layer.changeAttributeValue(feature.id(), id_fac_1, round(fac_1, 2))
-
-                #factor 2: highway and maxspeed
-                #highway factor is weighted according to how close the bicycle traffic is to the motor traffic
-                weight = 1
-                if way_type in p.highway_factor_dict_weights:
-                    weight = p.highway_factor_dict_weights[way_type]
-                #if a shared path isn't a sidepath of a road, highway factor remains 1 (has no influence on the index)
-                if way_type in ['shared path', 'segregated path', 'shared footway'] and is_sidepath != 'yes':
-                    weight = 0
-                fac_2 = fac_highway * fac_maxspeed #maxspeed and highway factor are combined in one highway factor
-                fac_2 = fac_2 + ((1 - fac_2) * (1 - weight)) #factor is weighted (see above) - low weights lead to a factor closer to 1
-                if not fac_2:
-                   fac_2 = 1
-                layer.changeAttributeValue(feature.id(), id_fac_2, round(fac_2, 2))
-
-                if weight >= 0.5:
-                    if fac_2 > 1:
-                        data_bonus = d.addDelimitedValue(data_bonus, 'slow traffic')
-                    if fac_highway <= 0.7:
-                        data_malus = d.addDelimitedValue(data_malus, 'along a major road')
-                    if fac_maxspeed <= 0.7:
-                        data_malus = d.addDelimitedValue(data_malus, 'along a road with high speed limits')
-
-                #factor 3: separation and buffer
-                fac_3 = 1
-                layer.changeAttributeValue(feature.id(), id_fac_3, round(fac_3, 2))
-
-                #factor group 4: miscellaneous attributes can result in an other bonus or malus
-                fac_4 = 1
-
-                #bonus for sharrows/cycleway=shared lane markings
-                if way_type in ['shared road', 'shared traffic lane']:
-                    if cycleway == 'shared_lane' or cycleway_both == 'shared_lane' or cycleway_left == 'shared_lane' or cycleway_right == 'shared_lane':
-                        fac_4 += 0.1
-                        data_bonus = d.addDelimitedValue(data_bonus, 'shared lane markings')
-
-                #bonus for surface colour on shared traffic ways
-                if 'cycle lane' in way_type or way_type in ['crossing', 'shared bus lane', 'link', 'bicycle road'] or (way_type in ['shared path', 'segregated path'] and is_sidepath == 'yes'):
-                    surface_colour = feature.attribute('surface:colour')
-                    if surface_colour and surface_colour not in ['no', 'none', 'grey', 'gray', 'black']:
-                        if way_type == 'crossing':
-                            fac_4 += 0.15 #more bonus for coloured crossings
-                        else:
-                            fac_4 += 0.05
-                        data_bonus = d.addDelimitedValue(data_bonus, 'surface colour')
-
-                #bonus for marked or signalled crossings
-                if way_type == 'crossing':
-                    crossing = feature.attribute('crossing')
-                    if not crossing:
-                        data_missing = d.addDelimitedValue(data_missing, 'crossing')
-                    crossing_markings = feature.attribute('crossing:markings')
-                    if not crossing_markings:
-                        data_missing = d.addDelimitedValue(data_missing, 'crossing_markings')
-                    if crossing in ['traffic_signals']:
-                        fac_4 += 0.2
-                        data_bonus = d.addDelimitedValue(data_bonus, 'signalled crossing')
-                    elif crossing in ['marked', 'zebra'] or (crossing_markings and crossing_markings != 'no'):
-                        fac_4 += 0.1
-                        data_bonus = d.addDelimitedValue(data_bonus, 'marked crossing')
-
-                #malus for missing street light
-                lit = feature.attribute('lit')
-                if not lit:
-                    data_missing = d.addDelimitedValue(data_missing, 'lit')
-                    layer.changeAttributeValue(feature.id(), id_data_missing_lit, 1)
-                if lit == 'no':
-                    fac_4 -= 0.1
-                    data_malus = d.addDelimitedValue(data_malus, 'no street lighting')
-
-                #malus for cycle way along parking without buffer (danger of dooring)
-                #TODO: currently no information if parking is parallel parking - for this, a parking orientation lookup on the centerline is needed for separately mapped cycle ways
-                if ((traffic_mode_left == 'parking' and buffer_left and buffer_left < 1) or (traffic_mode_right == 'parking' and buffer_right and buffer_right < 1)) and ('cycle lane' in way_type or (way_type in ['cycle track', 'shared path', 'segregated path'] and is_sidepath == 'yes')):
-                    #malus is 0 (buffer = 1m) .. 0.2 (buffer = 0m)
-                    diff = 0
-                    if traffic_mode_left == 'parking':
-                        diff = abs(buffer_left - 1) / 5
-                    if traffic_mode_right == 'parking':
-                        diff = abs(buffer_right - 1) / 5
-                    if traffic_mode_left == 'parking' and traffic_mode_right == 'parking':
-                        diff = abs(((buffer_left + buffer_right) / 2) - 1) / 5
-                    fac_4 -= diff
-                    data_malus = d.addDelimitedValue(data_malus, 'insufficient dooring buffer')
-
-                #malus if bicycle is only "permissive"
-                if bicycle == 'permissive':
-                    fac_4 -= 0.2
-                    data_malus = d.addDelimitedValue(data_malus, 'cycling not intended')
-
-                layer.changeAttributeValue(feature.id(), id_fac_4, round(fac_4, 2))
-
-                index = base_index * fac_1 * fac_2 * fac_3 * fac_4
-
-                index = max(min(100, index), 0) #index should be between 0 and 100 in the end for pragmatic reasons
-                index = int(round(index))       #index is an int
-
-                index_10 = index // 10   #index from 0..10 (e.g. index = 56 -> index_10 = 5)
-
-            layer.changeAttributeValue(feature.id(), id_index, index)
-            layer.changeAttributeValue(feature.id(), id_index_10, index_10)
+                #---------------
+                #Calculate index
+                #---------------
+                index = NULL
+                index_10 = NULL
+                if base_index != NULL:
+                    #factor 1: width and surface
+                    #width and surface factors are weighted, so that low values have a stronger influence on the index
+                    if fac_width and fac_surface:
+                        #fac_1 = (fac_width + fac_surface) / 2 #formula without weight factors
+                        weight_factor_width = max(1 - fac_width, 0) + 0.5 #max(1-x, 0) makes that only values below 1 are resulting in a stronger decrease of the index
+                        weight_factor_surface = max(1 - fac_surface, 0) + 0.5
+                        fac_1 = (weight_factor_width * fac_width + weight_factor_surface * fac_surface) / (weight_factor_width + weight_factor_surface)
+                    elif fac_width:
+                        fac_1 = fac_width
+                    elif fac_surface:
+                        fac_1 = fac_surface
+                    else:
+                        fac_1 = 1
+                    layer.changeAttributeValue(feature.id(), id_fac_1, round(fac_1, 2))
+
+                    #factor 2: highway and maxspeed
+                    #highway factor is weighted according to how close the bicycle traffic is to the motor traffic
+                    weight = 1
+                    if way_type in p.highway_factor_dict_weights:
+                        weight = p.highway_factor_dict_weights[way_type]
+                    #if a shared path isn't a sidepath of a road, highway factor remains 1 (has no influence on the index)
+                    if way_type in {'shared path', 'segregated path', 'shared footway'} and is_sidepath != 'yes':
+                        weight = 0
+                    fac_2 = fac_highway * fac_maxspeed #maxspeed and highway factor are combined in one highway factor
+                    fac_2 = fac_2 + ((1 - fac_2) * (1 - weight)) #factor is weighted (see above) - low weights lead to a factor closer to 1
+                    if not fac_2:
+                       fac_2 = 1
+                    layer.changeAttributeValue(feature.id(), id_fac_2, round(fac_2, 2))
+
+                    if weight >= 0.5:
+                        if fac_2 > 1:
+                            data_bonus |= bonus_bits['slow traffic']
+                        if fac_highway <= 0.7:
+                            data_malus |= malus_bits['along a major road']
+                        if fac_maxspeed <= 0.7:
+                            data_malus |= malus_bits['along a road with high speed limits']
+
+                    #factor 3: separation and buffer
+                    fac_3 = 1
+                    layer.changeAttributeValue(feature.id(), id_fac_3, round(fac_3, 2))
+
+                    #factor group 4: miscellaneous attributes (see above)
+                    layer.changeAttributeValue(feature.id(), id_fac_4, round(fac_4, 2))
+
+                    index = base_index * fac_1 * fac_2 * fac_3 * fac_4
+
+                    index = max(min(100, index), 0) #index should be between 0 and 100 in the end for pragmatic reasons
+                    index = int(round(index))       #index is an int
+
+                    index_10 = index // 10   #index from 0..10 (e.g. index = 56 -> index_10 = 5)
+
+                layer.changeAttributeValue(feature.id(), id_index, index)
+                layer.changeAttributeValue(feature.id(), id_index_10, index_10)
+                layer.changeAttributeValue(feature.id(), id_data_bonus, data_bonus)
+                layer.changeAttributeValue(feature.id(), id_data_malus, data_malus)
             layer.changeAttributeValue(feature.id(), id_data_missing, data_missing)
-            layer.changeAttributeValue(feature.id(), id_data_bonus, data_bonus)
-            layer.changeAttributeValue(feature.id(), id_data_malus, data_malus)
+            for bit, id_data_missing_value in data_missing_field_list:
+                if data_missing & bit:
+                    layer.changeAttributeValue(feature.id(), id_data_missing_value, 1)
 
 
 
             #---------------
             #Calculate levels of traffic stress
             #---------------
-            lts = NULL
-            if way_type in ['cycle path', 'cycle track', 'segregated path', 'cycle lane (protected)']:
-                lts = 1
-            elif way_type in ['shared path', 'shared footway']:
-                if not proc_oneway in ['yes', '-1'] and proc_width and proc_width < 3 and proc_maxspeed and proc_maxspeed > 30:
-                    lts = 3
-                else:
-                    lts = 1
-            elif way_type in ['cycle lane (advisory)', 'cycle lane (central)', 'shared bus lane', 'link', 'crossing']:
-                if proc_maxspeed and proc_maxspeed <= 10:
-                    lts = 1
-                elif proc_maxspeed and proc_maxspeed <= 30:
-                    lts = 2
-                elif proc_width and proc_width >= 1.5:
-                    lts = 3
-                else:
-                    lts = 4
-            elif way_type == 'cycle lane (exclusive)':
-                if proc_maxspeed and proc_maxspeed <= 10:
-                    lts = 1
-                elif proc_maxspeed and proc_maxspeed <= 50 and proc_width and proc_width >= 1.85:
-                    lts = 2
-                else:
-                    lts = 3
-            elif way_type in ['bicycle road', 'shared road', 'shared traffic lane']:
-                if way_type == 'bicycle road' and d.getAccess(feature, 'motor_vehicle') in p.motor_vehicle_access_index_dict:
+            if 'stress_level' in required_attributes:
+                lts = NULL
+                if way_type in {'cycle path', 'cycle track', 'segregated path', 'cycle lane (protected)'}:
                     lts = 1
-                else:
-                    priority_road = feature.attribute('priority_road')
-                    if proc_maxspeed and proc_maxspeed <= 10 and proc_highway in ['residential', 'living_street'] and (not priority_road or priority_road == 'no'):
+                elif way_type in {'shared path', 'shared footway'}:
+                    if not proc_oneway in {'yes', '-1'} and proc_width and proc_width < 3 and proc_maxspeed and proc_maxspeed > 30:
+                        lts = 3
+                    else:
                         lts = 1
-                    elif proc_maxspeed and proc_maxspeed <= 30 and proc_highway in ['tertiary', 'tertiary_link', 'unclassified', 'road', 'residential', 'living_street']:
+                elif way_type in {'cycle lane (advisory)', 'cycle lane (central)', 'shared bus lane', 'link', 'crossing'}:
+                    if proc_maxspeed and proc_maxspeed <= 10:
+                        lts = 1
+                    elif proc_maxspeed and proc_maxspeed <= 30:
                         lts = 2
+                    elif proc_width and proc_width >= 1.5:
+                        lts = 3
                     else:
                         lts = 4
-            elif way_type == 'track or service':
-                if proc_maxspeed and proc_maxspeed <= 10:
-                    lts = 1
-                else:
-                    lts = 2
-            layer.changeAttributeValue(feature.id(), id_stress_level, lts)
+                elif way_type == 'cycle lane (exclusive)':
+                    if proc_maxspeed and proc_maxspeed <= 10:
+                        lts = 1
+                    elif proc_maxspeed and proc_maxspeed <= 50 and proc_width and proc_width >= 1.85:
+                        lts = 2
+                    else:
+                        lts = 3
+                elif way_type in {'bicycle road', 'shared road', 'shared traffic lane'}:
+                    if way_type == 'bicycle road' and d.getAccess(feature, 'motor_vehicle') in p.motor_vehicle_access_index_dict:
+                        lts = 1
+                    else:
+                        priority_road = feature.attribute('priority_road')
+                        if proc_maxspeed and proc_maxspeed <= 10 and proc_highway in {'residential', 'living_street'} and (not priority_road or priority_road == 'no'):
+                            lts = 1
+                        elif proc_maxspeed and proc_maxspeed <= 30 and proc_highway in {'tertiary', 'tertiary_link', 'unclassified', 'road', 'residential', 'living_street'}:
+                            lts = 2
+                        else:
+                            lts = 4
+                elif way_type == 'track or service':
+                    if proc_maxspeed and proc_maxspeed <= 10:
+                        lts = 1
+                    else:
+                        lts = 2
+                layer.changeAttributeValue(feature.id(), id_stress_level, lts)
 
+        layer.updateFields()
 
+    if vectorized_scoring:
+        scoreWays(layer, scoring_columns)
+    elif 'data_incompleteness' in required_attributes:
+        with edit(layer):
+            scoreIncompleteness(layer, scoring_columns)
+    #in an interactive session, the results are kept for the next run
+    if session != None:
+        session['layer'] = layer
+        session['scoring_columns'] = scoring_columns
+    return(layer)
+
+
+
+#calculate index and factors of all ways at once from the collected scoring input (vectorized scoring) - also used to update an interactive session after changing scoring parameters
+def scoreWays(layer, scoring_columns):
+    print(time.strftime('%H:%M:%S', time.localtime()), '   Calculate index (vectorized)...')
+    scores = s.calculateIndexVectorized(scoring_columns, p, categories)
+    with edit(layer):
+        scoring_field_ids = {attr: layer.fields().indexOf(attr) for attr in s.scoring_output_list}
+        for fid, attributes in s.iterScoringAttributes(scoring_columns, scores):
+            layer.changeAttributeValues(fid, {scoring_field_ids[attr]: attributes[attr] for attr in attributes})
+        if 'data_incompleteness' in required_attributes:
+            scoreIncompleteness(layer, scoring_columns)
+        if explain_index:
+            id_index_explanation = layer.fields().indexOf('index_explanation')
+            for fid, explanation in s.explainIndexVectorized(scoring_columns, scores, p, categories):
+                layer.changeAttributeValue(fid, id_index_explanation, explanation)
+        #parameter sweep: only the vectorized calculation is repeated for every parameter variant
+        if parameter_sweep:
+            print(time.strftime('%H:%M:%S', time.localtime()), '   Calculate index for ' + str(len(p.sweep_variant_list)) + ' parameter variants...')
+            sweep_index = s.calculateSweepIndex(scoring_columns, p, categories, p.sweep_variant_list)
+            for name in sweep_index:
+                id_sweep_index = layer.fields().indexOf('index_' + name)
+                for fid, value in zip(scoring_columns['fid'], sweep_index[name].tolist()):
+                    layer.changeAttributeValue(fid, id_sweep_index, s.getAttributeValue(value, None, 'int'))
+
+
+
+#calculate the data incompleteness of all ways at once from the collected bit masks of missing values (the layer has to be in edit mode)
+def scoreIncompleteness(layer, scoring_columns):
+    id_data_incompleteness = layer.fields().indexOf('data_incompleteness')
+    for fid, value in zip(scoring_columns['fid'], s.calculateIncompletenessVectorized(scoring_columns, p).tolist()):
+        layer.changeAttributeValue(fid, id_data_incompleteness, value)
+
+
+
+#process the input data and save the output data set (in a background task, the task is passed to report the progress and to abort the processing, if the task is canceled)
+#returns the number of saved ways and an error message (if any)
+def processInput(task=None):
+    #the input can be processed in tiles to limit the memory needed for large areas
+    #the output is written in a background thread while processing continues (retained attributes are copied, enumerated attributes are decoded to strings and geometries are reprojected to the output crs)
+    output_writer = None
+    progress = d.createProgress(task) if task != None else None
+    #the processing context is created in the thread of the processing, the project isn't accessed (it must not be used in a background task)
+    d.createProcessingContext(processing_settings)
+    #intermediate files are accessed memory mapped (up to 1 GB per file), so the operating system can page them out if memory is short
+    #the option is only set for the thread of the processing and restored afterwards, so files opened in QGIS meanwhile (e.g. during a background task) are not affected
+    if intermediate_dir:
+        sqlite_pragma = gdal.GetThreadLocalConfigOption('OGR_SQLITE_PRAGMA', None)
+        gdal.SetThreadLocalConfigOption('OGR_SQLITE_PRAGMA', 'mmap_size=1073741824')
+    try:
+        if tile_size:
+            #tiles are processed one after another: every way belongs to the tile containing the middle of the way, ways in a surrounding halo are only used for the sidepath check
+            #the input is read from disk tile by tile, so the memory needed doesn't depend on the size of the region
+            input_extent = d.getInputExtent(input_path_list, QgsCoordinateReferenceSystem(p.crs_metric))
+            tile_list = d.getTileGrid(input_extent, tile_size) if input_extent != None else []
+            if progress != None:
+                progress['parts'] = len(tile_list)
+            for tile_index in range(len(tile_list)):
+                if progress != None:
+                    progress['part'] = tile_index
+                layer_tile_input, tile_id_set = d.getTileInput(input_path_list, input_attributes_list, p.version_attributes_list, tile_list[tile_index], QgsCoordinateReferenceSystem(p.crs_metric), p.sidepath_buffer_size * 2, input_filter_geometry) #halo: twice the sidepath check distance to be on the safe side with distortions between the crs
+                if not tile_id_set:
+                    continue
+                print(time.strftime('%H:%M:%S', time.localtime()), 'Process tile ' + str(tile_index + 1) + ' of ' + str(len(tile_list)) + ' (' + str(len(tile_id_set)) + ' ways)...')
+                layer = processWays(layer_tile_input, intermediate_dir + 'tile' + str(tile_index + 1) + '_' if intermediate_dir else None, checkpoint_prefix + 'tile' + str(tile_index + 1) + '_' if checkpoint_prefix else None, None, progress)
+                #stitch tiles: only the ways belonging to the tile are written to the output
+                if preview_extent:
+                    tile_id_set &= d.getExtentIdSet(layer, preview_extent)
+                if output_writer == None:
+                    output_writer = d.startOutputWriter(dir_output + output_file_format, layer, p.attributes_list_finally_retained, categories, QgsCoordinateReferenceSystem(p.crs_output))
+                d.writeOutputFeatures(output_writer, layer, tile_id_set)
+                del layer_tile_input, layer
+            #no tile contains ways (e.g. if the input filter or the preview extent doesn't intersect the input): there is nothing to save
+            if output_writer == None:
+                print(time.strftime('%H:%M:%S', time.localtime()), '[!] Warning: No ways to process in any tile (check the input filter or the preview extent), no output data set saved.')
+                return(0, None)
+        else:
+            if session != None and session['stage'] == 5:
+                layer = session['layer']
+                scoreWays(layer, session['scoring_columns'])
+            else:
+                layer = processWays(layer_way_input, intermediate_dir, checkpoint_prefix, session, progress)
+            output_writer = d.startOutputWriter(dir_output + output_file_format, layer, p.attributes_list_finally_retained, categories, QgsCoordinateReferenceSystem(p.crs_output))
+            d.writeOutputFeatures(output_writer, layer, d.getExtentIdSet(layer, preview_extent) if preview_extent else None)
+            del layer
+
+        print(time.strftime('%H:%M:%S', time.localtime()), 'Save output data set...')
+        d.setProgress(progress, 'output', 0)
+        output_count, output_error = d.closeOutputWriter(output_writer)
+        output_writer = None
+        if output_error:
+            print(time.strftime('%H:%M:%S', time.localtime()), '[!] Error: Output data set could not be saved completely at "' + dir_output + output_file_format + '": ' + output_error)
+        else:
+            print(time.strftime('%H:%M:%S', time.localtime()), '   ' + str(output_count) + ' ways saved.')
+            #checkpoints are only needed to resume an aborted run
+            if checkpoint_prefix:
+                d.deleteCheckpoints(checkpoint_prefix)
+
+        #vector tiles are written from the saved output data set, so they contain the same (decoded) attributes
+        if vector_tiles and not output_error:
+            print(time.strftime('%H:%M:%S', time.localtime()), 'Save vector tiles (zoom ' + str(p.vector_tile_min_zoom) + ' to ' + str(p.vector_tile_max_zoom) + ')...')
+            vector_tile_error = d.writeVectorTiles(dir_output + output_file_format, dir_output + '.mbtiles', p.vector_tile_attributes_list, p.vector_tile_min_zoom, p.vector_tile_detail_zoom, p.vector_tile_max_zoom)
+            if vector_tile_error:
+                print(time.strftime('%H:%M:%S', time.localtime()), '[!] Error: Vector tiles could not be saved at "' + dir_output + '.mbtiles": ' + vector_tile_error)
+    except Exception:
+        #the output file is closed, if the processing is aborted (e.g. if a background task is canceled)
+        if output_writer != None:
+            d.closeOutputWriter(output_writer)
+        raise
+    finally:
+        if intermediate_dir:
+            gdal.SetThreadLocalConfigOption('OGR_SQLITE_PRAGMA', sqlite_pragma)
+        #layers left in the processing context (e.g. if the processing was aborted) are released in the thread of the processing
+        d.processing_context = None
+    return(output_count, output_error)
+
+
+
+#calculate the statistics of parameter sweep and explain mode and display the output data set
+def showOutput(output_error):
+    layer = QgsVectorLayer(dir_output + output_file_format, 'Cycling Quality Index', 'ogr')
+
+    if parameter_sweep and not output_error:
+        print(time.strftime('%H:%M:%S', time.localtime()), 'Parameter sweep statistics...')
+        sweep_statistics = s.getSweepStatistics(layer, ['index'] + sweep_attributes_list)
+        for row in sweep_statistics:
+            print(time.strftime('%H:%M:%S', time.localtime()), '   ' + row['attribute'] + ': mean ' + str(row['mean']) + ', median ' + str(row['median']) + ', ' + str(row['changed']) + ' ways changed, mean difference ' + str(row['mean_difference']))
+        s.saveStatistics(dir_output + '_sweep.csv', sweep_statistics)
+
+    if explain_index and not output_error:
+        print(time.strftime('%H:%M:%S', time.localtime()), 'Index sensitivity...')
+        sensitivity_statistics = s.getSensitivityStatistics(layer)
+        for row in sensitivity_statistics[:10]:
+            print(time.strftime('%H:%M:%S', time.localtime()), '   ' + row['parameter'] + '[' + str(row['entry']) + '] = ' + str(row['value']) + ': mean index ' + '{:+}'.format(row['mean_index_per_10_percent']) + ' per +10 % (' + str(row['ways']) + ' ways)')
+        if sensitivity_statistics:
+            s.saveStatistics(dir_output + '_sensitivity.csv', sensitivity_statistics)
+
+    #in an interactive session, the displayed layer of the last run is updated in place
+    display_layer = None
+    if session != None:
+        session['key'] = session_key
+        session['parameters'] = parameter_snapshot
+        if 'display_layer_id' in session and not preview_mode:
+            display_layer = QgsProject.instance().mapLayer(session['display_layer_id'])
+    #the preview layer is updated in place as well
+    if preview_mode and QgsProject.instance().mapLayersByName('Cycling Quality Index (preview)'):
+        display_layer = QgsProject.instance().mapLayersByName('Cycling Quality Index (preview)')[0]
+    if display_layer != None:
+        print(time.strftime('%H:%M:%S', time.localtime()), 'Update displayed data...')
+        display_layer.dataProvider().reloadData()
+        display_layer.triggerRepaint()
+    else:
+        print(time.strftime('%H:%M:%S', time.localtime()), 'Display data...')
+        QgsProject.instance().addMapLayer(layer, True)
+        layer.loadNamedStyle(project_dir + 'styles/index.qml')
+        if preview_mode:
+            layer.setName('Cycling Quality Index (preview)')
+        else:
+            layer.setName('Cycling Quality Index')
+            #focus on output layer
+            iface.mapCanvas().setExtent(layer.extent())
+            if session != None:
+                session['display_layer_id'] = layer.id()
 
-            #---------------
-            #derive a data completeness number
-            #---------------
-            data_incompleteness = 0
-            missing_values = d.getDelimitedValues(data_missing, ';', 'string')
-            for value in missing_values:
-                if value in p.data_incompleteness_dict:
-                    data_incompleteness += p.data_incompleteness_dict[value]
-            layer.changeAttributeValue(feature.id(), id_data_incompleteness, data_incompleteness)
 
-        layer.updateFields()
 
-    #clean up data set and reproject to output crs
-    print(time.strftime('%H:%M:%S', time.localtime()), 'Clean up data...')
-    layer = processing.run('native:retainfields', { 'INPUT' : layer, 'FIELDS' : p.attributes_list_finally_retained, 'OUTPUT': 'memory:' })['OUTPUT']
-    layer = processing.run('native:reprojectlayer', { 'INPUT' : layer, 'TARGET_CRS' : QgsCoordinateReferenceSystem(p.crs_output), 'OUTPUT': 'memory:'})['OUTPUT']
+#display the output data set after a background task is finished
+def finishTask(exception, result=None):
+    if exception != None:
+        print(time.strftime('%H:%M:%S', time.localtime()), '[!] Processing aborted: ' + str(exception))
+    elif result == None:
+        print(time.strftime('%H:%M:%S', time.localtime()), '[!] Processing canceled.')
+    else:
+        if result[0] or result[1]:
+            showOutput(result[1])
+        print(time.strftime('%H:%M:%S', time.localtime()), 'Finished processing.')
+
 
-    print(time.strftime('%H:%M:%S', time.localtime()), 'Save output data set...')
-    qgis.core.QgsVectorFileWriter.writeAsVectorFormat(layer, dir_output + file_format, 'utf-8', QgsCoordinateReferenceSystem(p.crs_output), 'GeoJSON')
 
-    print(time.strftime('%H:%M:%S', time.localtime()), 'Display data...')
-    QgsProject.instance().addMapLayer(layer, True)
-    layer.setName('Cycling Quality Index')
-    layer.loadNamedStyle(project_dir + 'styles/index.qml')
-    #focus on output layer
-    iface.mapCanvas().setExtent(layer.extent())
+if not input_path_list and not exists(dir_input + file_format):
+    if multi_input:
+        print(time.strftime('%H:%M:%S', time.localtime()), '[!] Error: No valid input files at "' + dir_input + '*' + file_format + '".')
+    else:
+        print(time.strftime('%H:%M:%S', time.localtime()), '[!] Error: No valid input file at "' + dir_input + file_format + '".')
+else:
+    if not input_path_list:
+        input_path_list = [dir_input + file_format]
+        if not tile_size:
+            layer_way_input, input_stats = d.readInputFiles(input_path_list, p.attributes_list, p.version_attributes_list, input_filter_geometry)
+
+    #checkpoints are identified by a fingerprint of the input files, the parameters and the processing code
+    checkpoint_prefix = None
+    if checkpoints:
+        os.makedirs(dir_checkpoints, exist_ok=True)
+        checkpoint_prefix = dir_checkpoints + d.getFingerprint(input_path_list + [project_dir + 'parameter.py', project_dir + 'definitions.py', project_dir + 'classification.py', project_dir + 'cycling_quality_index.py'], [tile_size, input_filter, preview_extent.toString() if preview_extent else None]) + '_'
+
+    #the sidepath cache is independent from the scoring parameters and the processing code
+    if sidepath_cache:
+        os.makedirs(dir_sidepath_cache, exist_ok=True)
+
+    #intermediate layers are stored in memory or as files on disk
+    intermediate_dir = None
+    if store_intermediate:
+        from osgeo import gdal
+        os.makedirs(dir_intermediate, exist_ok=True)
+        intermediate_dir = dir_intermediate
+
+    #list of new attributes, important for calculating cycling quality index
+    new_attributes_dict = {
+    'way_type': 'Int',
+    'index': 'Int',
+    'index_10': 'Int',
+    'stress_level': 'Int',
+    'offset': 'Double',
+    'offset_cycleway_left': 'Double',
+    'offset_cycleway_right': 'Double',
+    'offset_sidewalk_left': 'Double',
+    'offset_sidewalk_right': 'Double',
+    'type': 'String',
+    'side': 'String',
+    'proc_width': 'Double',
+    'proc_surface': 'Int',
+    'proc_smoothness': 'Int',
+    'proc_oneway': 'Int',
+    'proc_sidepath': 'String',
+    'proc_highway': 'Int',
+    'proc_maxspeed': 'Int',
+    'proc_traffic_mode_left': 'String',
+    'proc_traffic_mode_right': 'String',
+    'proc_separation_left': 'String',
+    'proc_separation_right': 'String',
+    'proc_buffer_left': 'Double',
+    'proc_buffer_right': 'Double',
+    'proc_mandatory': 'String',
+    'proc_traffic_sign': 'String',
+    'fac_width': 'Double',
+    'fac_surface': 'Double',
+    'fac_highway': 'Double',
+    'fac_maxspeed': 'Double',
+    'fac_protection_level': 'Double',
+    'prot_level_separation_left': 'Double',
+    'prot_level_separation_right': 'Double',
+    'prot_level_buffer_left': 'Double',
+    'prot_level_buffer_right': 'Double',
+    'prot_level_left': 'Double',
+    'prot_level_right': 'Double',
+    'base_index': 'Int',
+    'fac_1': 'Double',
+    'fac_2': 'Double',
+    'fac_3': 'Double',
+    'fac_4': 'Double',
+    'data_bonus': 'Int',
+    'data_malus': 'Int',
+    'data_incompleteness': 'Double',
+    'data_missing': 'Int',
+    'data_missing_width': 'Int',
+    'data_missing_surface': 'Int',
+    'data_missing_smoothness': 'Int',
+    'data_missing_maxspeed': 'Int',
+    'data_missing_parking': 'Int',
+    'data_missing_lit': 'Int',
+    'filter_usable': 'Int',
+    'filter_way_type': 'Int'
+    }
+    #parameter sweep: an additional index attribute for every parameter variant (calculated with vectorized scoring)
+    sweep_attributes_list = []
+    if parameter_sweep:
+        vectorized_scoring = True
+        for variant in p.sweep_variant_list:
+            sweep_attributes_list.append('index_' + variant['name'])
+            new_attributes_dict['index_' + variant['name']] = 'Int'
+            p.attributes_list_finally_retained.append('index_' + variant['name'])
+
+    #explain mode: breakdown of the index for every way (derived from the vectorized scoring)
+    if explain_index:
+        vectorized_scoring = True
+        new_attributes_dict['index_explanation'] = 'String'
+        p.attributes_list_finally_retained.append('index_explanation')
+
+    #new attributes are added to the attributes used from the input data
+    for attr in list(new_attributes_dict.keys()):
+        p.attributes_list.append(attr)
+
+    #code tables for enumerated attributes: they are stored as integer codes during processing and decoded to strings for the output
+    categories = d.createCategoryTables({
+    'way_type': d.way_type_list,
+    'filter_way_type': d.filter_way_type_list,
+    'proc_oneway': d.oneway_list,
+    'proc_surface': list(p.surface_factor_dict.keys()),
+    'proc_smoothness': list(p.smoothness_factor_dict.keys()),
+    'proc_highway': d.highway_list
+    })
+
+    #derived attributes that are needed for the output (see definitions.attribute_dependency_dict) - attributes that are not needed are not derived
+    required_attributes = d.getRequiredAttributes(d.attribute_dependency_dict, p.attributes_list_finally_retained)
+
+    #interactive session: the results are kept in the python console between runs and only the steps affected by changed parameters are recalculated
+    session = None
+    if interactive_session:
+        if tile_size:
+            print(time.strftime('%H:%M:%S', time.localtime()), '[!] Warning: Interactive sessions are not supported for tiled processing, all steps are processed.')
+        else:
+            vectorized_scoring = True
+            if 'cqi_session' not in globals():
+                cqi_session = d.createSession()
+            session = cqi_session
+            session_key = d.getFingerprint(input_path_list + [project_dir + 'definitions.py', project_dir + 'classification.py', project_dir + 'cycling_quality_index.py'], [explain_index, parameter_sweep, input_filter, preview_extent.toString() if preview_extent else None])
+            session['stage'] = d.getSessionStage(session, session_key, parameter_snapshot, d.attribute_dependency_dict)
+            if session['stage']:
+                print(time.strftime('%H:%M:%S', time.localtime()), 'Interactive session: changed parameters: ' + (', '.join(d.getChangedParameters(session['parameters'], parameter_snapshot)) or 'none') + ' - continue with step ' + str(session['stage']) + '...')
+                categories = session['categories']
+            else:
+                for attr in ['layer', 'layer_step3', 'scoring_columns']:
+                    session.pop(attr, None)
+                session['categories'] = categories
+
+    #settings of the processing framework (e.g. the handling of invalid geometries) are read in the main thread, the processing context of the run is created from them (see d.createProcessingContext)
+    from processing.tools import dataobjects
+    processing_settings = dataobjects.createContext()
+
+    #the processing runs in a background task or directly in the python console
+    if background_task:
+        print(time.strftime('%H:%M:%S', time.localtime()), 'Start background task (see task manager for progress)...')
+        #layers created outside the task are not used in it: the task works on independent clones (cloned memory layers share their features until they are changed)
+        if layer_way_input != None:
+            layer_way_input = layer_way_input.clone()
+        if session != None:
+            for attr in ['layer', 'layer_step3']:
+                if attr in session:
+                    session[attr] = session[attr].clone()
+        cqi_task = QgsTask.fromFunction('Cycling Quality Index', processInput, on_finished=finishTask)
+        QgsApplication.taskManager().addTask(cqi_task)
+    else:
+        output_count, output_error = processInput()
+        if output_count or output_error:
+            showOutput(output_error)
 
-print(time.strftime('%H:%M:%S', time.localtime()), 'Finished processing.')
+if not background_task:
+    print(time.strftime('%H:%M:%S', time.localtime()), 'Finished processing.')
@@ -1,24 +1,70 @@
-from qgis.core import NULL
+import hashlib, json, os, processing, queue, threading, time
+from concurrent.futures import ThreadPoolExecutor
+from qgis.core import NULL, QgsCoordinateReferenceSystem, QgsCoordinateTransform, QgsCoordinateTransformContext, QgsFeature, QgsFeatureRequest, QgsField, QgsFields, QgsGeometry, QgsProcessingContext, QgsProcessingException, QgsProcessingFeedback, QgsRectangle, QgsVectorFileWriter, QgsVectorLayer, QgsVectorLayerFeatureSource, QgsVectorTileWriter, QgsWkbTypes
+from qgis.PyQt.QtCore import QVariant
 
 #derive cycleway and sidewalk attributes mapped on the centerline for transfering them to separate ways
 def deriveAttribute(feature, attribute_name, type, side, vartype):
-    attribute = NULL
-    attribute = feature.attribute(str(type) + ':' + str(side) + ':' + str(attribute_name))
-    if not attribute:
-        attribute = feature.attribute(str(type) + ':both:' + str(attribute_name))
-    if not attribute:
-        attribute = feature.attribute(str(type) + ':' + str(attribute_name))
-    if attribute != NULL:
+    attribute = resolveTags(feature, {}, getSideKeys(type, side, attribute_name))
+    return(getTypedValue(attribute, vartype))
+
+
+
+#return a value as a specific type (NULL if it can't be converted)
+def getTypedValue(value, vartype):
+    if value != NULL:
         try:
             if vartype == 'int':
-                attribute = int(attribute)
+                value = int(value)
             if vartype == 'float':
-                attribute = float(attribute)
+                value = float(value)
             if vartype == 'str':
-                attribute = str(attribute)
+                value = str(value)
         except:
-            attribute = NULL
-    return(attribute)
+            value = NULL
+    return(value)
+
+
+
+#keys of side specific attributes mapped on the centerline in order of precedence (e.g. "cycleway:right:width", "cycleway:both:width", "cycleway:width")
+#with a nested side, the attribute itself is resolved first (e.g. left buffer of a right cycle lane: "cycleway:right:buffer:left", "cycleway:right:buffer:both", "cycleway:right:buffer", "cycleway:both:buffer:left", ...)
+side_key_dict = {}
+def getSideKeys(type, side, key, nested_side=None):
+    if (type, side, key, nested_side) not in side_key_dict:
+        key_list = [key]
+        if nested_side:
+            key_list = [key + ':' + nested_side, key + ':both', key]
+        side_key_dict[(type, side, key, nested_side)] = tuple(prefix + side_key for prefix in [type + ':' + side + ':', type + ':both:', type + ':'] for side_key in key_list)
+    return(side_key_dict[(type, side, key, nested_side)])
+
+
+
+#get the first valid value of a list of keys - every tag is read only once per feature and stored in "tags"
+def resolveTags(feature, tags, key_list):
+    value = NULL
+    for key in key_list:
+        if key not in tags:
+            tags[key] = feature.attribute(key)
+        value = tags[key]
+        if value:
+            break
+    return(value)
+
+
+
+#expand side specific attributes mapped on the centerline into explicit values for every side: {'left': {key: value, ...}, 'right': {...}}
+#attributes in "nested_key_list" are side specific themselves and are expanded to "<key>:left" and "<key>:right" (e.g. buffers of cycle lanes)
+def getSideView(feature, type, key_list, nested_key_list=[], side_list=['left', 'right']):
+    tags = {}
+    view = {}
+    for side in side_list:
+        view[side] = {}
+        for key in key_list:
+            view[side][key] = resolveTags(feature, tags, getSideKeys(type, side, key))
+        for key in nested_key_list:
+            for nested_side in ['left', 'right']:
+                view[side][key + ':' + nested_side] = resolveTags(feature, tags, getSideKeys(type, side, key, nested_side))
+    return(view)
 
 
 
@@ -132,4 +178,941 @@ def addDelimitedValue(var, value):
     if var:
         var += ';'
     var += value
-    return(var)
\ No newline at end of file
+    return(var)
+
+
+
+#enumerated values of processed attributes - during processing, they are stored as small integer codes (0 = NULL, 1.. = position in the list) and only decoded to strings for the output
+way_type_list = ['cycle path', 'cycle track', 'shared path', 'segregated path', 'shared footway', 'cycle lane (advisory)', 'cycle lane (exclusive)', 'cycle lane (protected)', 'cycle lane (central)', 'shared bus lane', 'bicycle road', 'shared road', 'shared traffic lane', 'track or service', 'link', 'crossing']
+filter_way_type_list = ['separated', 'cycle lanes', 'bicycle road', 'shared traffic']
+oneway_list = ['yes', 'no', '-1', 'alternating', 'reversible', 'yes_motor_vehicles', 'no_motor_vehicles', '-1_motor_vehicles', 'alternating_motor_vehicles', 'reversible_motor_vehicles', 'unknown']
+highway_list = ['motorway', 'motorway_link', 'trunk', 'trunk_link', 'primary', 'primary_link', 'secondary', 'secondary_link', 'tertiary', 'tertiary_link', 'unclassified', 'residential', 'road', 'living_street', 'service', 'pedestrian', 'track', 'cycleway', 'footway', 'path', 'bridleway', 'steps']
+
+
+
+#create code tables for enumerated attributes: {attribute: {'values': [NULL, value1, ...], 'codes': {value1: 1, ...}}}
+def createCategoryTables(value_dict):
+    tables = {}
+    for attribute in value_dict:
+        tables[attribute] = {'values': [NULL], 'codes': {}}
+        for value in value_dict[attribute]:
+            encodeValue(tables[attribute], value)
+    return(tables)
+
+
+
+#get the integer code of a value (values that are not in the code table yet are added)
+def encodeValue(table, value):
+    if not value:
+        return(NULL)
+    code = table['codes'].get(value)
+    if code == None:
+        code = len(table['values'])
+        table['values'].append(value)
+        table['codes'][value] = code
+    return(code)
+
+
+
+#get the value of an integer code (the same string object for all features)
+def decodeValue(table, code):
+    if not code:
+        return(NULL)
+    return(table['values'][code])
+
+
+
+#values of processed attributes that list several values (missing values, bonus and malus) - during processing, they are stored as integer bit masks (bit n set = n-th value of the list) and only decoded to delimited strings for the output
+#(values are listed in the order they are derived, so the decoded strings keep this order)
+data_missing_flag_list = ['width:lanes', 'width', 'parking', 'surface', 'smoothness', 'maxspeed', 'crossing', 'crossing_markings', 'lit']
+data_bonus_flag_list = ['motor vehicle restricted', 'wide width', 'excellent surface', 'slow traffic', 'shared lane markings', 'surface colour', 'signalled crossing', 'marked crossing']
+data_malus_flag_list = ['narrow width', 'bad surface', 'along a major road', 'along a road with high speed limits', 'no street lighting', 'insufficient dooring buffer', 'cycling not intended']
+
+
+
+#create a flag table for a list of values: {'values': [value1, ...], 'bits': {value1: 1, value2: 2, value3: 4, ...}, 'strings': {bit mask: delimited string}}
+def createFlagTable(value_list):
+    return({'values': list(value_list), 'bits': {value_list[n]: 1 << n for n in range(len(value_list))}, 'strings': {}})
+
+
+
+#get the delimited string of all values whose bit is set in a bit mask (decoded once for every combination of values)
+def decodeFlags(table, bits):
+    if bits == NULL:
+        return(NULL)
+    if not bits in table['strings']:
+        table['strings'][bits] = ';'.join([table['values'][n] for n in range(len(table['values'])) if bits & (1 << n)])
+    return(table['strings'][bits])
+
+
+
+flag_tables = {
+    'data_missing': createFlagTable(data_missing_flag_list),
+    'data_bonus': createFlagTable(data_bonus_flag_list),
+    'data_malus': createFlagTable(data_malus_flag_list)
+}
+
+
+
+#transform context of the project - it is set in the main thread (see cycling_quality_index.py), the project itself is not accessed during the processing, since it must not be used in a background task
+transform_context = QgsCoordinateTransformContext()
+
+#processing context of the running processing (see createProcessingContext) and feedback of the running background task (see createProgress)
+processing_context = None
+processing_feedback = None
+
+
+
+#create the processing context of a run in the thread of the run - layers used by algorithms by id (for selected features) are registered in its temporary layer store instead of the project (see addContextLayer)
+#the settings of the processing framework (e.g. the handling of invalid geometries) are copied from a context created in the main thread
+def createProcessingContext(settings_context):
+    global processing_context
+    processing_context = QgsProcessingContext()
+    processing_context.copyThreadSafeSettings(settings_context)
+    processing_context.setProject(None)
+    processing_context.setTransformContext(transform_context)
+    return(processing_context)
+
+
+
+#register a layer in the temporary layer store of the processing context, so algorithms can use it by id - the store takes the ownership of the layer until it is released again
+def addContextLayer(layer):
+    processing_context.temporaryLayerStore().addMapLayer(layer)
+
+
+
+#take back a layer registered with addContextLayer
+def releaseContextLayer(layer):
+    processing_context.temporaryLayerStore().takeMapLayer(layer)
+
+
+
+#run a processing algorithm in the processing context of the run and return its results (in a background task, the algorithm gets the feedback of the task, so it can be canceled)
+def runAlgorithm(algorithm, parameters):
+    return(processing.run(algorithm, parameters, context=processing_context, feedback=processing_feedback))
+
+
+
+#run a processing algorithm and return the output layer - if a directory for intermediate results is given, the output is stored there as a file (SQLite) instead of a memory layer
+def runProcessing(algorithm, parameters, name, dir_intermediate=None):
+    if dir_intermediate:
+        parameters['OUTPUT'] = dir_intermediate + name + '.sqlite'
+    else:
+        parameters['OUTPUT'] = 'memory:'
+    output = runAlgorithm(algorithm, parameters)['OUTPUT']
+    if isinstance(output, str):
+        output = QgsVectorLayer(output, name, 'ogr')
+    return(output)
+
+
+
+#get a filter for reading input files: a bounding box [x min, y min, x max, y max] (WGS 84) or the path of a file with polygons - returns a geometry and its crs (or None, if there is no filter)
+def getInputFilter(value):
+    if not value:
+        return(None)
+    if isinstance(value, str):
+        layer = QgsVectorLayer(value, 'input filter', 'ogr')
+        if not layer.isValid():
+            return(None)
+        return((QgsGeometry.unaryUnion([feature.geometry() for feature in layer.getFeatures()]), layer.crs()))
+    return((QgsGeometry.fromRect(QgsRectangle(value[0], value[1], value[2], value[3])), QgsCoordinateReferenceSystem('EPSG:4326')))
+
+
+
+#open an input file with a subset of attributes and prepare reading its line features - returns a dict with a feature source, the fields, the crs and the request (or None, if the file isn't valid)
+#the layer is only used in the calling thread, the feature source can be read in a worker thread (see readInputFile)
+#with an input filter (see getInputFilter), only features intersecting the filter geometry are read - the filter geometry is transformed to the crs of the file here
+def openInputFile(path, attribute_list, version_attribute_list=[], input_filter=None):
+    layer = QgsVectorLayer(path + '|geometrytype=LineString', 'way input', 'ogr')
+    if not layer.isValid():
+        return(None)
+    fields = QgsFields()
+    for field in layer.fields():
+        if field.name() in attribute_list:
+            fields.append(field)
+    field_ids = [layer.fields().indexOf(name) for name in fields.names()]
+    version_id = -1
+    for attribute in version_attribute_list:
+        version_id = layer.fields().indexOf(attribute)
+        if version_id != -1:
+            break
+    request = QgsFeatureRequest().setSubsetOfAttributes(field_ids + ([version_id] if version_id != -1 else []))
+    filter_geometry = None
+    if input_filter != None:
+        filter_geometry = QgsGeometry(input_filter[0])
+        if input_filter[1] != layer.crs():
+            filter_geometry.transform(QgsCoordinateTransform(input_filter[1], layer.crs(), transform_context))
+        #the data source only returns features intersecting the bounding box of the filter, they are checked against the exact geometry
+        request.setFilterRect(filter_geometry.boundingBox())
+    return({'source': QgsVectorLayerFeatureSource(layer), 'fields': fields, 'crs': layer.crs(), 'field_ids': field_ids, 'version_id': version_id, 'request': request, 'filter_geometry': filter_geometry})
+
+
+
+#read the line features of an opened input file (see openInputFile): returns a list of [attributes, geometry, version] for every feature
+def readInputFile(input_file):
+    field_ids = input_file['field_ids']
+    version_id = input_file['version_id']
+    filter_engine = None
+    if input_file['filter_geometry'] != None:
+        filter_engine = QgsGeometry.createGeometryEngine(input_file['filter_geometry'].constGet())
+        filter_engine.prepareGeometry()
+    rows = []
+    for feature in input_file['source'].getFeatures(input_file['request']):
+        if filter_engine != None and not filter_engine.intersects(feature.geometry().constGet()):
+            continue
+        attributes = feature.attributes()
+        version = getNumber(attributes[version_id]) if version_id != -1 else NULL
+        rows.append([[attributes[field_id] for field_id in field_ids], feature.geometry(), version])
+    return(rows)
+
+
+
+#find ways contained in more than one input file by their OSM id and keep only one of them (the newest one, if versions are available, otherwise the first one)
+#returns a list of flags for every file which rows to keep and duplicate statistics for every file
+def deduplicateInputRows(results):
+    way_dict = {}
+    keep_list = []
+    stats_list = []
+    for file_index in range(len(results)):
+        file_fields, crs, rows = results[file_index]
+        keep_list.append(bytearray(b'\x01' * len(rows)))
+        stats_list.append({'ways': len(rows), 'duplicates': 0, 'replaced': 0})
+        id_pos = file_fields.indexOf('id')
+        if id_pos == -1:
+            continue
+        for row_index in range(len(rows)):
+            osm_id = rows[row_index][0][id_pos]
+            if not osm_id:
+                continue
+            version = rows[row_index][2]
+            if osm_id not in way_dict:
+                way_dict[osm_id] = (file_index, row_index, version)
+                continue
+            kept_file_index, kept_row_index, kept_version = way_dict[osm_id]
+            if version != NULL and (kept_version == NULL or version > kept_version):
+                #newer version: replace the way read before
+                keep_list[kept_file_index][kept_row_index] = 0
+                stats_list[kept_file_index]['duplicates'] += 1
+                stats_list[file_index]['replaced'] += 1
+                way_dict[osm_id] = (file_index, row_index, version)
+            else:
+                keep_list[file_index][row_index] = 0
+                stats_list[file_index]['duplicates'] += 1
+    return(keep_list, stats_list)
+
+
+
+#read several input files in parallel and merge them into one memory layer - ways contained in more than one file (e.g. overlapping areas) are only added once (see deduplicateInputRows)
+#the files are opened in the calling thread, only their feature sources are read in worker threads - the ways of all files are transformed to the crs of the first file
+#returns the layer and duplicate statistics for every file
+def readInputFiles(path_list, attribute_list, version_attribute_list=[], input_filter=None):
+    input_file_list = [openInputFile(path, attribute_list, version_attribute_list, input_filter) for path in path_list]
+    stats_list = [None] * len(path_list)
+    valid_file_indexes = [file_index for file_index in range(len(input_file_list)) if input_file_list[file_index] != None]
+    input_file_list = [input_file_list[file_index] for file_index in valid_file_indexes]
+    if not input_file_list:
+        return(None, stats_list)
+    with ThreadPoolExecutor(max_workers=min(len(input_file_list), os.cpu_count() or 1)) as executor:
+        results = [(input_file['fields'], input_file['crs'], rows) for input_file, rows in zip(input_file_list, executor.map(readInputFile, input_file_list))]
+    del input_file_list
+    keep_list, valid_stats_list = deduplicateInputRows(results)
+    for file_index in range(len(valid_file_indexes)):
+        stats_list[valid_file_indexes[file_index]] = valid_stats_list[file_index]
+
+    #merged fields of all files (attributes with different types in different files are stored as strings)
+    field_list = []
+    field_types = {}
+    for file_fields, crs, rows in results:
+        for field in file_fields:
+            if field.name() not in field_types:
+                field_list.append(QgsField(field))
+                field_types[field.name()] = field.type()
+            elif field_types[field.name()] != field.type():
+                field_types[field.name()] = QVariant.String
+    for field in field_list:
+        if field.type() != field_types[field.name()]:
+            field.setType(QVariant.String)
+            field.setTypeName('String')
+            field.setLength(0)
+            field.setPrecision(0)
+
+    layer = QgsVectorLayer('LineString?crs=' + results[0][1].authid(), 'way input', 'memory')
+    layer.dataProvider().addAttributes(field_list)
+    layer.updateFields()
+
+    #features are added file by file in batches, the rows of a file are released as soon as they are added, so the input isn't held twice
+    field_count = layer.fields().count()
+    for file_index in range(len(results)):
+        file_fields, crs, rows = results[file_index]
+        results[file_index] = None
+        keep = keep_list[file_index]
+        positions = [layer.fields().indexOf(name) for name in file_fields.names()]
+        transform = QgsCoordinateTransform(crs, layer.crs(), transform_context) if crs != layer.crs() else None
+        features = []
+        for row_index in range(len(rows)):
+            row = rows[row_index]
+            rows[row_index] = None
+            if not keep[row_index]:
+                continue
+            attributes, geometry, version = row
+            values = [NULL] * field_count
+            for pos, value in zip(positions, attributes):
+                values[pos] = value
+            if transform != None:
+                geometry.transform(transform)
+            feature = QgsFeature(layer.fields())
+            feature.setAttributes(values)
+            feature.setGeometry(geometry)
+            features.append(feature)
+            if len(features) == 10000:
+                layer.dataProvider().addFeatures(features)
+                features = []
+        layer.dataProvider().addFeatures(features)
+        del rows, features
+    layer.updateExtents()
+    return(layer, stats_list)
+
+
+
+#position of a cell on a Hilbert curve through a grid of 2^order x 2^order cells - neighbouring positions on the curve are always neighbouring cells
+def getHilbertIndex(x, y, order):
+    index = 0
+    cells = 1 << (order - 1)
+    while cells > 0:
+        rx = 1 if x & cells else 0
+        ry = 1 if y & cells else 0
+        index += cells * cells * ((3 * rx) ^ ry)
+        #rotate the quadrant, so the curve continues in the next one
+        if ry == 0:
+            if rx == 1:
+                x = cells - 1 - x
+                y = cells - 1 - y
+            x, y = y, x
+        x &= cells - 1
+        y &= cells - 1
+        cells >>= 1
+    return(index)
+
+
+
+#copy a layer with features sorted along a Hilbert curve through the centers of their bounding boxes - spatially adjacent features are stored and processed together
+#only the sort keys are held in memory, the features are copied in chunks in the sorted order - if a directory for intermediate results is given, the sorted layer is stored there as a file (SQLite, see runProcessing), otherwise it's a memory layer
+def sortLayerSpatially(layer, name, dir_intermediate=None, order=16, chunk_size=10000):
+    extent = layer.extent()
+    cells = (1 << order) - 1
+    width = max(extent.width(), 1e-9)
+    height = max(extent.height(), 1e-9)
+    key_list = []
+    for feature in layer.getFeatures(QgsFeatureRequest().setNoAttributes()):
+        center = feature.geometry().boundingBox().center()
+        x = int((center.x() - extent.xMinimum()) / width * cells)
+        y = int((center.y() - extent.yMinimum()) / height * cells)
+        key_list.append((getHilbertIndex(x, y, order), feature.id()))
+    key_list.sort()
+    fid_list = [fid for key, fid in key_list]
+    del key_list
+
+    if dir_intermediate:
+        path = dir_intermediate + name + '.sqlite'
+        if os.path.exists(path):
+            os.remove(path)
+        options = QgsVectorFileWriter.SaveVectorOptions()
+        options.driverName = 'SQLite'
+        options.fileEncoding = 'utf-8'
+        writer = QgsVectorFileWriter.create(path, layer.fields(), layer.wkbType(), layer.crs(), transform_context, options)
+        sink = writer
+    else:
+        layer_sorted = QgsVectorLayer(QgsWkbTypes.displayString(layer.wkbType()) + '?crs=' + layer.crs().authid(), name, 'memory')
+        layer_sorted.dataProvider().addAttributes(layer.fields().toList())
+        layer_sorted.updateFields()
+        sink = layer_sorted.dataProvider()
+    for chunk_start in range(0, len(fid_list), chunk_size):
+        chunk = fid_list[chunk_start:chunk_start + chunk_size]
+        feature_dict = {feature.id(): feature for feature in layer.getFeatures(QgsFeatureRequest().setFilterFids(chunk))}
+        sink.addFeatures([feature_dict[fid] for fid in chunk])
+    if dir_intermediate:
+        del sink, writer
+        return(QgsVectorLayer(path, name, 'ogr'))
+    layer_sorted.updateExtents()
+    return(layer_sorted)
+
+
+
+#split an extent into a grid of square tiles
+def getTileGrid(extent, tile_size):
+    tile_list = []
+    for x in range(int((extent.xMaximum() - extent.xMinimum()) // tile_size) + 1):
+        for y in range(int((extent.yMaximum() - extent.yMinimum()) // tile_size) + 1):
+            x_min = extent.xMinimum() + x * tile_size
+            y_min = extent.yMinimum() + y * tile_size
+            tile_list.append(QgsRectangle(x_min, y_min, x_min + tile_size, y_min + tile_size))
+    return(tile_list)
+
+
+
+#get the extent of all input files in the given crs without reading their features (None, if there is no valid file)
+def getInputExtent(path_list, crs):
+    extent = None
+    for path in path_list:
+        layer = QgsVectorLayer(path + '|geometrytype=LineString', 'way input', 'ogr')
+        if not layer.isValid():
+            continue
+        layer_extent = QgsCoordinateTransform(layer.crs(), crs, transform_context).transformBoundingBox(layer.extent())
+        if extent == None:
+            extent = layer_extent
+        else:
+            extent.combineExtentWith(layer_extent)
+    return(extent)
+
+
+
+#get the input of a tile: all ways belonging to the tile (the middle of the way is inside the tile) and all ways in a surrounding halo (needed to check for adjacent roads)
+#the ways are read from the input files on disk (see readInputFiles with the tile and halo as input filter), so only one tile at a time is held in memory - if ways of the tile reach beyond the halo, the halo is extended and read again
+#returns a memory layer and the set of ids of the ways belonging to the tile
+def getTileInput(path_list, attribute_list, version_attribute_list, tile, crs, halo, input_filter=None):
+    filter_geometry = None
+    if input_filter != None:
+        filter_geometry = QgsGeometry(input_filter[0])
+        if input_filter[1] != crs:
+            filter_geometry.transform(QgsCoordinateTransform(input_filter[1], crs, transform_context))
+    read_extent = QgsRectangle(tile)
+    read_extent.grow(halo)
+    while True:
+        tile_filter = QgsGeometry.fromRect(read_extent)
+        if filter_geometry != None:
+            tile_filter = tile_filter.intersection(filter_geometry)
+            if tile_filter.isEmpty():
+                return(None, set())
+        layer, stats_list = readInputFiles(path_list, attribute_list, version_attribute_list, (tile_filter, crs))
+        if layer == None:
+            return(None, set())
+        transform = QgsCoordinateTransform(layer.crs(), crs, transform_context)
+        tile_id_set = set()
+        extent = None
+        for feature in layer.getFeatures(QgsFeatureRequest().setSubsetOfAttributes(['id'], layer.fields())):
+            geometry = QgsGeometry(feature.geometry())
+            geometry.transform(transform)
+            point = geometry.interpolate(geometry.length() / 2).asPoint()
+            #tiles include their lower, but not their upper border, so every way belongs to exactly one tile
+            if tile.xMinimum() <= point.x() < tile.xMaximum() and tile.yMinimum() <= point.y() < tile.yMaximum():
+                tile_id_set.add(feature.attribute('id'))
+                if extent == None:
+                    extent = geometry.boundingBox()
+                else:
+                    extent.combineExtentWith(geometry.boundingBox())
+        if not tile_id_set:
+            return(None, tile_id_set)
+        extent.grow(halo)
+        if read_extent.contains(extent):
+            return(layer, tile_id_set)
+        read_extent.combineExtentWith(extent)
+
+
+
+#get the set of ids of all ways of a layer intersecting an extent
+def getExtentIdSet(layer, extent):
+    return(set([feature.attribute('id') for feature in layer.getFeatures(QgsFeatureRequest().setFilterRect(extent).setFlags(QgsFeatureRequest.ExactIntersect))]))
+
+
+
+#fingerprint of a list of files (path, size and modification time) and additional values, e.g. to identify checkpoints of the same input data and parameters
+def getFingerprint(path_list, value_list=[]):
+    fingerprint = hashlib.sha1()
+    for path in path_list:
+        fingerprint.update(path.encode('utf-8'))
+        if os.path.exists(path):
+            fingerprint.update((str(os.path.getsize(path)) + ':' + str(os.path.getmtime(path))).encode('utf-8'))
+    for value in value_list:
+        fingerprint.update(str(value).encode('utf-8'))
+    return(fingerprint.hexdigest()[:16])
+
+
+
+#save a checkpoint after a processing step: the layer is saved as SQLite file, the code tables of enumerated attributes as json file
+#the layer file is written last under a temporary name and renamed when complete, so an existing layer file always belongs to a valid checkpoint
+def saveCheckpoint(prefix, stage, layer, category_tables):
+    path = prefix + 'step' + str(stage)
+    with open(path + '.json', 'w', encoding='utf-8') as file:
+        json.dump({'stage': stage, 'categories': {attr: [None] + category_tables[attr]['values'][1:] for attr in category_tables}}, file)
+    options = QgsVectorFileWriter.SaveVectorOptions()
+    options.driverName = 'SQLite'
+    options.fileEncoding = 'utf-8'
+    if os.path.exists(path + '.tmp.sqlite'):
+        os.remove(path + '.tmp.sqlite')
+    result = QgsVectorFileWriter.writeAsVectorFormatV2(layer, path + '.tmp.sqlite', QgsCoordinateTransformContext(), options)
+    if result[0] == QgsVectorFileWriter.NoError:
+        os.replace(path + '.tmp.sqlite', path + '.sqlite')
+
+
+
+#check whether two lists of code table values are the same up to the length of the shorter one
+def isCodePrefix(value_list_1, value_list_2):
+    length = min(len(value_list_1), len(value_list_2))
+    return(list(value_list_1[1:length]) == list(value_list_2[1:length]))
+
+
+
+#load the latest valid checkpoint: returns the step and a memory copy of the layer (or 0 and None, if there is no checkpoint)
+#the code tables of enumerated attributes are extended to the saved ones, checkpoints with different codes are ignored
+def loadCheckpoint(prefix, category_tables):
+    for stage in [3, 2, 1]:
+        path = prefix + 'step' + str(stage)
+        if not os.path.exists(path + '.sqlite') or not os.path.exists(path + '.json'):
+            continue
+        try:
+            with open(path + '.json', encoding='utf-8') as file:
+                saved_tables = json.load(file)['categories']
+        except (OSError, ValueError, KeyError):
+            continue
+        if not all(attr in saved_tables and isCodePrefix(saved_tables[attr], category_tables[attr]['values']) for attr in category_tables):
+            continue
+        layer = QgsVectorLayer(path + '.sqlite', 'checkpoint', 'ogr')
+        if not layer.isValid():
+            continue
+        for attr in category_tables:
+            for value in saved_tables[attr][len(category_tables[attr]['values']):]:
+                encodeValue(category_tables[attr], value)
+        return(stage, layer.materialize(QgsFeatureRequest()))
+    return(0, None)
+
+
+
+#delete all checkpoints with a prefix (including the checkpoints of tiles) - after a successful run they are not needed anymore
+def deleteCheckpoints(prefix):
+    directory, name = os.path.split(prefix)
+    if not os.path.isdir(directory):
+        return
+    for file_name in os.listdir(directory):
+        if file_name.startswith(name):
+            try:
+                os.remove(os.path.join(directory, file_name))
+            except OSError:
+                pass
+
+
+
+#plan the sidepath check of a path: get the results of the geometric check that are needed for it
+#("sidepath": sidepath status, "highway": highway class of the road, "maxspeed" and "name" of the road)
+#paths with an explicit sidepath status other than "yes" and paths that are deleted by the way type rules don't need any of them
+def getSidepathCheckParts(feature, deleted):
+    if deleted:
+        return([])
+    is_sidepath = feature.attribute('is_sidepath')
+    if feature.attribute('footway') == 'sidewalk':
+        is_sidepath = 'yes'
+    if is_sidepath and is_sidepath != 'yes':
+        return([])
+    parts = ['maxspeed', 'name']
+    if not is_sidepath:
+        parts.append('sidepath')
+    if not feature.attribute('is_sidepath:of'):
+        parts.append('highway')
+    return(parts)
+
+
+
+#order in which the check points of a path are evaluated: both endpoints, the middle and further bisections of the remaining intervals (indices of check points sorted along the path)
+def getBisectionOrder(count):
+    order = [0]
+    if count > 1:
+        order.append(count - 1)
+    interval_list = [(0, count - 1)]
+    for start, end in interval_list:
+        if end - start > 1:
+            middle = (start + end) // 2
+            order.append(middle)
+            interval_list += [(start, middle), (middle, end)]
+    return(order)
+
+
+
+#check whether a path can't be a sidepath any more: no road id, highway class or name can reach the needed number of checks with the remaining checks
+#(a path is a sidepath, if all checks - for paths with up to 2 checks - or at least 66 % of its checks found the same road id, highway class or name)
+def isNoSidepath(check_counts, checks, remaining):
+    if checks <= 2:
+        needed = checks
+    else:
+        needed = checks * 0.66
+    for counts in check_counts.values():
+        if max(counts.values(), default=0) + remaining >= needed:
+            return(False)
+    return(True)
+
+
+
+#the results of the sidepath check only depend on the geometries, some attributes and the buffer parameters - they are cached in a file named by a key of these inputs
+sidepath_key_attributes = ['id', 'highway', 'name', 'maxspeed', 'layer', 'footway', 'is_sidepath', 'is_sidepath:of']
+sidepath_result_attributes = ['proc_sidepath', 'proc_highway', 'proc_maxspeed', 'name']
+
+
+
+#get the key of the sidepath check for a layer: a hash of the crs, the given parameter values and the geometries and relevant attributes of all features
+def getSidepathKey(layer, value_list=[]):
+    fingerprint = hashlib.sha1()
+    fingerprint.update(layer.crs().authid().encode('utf-8'))
+    for value in value_list:
+        fingerprint.update(('|' + str(value)).encode('utf-8'))
+    positions = [layer.fields().indexOf(attr) for attr in sidepath_key_attributes]
+    for feature in layer.getFeatures():
+        attributes = feature.attributes()
+        fingerprint.update(repr([str(attributes[i]) if i != -1 else None for i in positions]).encode('utf-8'))
+        fingerprint.update(bytes(feature.geometry().asWkb()))
+    return(fingerprint.hexdigest()[:16])
+
+
+
+#save the results of the sidepath check for all features (in the order of the layer, enumerated attributes decoded into strings)
+def saveSidepathResults(path, layer, category_tables):
+    results = []
+    for feature in layer.getFeatures():
+        values = [feature.attribute(attr) for attr in sidepath_result_attributes]
+        values[1] = decodeValue(category_tables['proc_highway'], values[1])
+        results.append([value if value != NULL else None for value in values])
+    with open(path + '.tmp', 'w', encoding='utf-8') as file:
+        json.dump({'attributes': sidepath_result_attributes, 'results': results}, file)
+    os.replace(path + '.tmp', path)
+
+
+
+#apply cached results of the sidepath check to a layer - returns False if there are no valid results for this layer
+def loadSidepathResults(path, layer, category_tables):
+    if not os.path.exists(path):
+        return(False)
+    try:
+        with open(path, encoding='utf-8') as file:
+            cache = json.load(file)
+    except (OSError, ValueError):
+        return(False)
+    if cache.get('attributes') != sidepath_result_attributes or len(cache.get('results', [])) != layer.featureCount():
+        return(False)
+    positions = [layer.fields().indexOf(attr) for attr in sidepath_result_attributes]
+    layer.startEditing()
+    for feature, values in zip(layer.getFeatures(), cache['results']):
+        values = [value if value != None else NULL for value in values]
+        values[1] = encodeValue(category_tables['proc_highway'], values[1])
+        layer.changeAttributeValues(feature.id(), dict(zip(positions, values)))
+    layer.commitChanges()
+    return(True)
+
+
+
+#create an interactive session: results of a run are kept in the python console and reused by the next run (see getSessionStage)
+def createSession():
+    return({'key': None, 'parameters': None, 'stage': 0})
+
+
+
+#get a comparable copy of all parameters of a parameter module: the representation of every value and the keys of dicts
+def getParameterSnapshot(module):
+    snapshot = {}
+    for name, value in vars(module).items():
+        if name.startswith('_') or name == 'NULL' or callable(value) or type(value) == type(os):
+            continue
+        snapshot[name] = {'value': repr(value), 'keys': repr(list(value.keys())) if type(value) == dict else None}
+    return(snapshot)
+
+
+
+#get the names of all parameters that differ between two parameter snapshots
+def getChangedParameters(snapshot_1, snapshot_2):
+    return(sorted([name for name in set(snapshot_1) | set(snapshot_2) if snapshot_1.get(name) != snapshot_2.get(name)]))
+
+
+
+#dependency graph of the derived attributes: for every attribute, the processing step deriving it, the derived attributes it depends on and the parameters it depends on
+#("parameter_keys": depends only on which keys a dict parameter has, not on its values; step 5: attributes of the vectorized scoring, step 4: all other attributes of steps 4 and 5)
+#"offset" stands for the split and shifted geometries of step 2, "data_missing" for the list of missing values collected in steps 4 and 5
+#attributes that only depend on whether there is a base index depend on the keys of the base index dicts, not on the base index
+width_parameter_list = ['default_highway_width_dict', 'default_highway_width_fallback', 'default_width_traffic_lane', 'default_width_bus_lane', 'default_width_cycle_lane', 'default_width_parking_parallel', 'default_width_parking_diagonal', 'default_width_parking_perpendicular']
+surface_parameter_list = ['default_cycleway_surface_tracks', 'default_cycleway_surface_lanes', 'default_highway_surface_dict', 'default_track_surface_dict']
+attribute_dependency_dict = {
+    'proc_sidepath': {'step': 1, 'attributes': [], 'parameters': ['crs_metric', 'sidepath_buffer_size', 'sidepath_buffer_distance', 'attributes_list', 'version_attributes_list']},
+    'proc_highway': {'step': 1, 'attributes': ['proc_sidepath'], 'parameters': []},
+    'proc_maxspeed': {'step': 1, 'attributes': ['proc_sidepath'], 'parameters': []},
+    'offset': {'step': 2, 'attributes': ['proc_sidepath'], 'parameters': ['offset_distance', 'default_highway_width_dict', 'default_highway_width_fallback']},
+    'way_type': {'step': 3, 'attributes': ['proc_sidepath', 'offset'], 'parameters': []},
+    'proc_oneway': {'step': 4, 'attributes': ['way_type', 'offset'], 'parameters': ['default_oneway_cycle_lane', 'default_oneway_cycle_track']},
+    'proc_width': {'step': 4, 'attributes': ['way_type', 'proc_oneway'], 'parameters': width_parameter_list},
+    'proc_surface': {'step': 4, 'attributes': ['way_type'], 'parameters': surface_parameter_list, 'parameter_keys': ['surface_factor_dict']},
+    'proc_smoothness': {'step': 4, 'attributes': ['way_type'], 'parameters': [], 'parameter_keys': ['smoothness_factor_dict']},
+    'proc_traffic_mode_left': {'step': 4, 'attributes': ['way_type', 'offset'], 'parameters': ['right_hand_traffic']},
+    'proc_traffic_mode_right': {'step': 4, 'attributes': ['way_type', 'offset'], 'parameters': ['right_hand_traffic']},
+    'proc_separation_left': {'step': 4, 'attributes': ['way_type', 'offset'], 'parameters': ['right_hand_traffic']},
+    'proc_separation_right': {'step': 4, 'attributes': ['way_type', 'offset'], 'parameters': ['right_hand_traffic']},
+    'proc_buffer_left': {'step': 4, 'attributes': ['way_type', 'offset'], 'parameters': ['right_hand_traffic']},
+    'proc_buffer_right': {'step': 4, 'attributes': ['way_type', 'offset'], 'parameters': ['right_hand_traffic']},
+    'proc_mandatory': {'step': 4, 'attributes': ['way_type', 'proc_sidepath', 'proc_oneway'], 'parameters': ['mandatory_traffic_sign_list', 'not_mandatory_traffic_sign_list', 'cycling_highway_prohibition_list']},
+    'proc_traffic_sign': {'step': 4, 'attributes': [], 'parameters': []},
+    'filter_usable': {'step': 4, 'attributes': ['proc_mandatory'], 'parameters': []},
+    'filter_way_type': {'step': 4, 'attributes': ['way_type'], 'parameters': []},
+    'data_missing_width': {'step': 4, 'attributes': ['way_type'], 'parameters': []},
+    'data_missing_parking': {'step': 4, 'attributes': ['way_type'], 'parameters': []},
+    'data_missing_surface': {'step': 4, 'attributes': ['way_type'], 'parameters': []},
+    'data_missing_smoothness': {'step': 4, 'attributes': ['way_type'], 'parameters': []},
+    'data_missing_maxspeed': {'step': 4, 'attributes': ['way_type', 'proc_sidepath', 'proc_highway', 'proc_maxspeed'], 'parameters': []},
+    'data_missing_lit': {'step': 4, 'attributes': ['way_type'], 'parameters': [], 'parameter_keys': ['base_index_dict', 'motor_vehicle_access_index_dict']},
+    'data_missing': {'step': 4, 'attributes': ['data_missing_width', 'data_missing_parking', 'data_missing_surface', 'data_missing_smoothness', 'data_missing_maxspeed', 'data_missing_lit'], 'parameters': []},
+    'data_incompleteness': {'step': 5, 'attributes': ['data_missing'], 'parameters': ['data_incompleteness_dict']},
+    'stress_level': {'step': 4, 'attributes': ['way_type', 'proc_oneway', 'proc_width', 'proc_highway', 'proc_maxspeed'], 'parameters': [], 'parameter_keys': ['motor_vehicle_access_index_dict']},
+    'base_index': {'step': 5, 'attributes': ['way_type'], 'parameters': ['base_index_dict', 'motor_vehicle_access_index_dict']},
+    'fac_width': {'step': 5, 'attributes': ['way_type', 'proc_width', 'proc_oneway'], 'parameters': [], 'parameter_keys': ['motor_vehicle_access_index_dict']},
+    'fac_surface': {'step': 5, 'attributes': ['proc_surface', 'proc_smoothness'], 'parameters': ['surface_factor_dict', 'smoothness_factor_dict']},
+    'fac_highway': {'step': 5, 'attributes': ['proc_highway'], 'parameters': ['highway_factor_dict']},
+    'fac_maxspeed': {'step': 5, 'attributes': ['proc_maxspeed'], 'parameters': ['maxspeed_factor_dict']},
+    'fac_1': {'step': 5, 'attributes': ['fac_width', 'fac_surface'], 'parameters': []},
+    'fac_2': {'step': 5, 'attributes': ['way_type', 'proc_sidepath', 'fac_highway', 'fac_maxspeed'], 'parameters': ['highway_factor_dict_weights']},
+    'fac_3': {'step': 5, 'attributes': [], 'parameters': []},
+    'fac_4': {'step': 4, 'attributes': ['way_type', 'proc_sidepath', 'proc_traffic_mode_left', 'proc_traffic_mode_right', 'proc_buffer_left', 'proc_buffer_right'], 'parameters': [], 'parameter_keys': ['base_index_dict', 'motor_vehicle_access_index_dict']},
+    'index': {'step': 5, 'attributes': ['base_index', 'fac_1', 'fac_2', 'fac_3', 'fac_4'], 'parameters': []},
+    'index_10': {'step': 5, 'attributes': ['index'], 'parameters': []},
+    'data_bonus': {'step': 5, 'attributes': ['way_type', 'fac_width', 'fac_surface', 'fac_2', 'fac_4'], 'parameters': []},
+    'data_malus': {'step': 5, 'attributes': ['fac_width', 'fac_surface', 'fac_highway', 'fac_maxspeed', 'fac_2', 'fac_4'], 'parameters': []}
+}
+
+
+
+#get all attributes needed to derive a list of attributes (including the attributes themselves)
+def getRequiredAttributes(dependency_dict, attribute_list):
+    required = set()
+    attribute_stack = [attr for attr in attribute_list if attr in dependency_dict]
+    while attribute_stack:
+        attr = attribute_stack.pop()
+        if attr in required:
+            continue
+        required.add(attr)
+        attribute_stack += dependency_dict[attr]['attributes']
+    return(required)
+
+
+
+#get all attributes affected by changed parameters: parameter values changed (parameter_list) or keys of dict parameters changed (key_parameter_list)
+def getAffectedAttributes(dependency_dict, parameter_list, key_parameter_list=[]):
+    affected = set()
+    for attr in dependency_dict:
+        if any(name in dependency_dict[attr]['parameters'] for name in parameter_list + key_parameter_list) or any(name in dependency_dict[attr].get('parameter_keys', []) for name in key_parameter_list):
+            affected.add(attr)
+    #attributes depending on affected attributes are affected as well
+    changed = True
+    while changed:
+        changed = False
+        for attr in dependency_dict:
+            if attr not in affected and any(dependency in affected for dependency in dependency_dict[attr]['attributes']):
+                affected.add(attr)
+                changed = True
+    return(affected)
+
+
+
+#get the processing stage an interactive session can continue from after changing parameters, according to the attributes affected by the changed parameters:
+#0: process everything (first run, other input data or code, or attributes of steps 1 to 3 affected)
+#4: continue with the kept results of step 3
+#5: only recalculate the index from the kept scoring input (only attributes of the vectorized scoring affected)
+def getSessionStage(session, key, parameters, dependency_dict):
+    if session['key'] != key or 'layer_step3' not in session:
+        return(0)
+    changed_list = getChangedParameters(session['parameters'], parameters)
+    #parameters that aren't part of the dependency graph could affect anything
+    if any(name not in session['parameters'] or name not in parameters or not any(name in dependency_dict[attr]['parameters'] or name in dependency_dict[attr].get('parameter_keys', []) for attr in dependency_dict) for name in changed_list):
+        return(0)
+    key_changed_list = [name for name in changed_list if session['parameters'][name]['keys'] != parameters[name]['keys']]
+    affected = getAffectedAttributes(dependency_dict, changed_list, key_changed_list)
+    if any(dependency_dict[attr]['step'] <= 3 for attr in affected):
+        return(0)
+    if 'layer' in session and all(dependency_dict[attr]['step'] == 5 for attr in affected):
+        return(5)
+    return(4)
+
+
+
+#the output is written in a background thread: finished features are passed in batches through a bounded queue and the file is flushed periodically
+output_batch_size = 1000 #features per batch
+output_queue_size = 16 #maximum number of batches waiting to be written
+output_flush_interval = 30 #seconds between flushing the output file
+#OGR driver and layer options for every output file format (GeoParquet is written with native attribute types and compressed)
+output_driver_dict = {
+    '.geojson': ('GeoJSON', []),
+    '.parquet': ('Parquet', ['COMPRESSION=ZSTD', 'GEOMETRY_ENCODING=WKB']),
+    '.gpkg': ('GPKG', [])
+}
+#GeoJSON and GeoParquet files are only valid when they are completely written - they are written as GeoJSON sequence first (one feature per line, so every flushed line is valid and the saved features can be used if the processing is aborted) and converted when the writer is closed
+output_sequence_driver_list = ['GeoJSON', 'Parquet']
+
+
+
+#start a background thread writing features of a layer to an output file (retaining a list of attributes, decoding enumerated attributes and bit masks into strings and reprojecting to the output crs)
+def startOutputWriter(path, layer, attribute_list, category_tables, crs):
+    writer = {'queue': queue.Queue(maxsize=output_queue_size), 'fields': QgsFields(), 'field_ids': [], 'tables': [], 'count': 0, 'error': None}
+    for field in layer.fields():
+        if field.name() not in attribute_list:
+            continue
+        writer['field_ids'].append(layer.fields().indexOf(field.name()))
+        if field.name() in category_tables:
+            writer['fields'].append(QgsField(field.name(), QVariant.String))
+            writer['tables'].append(category_tables[field.name()])
+        elif field.name() in flag_tables:
+            writer['fields'].append(QgsField(field.name(), QVariant.String))
+            writer['tables'].append(flag_tables[field.name()])
+        else:
+            writer['fields'].append(QgsField(field))
+            writer['tables'].append(None)
+    writer['transform'] = QgsCoordinateTransform(layer.crs(), crs, transform_context)
+    writer['thread'] = threading.Thread(target=runOutputWriter, args=(writer, path, layer.wkbType(), crs), daemon=True)
+    writer['thread'].start()
+    return(writer)
+
+
+
+#write batches of features from the queue until the writer is closed
+def runOutputWriter(writer, path, wkb_type, crs):
+    driver_name, layer_options = output_driver_dict.get(os.path.splitext(path)[1].lower(), output_driver_dict['.geojson'])
+    working_path = path
+    options = QgsVectorFileWriter.SaveVectorOptions()
+    options.driverName, options.layerOptions = driver_name, layer_options
+    if driver_name in output_sequence_driver_list:
+        working_path = os.path.splitext(path)[0] + '.geojsonseq'
+        options.driverName, options.layerOptions = 'GeoJSONSeq', ['COORDINATE_PRECISION=15']
+        if os.path.exists(working_path):
+            os.remove(working_path)
+    options.fileEncoding = 'utf-8'
+    file_writer = QgsVectorFileWriter.create(working_path, writer['fields'], wkb_type, crs, QgsCoordinateTransformContext(), options)
+    if file_writer.hasError() != QgsVectorFileWriter.NoError:
+        writer['error'] = file_writer.errorMessage()
+    last_flush = time.time()
+    while True:
+        batch = writer['queue'].get()
+        if batch == None:
+            break
+        #after an error, the queue is still emptied to not block the processing
+        if writer['error']:
+            continue
+        try:
+            for feature in batch:
+                attributes = feature.attributes()
+                values = []
+                for field_id, table in zip(writer['field_ids'], writer['tables']):
+                    if table == None:
+                        values.append(attributes[field_id])
+                    elif 'bits' in table:
+                        values.append(decodeFlags(table, attributes[field_id]))
+                    else:
+                        values.append(decodeValue(table, attributes[field_id]))
+                output_feature = QgsFeature(writer['fields'])
+                output_feature.setAttributes(values)
+                geometry = feature.geometry()
+                geometry.transform(writer['transform'])
+                output_feature.setGeometry(geometry)
+                if not file_writer.addFeature(output_feature):
+                    writer['error'] = file_writer.errorMessage()
+                    break
+                writer['count'] += 1
+        except Exception as e:
+            writer['error'] = str(e)
+        if time.time() - last_flush > output_flush_interval:
+            file_writer.flushBuffer()
+            last_flush = time.time()
+    #closes the file
+    del file_writer
+    #convert the GeoJSON sequence into the output format (if the conversion fails, the GeoJSON sequence is kept)
+    if working_path != path and not writer['error']:
+        from osgeo import gdal
+        try:
+            if os.path.exists(path):
+                os.remove(path)
+            dataset = gdal.VectorTranslate(path, working_path, format=driver_name, dstSRS=crs.authid(), layerCreationOptions=layer_options)
+            if dataset == None:
+                writer['error'] = 'conversion of "' + working_path + '" failed: ' + gdal.GetLastErrorMsg()
+            else:
+                dataset = None
+                os.remove(working_path)
+        except Exception as e:
+            writer['error'] = 'conversion of "' + working_path + '" failed: ' + str(e)
+
+
+
+#pass the features of a layer to the output writer (optionally only features with an id from a given set)
+def writeOutputFeatures(writer, layer, id_set=None):
+    batch = []
+    for feature in layer.getFeatures():
+        if id_set != None and feature.attribute('id') not in id_set:
+            continue
+        batch.append(feature)
+        if len(batch) >= output_batch_size:
+            writer['queue'].put(batch)
+            batch = []
+    if batch:
+        writer['queue'].put(batch)
+
+
+
+#wait until all features are written and close the output file - returns the number of written features and an error message (if any)
+def closeOutputWriter(writer):
+    writer['queue'].put(None)
+    writer['thread'].join()
+    return(writer['count'], writer['error'])
+
+
+
+#write a saved output data set as vector tile pyramid (MBTiles) - geometries are clipped and generalised to the tile grid of every zoom level, below the detail zoom level only the given attributes are retained
+#returns an error message (or None)
+def writeVectorTiles(input_path, path, attribute_list, min_zoom, detail_zoom, max_zoom):
+    layer = QgsVectorLayer(input_path, 'cycling_quality_index', 'ogr')
+    tile_layer_list = []
+    if min_zoom < detail_zoom:
+        layer_overview = runProcessing('native:retainfields', {'INPUT' : layer, 'FIELDS' : attribute_list}, 'cycling_quality_index_overview')
+        tile_layer = QgsVectorTileWriter.Layer(layer_overview)
+        tile_layer.setLayerName('cycling_quality_index')
+        tile_layer.setMinZoom(min_zoom)
+        tile_layer.setMaxZoom(min(detail_zoom, max_zoom + 1) - 1)
+        tile_layer_list.append(tile_layer)
+    if detail_zoom <= max_zoom:
+        tile_layer = QgsVectorTileWriter.Layer(layer)
+        tile_layer.setLayerName('cycling_quality_index')
+        tile_layer.setMinZoom(max(detail_zoom, min_zoom))
+        tile_layer.setMaxZoom(max_zoom)
+        tile_layer_list.append(tile_layer)
+    if os.path.exists(path):
+        os.remove(path)
+    writer = QgsVectorTileWriter()
+    writer.setDestinationUri('type=mbtiles&url=' + path)
+    writer.setMinZoom(min_zoom)
+    writer.setMaxZoom(max_zoom)
+    writer.setLayers(tile_layer_list)
+    writer.setTransformContext(transform_context)
+    writer.setMetadata({'name': 'Cycling Quality Index', 'attribution': '© OpenStreetMap contributors', 'type': 'overlay'})
+    if not writer.writeTiles(processing_feedback):
+        return(writer.errorMessage())
+    return(None)
+
+
+
+#processing stages and their estimated share of the processing time in percent (for the progress of background tasks)
+progress_stage_list = ['sidepath check', 'split line bundles', 'way type', 'attributes and index', 'output']
+progress_stage_dict = {'sidepath check': 40, 'split line bundles': 10, 'way type': 5, 'attributes and index': 40, 'output': 5}
+
+
+
+#create the progress of a background task, optionally processed in several parts (e.g. tiles) - all processing algorithms get the feedback of the task
+def createProgress(task, parts=1):
+    global processing_feedback
+    progress = {'task': task, 'feedback': QgsProcessingFeedback(), 'start': time.time(), 'part': 0, 'parts': max(parts, 1)}
+    processing_feedback = progress['feedback']
+    return(progress)
+
+
+
+#report the progress of a processing stage (share: progress within the stage from 0 to 1) - raises an exception, if the task was canceled
+#at the start of a stage, the estimated remaining time is printed
+def setProgress(progress, stage, share):
+    if progress == None:
+        return
+    if progress['task'].isCanceled():
+        progress['feedback'].cancel()
+        raise QgsProcessingException('Processing canceled')
+    done = sum([progress_stage_dict[name] for name in progress_stage_list[:progress_stage_list.index(stage)]]) + progress_stage_dict[stage] * min(share, 1)
+    percent = (progress['part'] + done / 100) / progress['parts'] * 100
+    progress['task'].setProgress(percent)
+    progress['feedback'].setProgress(percent)
+    if share == 0 and percent >= 1:
+        remaining = (time.time() - progress['start']) * (100 - percent) / percent
+        progress['feedback'].setProgressText(stage + ': ' + str(int(percent)) + ' % done, about ' + str(int(remaining // 60) + 1) + ' min remaining')
+        print(time.strftime('%H:%M:%S', time.localtime()), '   (' + str(int(percent)) + ' % done, about ' + str(int(remaining // 60) + 1) + ' min remaining)')
@@ -245,6 +245,14 @@ motor_vehicle_access_index_dict = {
     'destination': 70
 }
 
+#parameter variants for the parameter sweep mode (see cycling_quality_index.py)
+#every variant has a name and overrides some of the scoring parameters (base_index_dict, motor_vehicle_access_index_dict, surface_factor_dict, smoothness_factor_dict, highway_factor_dict, highway_factor_dict_weights, maxspeed_factor_dict)
+#dicts are updated entry by entry, the index of every variant is saved as "index_<name>"
+sweep_variant_list = [
+#    {'name': 'track_95', 'base_index_dict': {'cycle track': 95}},
+#    {'name': 'sett_05', 'surface_factor_dict': {'sett': 0.5}, 'maxspeed_factor_dict': {50: 0.9}}
+]
+
 #list of traffic signs, that make a way or path mandatory to use for cyclists
 #this lists are for DE:; adjust it if needed
 mandatory_traffic_sign_list = ['237', '240', '241']
@@ -460,6 +468,10 @@ attributes_list = [
     'crossing:markings'
     ]
 
+#attributes with the version of a way (if available in the input data, e.g. when using "out meta" in the overpass query) - if a way is contained in several input files, the newest version is kept
+#the first attribute of the list that is present in an input file is used
+version_attributes_list = ['@version', 'version']
+
 #list of attributes that are retained in the finally saved file
 attributes_list_finally_retained = [
     'id',
@@ -513,4 +525,11 @@ attributes_list_finally_retained = [
     'data_missing_lit',
     'filter_way_type',
     'filter_usable'
-]
\ No newline at end of file
+]
+
+#vector tile export (see cycling_quality_index.py): zoom levels of the tile pyramid
+#below the detail zoom level, only the attributes of vector_tile_attributes_list are retained - from the detail zoom level on, all finally retained attributes
+vector_tile_min_zoom = 8
+vector_tile_detail_zoom = 13
+vector_tile_max_zoom = 15
+vector_tile_attributes_list = ['index', 'index_10', 'stress_level', 'way_type']
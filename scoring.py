@@ -0,0 +1,542 @@
+import csv, json, math, types
+import numpy as np
+from qgis.core import NULL
+import definitions as d
+
+#way types on which cyclists share the road with motor vehicles
+shared_road_way_type_list = ['bicycle road', 'shared road', 'shared traffic lane', 'shared bus lane', 'track or service']
+#way types, on which the base index depends on motor vehicle access restrictions
+motor_vehicle_access_way_type_list = ['bicycle road', 'shared road', 'shared traffic lane', 'track or service']
+#way types, for which the highway factor only counts if they are a sidepath
+sidepath_way_type_list = ['shared path', 'segregated path', 'shared footway']
+
+#attributes that are collected for every feature to calculate the index in a vectorized way
+#(enumerated attributes are collected as integer codes, see definitions.createCategoryTables)
+scoring_input_list = [
+    'fid',
+    'way_type',
+    'motor_vehicle_access',
+    'proc_width',
+    'proc_oneway',
+    'proc_surface',
+    'proc_smoothness',
+    'proc_highway',
+    'proc_maxspeed',
+    'proc_sidepath',
+    'fac_4',
+    'data_bonus',
+    'data_malus',
+    'data_missing',
+    'data_missing_repeated'
+]
+scoring_code_list = ['way_type', 'proc_oneway', 'proc_surface', 'proc_smoothness', 'proc_highway']
+#bonus and malus of the other attributes and missing values are collected as bit masks (see definitions.flag_tables)
+scoring_flag_list = ['data_bonus', 'data_malus', 'data_missing', 'data_missing_repeated']
+
+#human readable strings for significant good or bad factors
+scoring_bonus_list = ['wide width', 'excellent surface', 'slow traffic']
+scoring_malus_list = ['narrow width', 'bad surface', 'along a major road', 'along a road with high speed limits']
+
+#attributes that are calculated in a vectorized way
+scoring_output_list = [
+    'base_index',
+    'fac_width',
+    'fac_surface',
+    'fac_highway',
+    'fac_maxspeed',
+    'fac_1',
+    'fac_2',
+    'fac_3',
+    'fac_4',
+    'index',
+    'index_10',
+    'data_bonus',
+    'data_malus'
+]
+
+
+
+#create an empty column store for the scoring input of all features
+def createScoringColumns():
+    columns = {}
+    for attr in scoring_input_list:
+        columns[attr] = []
+    return(columns)
+
+
+
+#add the scoring input of one feature to the column store (NULL values are stored as 0, NaN resp. '')
+def addScoringRow(columns, **values):
+    for attr in scoring_input_list:
+        value = values[attr]
+        if attr in scoring_code_list or attr in scoring_flag_list:
+            if not isinstance(value, int):
+                value = 0
+        elif attr in ['proc_width', 'proc_maxspeed', 'fac_4']:
+            if not isinstance(value, (int, float)):
+                value = math.nan
+        elif attr != 'fid' and not isinstance(value, str):
+            value = ''
+        columns[attr].append(value)
+
+
+
+#add only the bit masks of missing values of one feature to the column store (without vectorized scoring, they are only needed for the data incompleteness)
+def addIncompletenessRow(columns, fid, data_missing, data_missing_repeated):
+    columns['fid'].append(fid)
+    columns['data_missing'].append(data_missing)
+    columns['data_missing_repeated'].append(data_missing_repeated)
+
+
+
+#look up the values of a dict for an array of keys, keys not in the dict get a default value
+def lookupArray(keys, value_dict, default):
+    unique_keys, inverse = np.unique(keys, return_inverse=True)
+    values = np.array([value_dict[key] if key in value_dict else default for key in unique_keys], dtype=float)
+    return(values[inverse.reshape(-1)])
+
+
+
+#get an array for looking up the values of a dict by the integer codes of its keys (codes without a dict entry get a default value)
+def getCodeLookup(table, value_dict, default):
+    return(np.array([value_dict[value] if code and value in value_dict else default for code, value in enumerate(table['values'])], dtype=float))
+
+
+
+#mask of values that would evaluate to True in the scalar calculation (not NULL and not 0)
+def isTruthy(values):
+    return(~np.isnan(values) & (values != 0))
+
+
+
+#calculate the width factor for a single calculated width (logistic regression)
+def getWidthFactor(calc_width, shared_road, restricted_access, minimum_factor):
+    #factor should not be negative and not 0, since the following logistic regression isn't working for 0
+    calc_width = max(0.001, calc_width)
+    #regular formula
+    if calc_width <= 3 or shared_road:
+        fac_width = 1.1 / (1 + 20 * math.e ** (-2.1 * calc_width))
+    #formula for extra wide ways (not used for shared roads and lanes)
+    else:
+        fac_width = 2 / (1 + 1.8 * math.e ** (-0.24 * calc_width))
+    #on roads with restricted motor vehicle access, the width factor has a lower weight, because it can be assumed that there is less traffic that shares the road width
+    if restricted_access:
+        fac_width = fac_width + ((1 - fac_width) / 2)
+    return(round(max(minimum_factor, fac_width), 3))
+
+
+
+#calculate the width factor for an array of calculated widths (NaN: no width factor)
+def getWidthFactorArray(calc_width, shared_road, restricted_access, minimum_factor):
+    fac_width = np.full(len(calc_width), np.nan)
+    valid = isTruthy(calc_width)
+    width = np.maximum(0.001, calc_width[valid])
+    regular = width <= 3
+    if shared_road:
+        regular[:] = True
+    factor = np.where(regular, 1.1 / (1 + 20 * np.power(math.e, -2.1 * width)), 2 / (1 + 1.8 * np.power(math.e, -0.24 * width)))
+    restricted = restricted_access[valid]
+    factor = np.where(restricted, factor + ((1 - factor) / 2), factor)
+    factor = np.maximum(minimum_factor, factor)
+    rounded = np.round(factor, 3)
+    #numpy rounds scaled values and may differ from Python's round() close to a rounding boundary - calculate those values exactly like the scalar path
+    scaled = factor * 1000
+    for i in np.flatnonzero(np.abs(scaled - np.floor(scaled) - 0.5) < 0.000001):
+        rounded[i] = getWidthFactor(float(calc_width[valid][i]), shared_road, bool(restricted[i]), minimum_factor)
+    fac_width[valid] = rounded
+    return(fac_width)
+
+
+
+#calculate base index, factors and index for all features of one way type group
+def calculateWayTypeGroup(way_type, data, par):
+    count = len(data['proc_width'])
+    result = {}
+
+    #base index according to way type, or according to motor vehicle access restrictions
+    base_index = np.full(count, float(par.base_index_dict[way_type]) if way_type in par.base_index_dict else np.nan)
+    restricted_access = np.zeros(count, dtype=bool)
+    if way_type in motor_vehicle_access_way_type_list:
+        restricted_access = np.isin(data['motor_vehicle_access'], list(par.motor_vehicle_access_index_dict.keys()))
+        base_index = np.where(restricted_access, lookupArray(data['motor_vehicle_access'], par.motor_vehicle_access_index_dict, np.nan), base_index)
+    result['base_index'] = base_index
+
+    #width factor: derive a comparable width value depending on way type
+    shared_road = way_type in shared_road_way_type_list
+    calc_width = data['proc_width'].copy()
+    has_width = isTruthy(calc_width)
+    oneway = data['oneway']
+    dedicated = np.full(count, not shared_road) | (data['motor_vehicle_access'] == 'no')
+    shared = ~dedicated & has_width
+    calc_width = np.where(dedicated & has_width & ~oneway, calc_width / 1.6, calc_width)
+    if way_type == 'shared traffic lane':
+        calc_width = np.where(shared, np.maximum(calc_width - 2 + ((4.5 - calc_width) / 3), 0), calc_width)
+    elif way_type == 'shared bus lane':
+        calc_width = np.where(shared, np.maximum(calc_width - 3 + ((5.5 - calc_width) / 3), 0), calc_width)
+    else:
+        calc_width = np.where(shared & ~oneway, calc_width / 1.6, calc_width)
+        calc_width = np.where(shared, calc_width - 2, calc_width)
+    minimum_factor = np.where(dedicated, 0, 0.25)
+    fac_width = np.full(count, np.nan)
+    for factor in [0, 0.25]:
+        group = minimum_factor == factor
+        if group.any():
+            fac_width[group] = getWidthFactorArray(calc_width[group], shared_road, restricted_access[group], factor)
+    result['fac_width'] = fac_width
+
+    #surface and smoothness factor
+    fac_surface = np.where(~np.isnan(data['fac_smoothness']), data['fac_smoothness'], data['fac_surface'])
+    result['fac_surface'] = fac_surface
+
+    #highway and maxspeed factor
+    fac_highway = data['fac_highway']
+    fac_maxspeed = np.ones(count)
+    proc_maxspeed = data['proc_maxspeed']
+    has_maxspeed = isTruthy(proc_maxspeed)
+    for maxspeed in par.maxspeed_factor_dict.keys():
+        fac_maxspeed = np.where(has_maxspeed & (proc_maxspeed >= maxspeed), par.maxspeed_factor_dict[maxspeed], fac_maxspeed)
+    result['fac_highway'] = fac_highway
+    result['fac_maxspeed'] = fac_maxspeed
+
+    #factor 1: width and surface, weighted so that low values have a stronger influence on the index
+    has_fac_width = isTruthy(fac_width)
+    has_fac_surface = isTruthy(fac_surface)
+    weight_factor_width = np.maximum(1 - fac_width, 0) + 0.5
+    weight_factor_surface = np.maximum(1 - fac_surface, 0) + 0.5
+    fac_1 = np.ones(count)
+    fac_1 = np.where(has_fac_surface, fac_surface, fac_1)
+    fac_1 = np.where(has_fac_width, fac_width, fac_1)
+    fac_1 = np.where(has_fac_width & has_fac_surface, (weight_factor_width * fac_width + weight_factor_surface * fac_surface) / (weight_factor_width + weight_factor_surface), fac_1)
+
+    #factor 2: highway and maxspeed, weighted according to how close the bicycle traffic is to the motor traffic
+    weight = np.full(count, float(par.highway_factor_dict_weights[way_type]) if way_type in par.highway_factor_dict_weights else 1.0)
+    if way_type in sidepath_way_type_list:
+        weight = np.where(data['sidepath'], weight, 0)
+    fac_2 = fac_highway * fac_maxspeed
+    fac_2 = fac_2 + ((1 - fac_2) * (1 - weight))
+    fac_2 = np.where(fac_2 == 0, 1, fac_2)
+
+    #factor 3: separation and buffer, factor 4: miscellaneous attributes (already derived per feature)
+    fac_3 = np.ones(count)
+    fac_4 = data['fac_4']
+
+    valid = ~np.isnan(base_index)
+    index = base_index * fac_1 * fac_2 * fac_3 * fac_4
+    index = np.rint(np.maximum(np.minimum(100, index), 0))
+    nan = np.full(count, np.nan)
+    result['fac_1'] = np.where(valid, fac_1, nan)
+    result['fac_2'] = np.where(valid, fac_2, nan)
+    result['fac_3'] = np.where(valid, fac_3, nan)
+    result['fac_4'] = np.where(valid, fac_4, nan)
+    result['index'] = np.where(valid, index, nan)
+    result['index_10'] = np.where(valid, index // 10, nan)
+
+    #human readable strings for significant good or bad factors, stored as bit masks (see scoring_bonus_list and scoring_malus_list)
+    significant = valid & (weight >= 0.5)
+    result['weight'] = weight
+    result['restricted_access'] = restricted_access
+    result['bonus'] = getBitMask([fac_width > 1, fac_surface > 1, significant & (fac_2 > 1)], scoring_bonus_list, d.flag_tables['data_bonus'])
+    result['malus'] = getBitMask([has_fac_width & (fac_width <= 0.5), has_fac_surface & (fac_surface <= 0.5), significant & (fac_highway <= 0.7), significant & (fac_maxspeed <= 0.7)], scoring_malus_list, d.flag_tables['data_malus'])
+    return(result)
+
+
+
+#calculate base index, factors and index for all collected features at once, grouped by way type
+def calculateIndexVectorized(columns, par, categories):
+    count = len(columns['fid'])
+    #dict lookups are done by indexing arrays with the integer codes of the enumerated attributes
+    oneway_lookup = np.array([isinstance(value, str) and 'yes' in value for value in categories['proc_oneway']['values']], dtype=bool)
+    smoothness_lookup = getCodeLookup(categories['proc_smoothness'], par.smoothness_factor_dict, np.nan)
+    surface_lookup = getCodeLookup(categories['proc_surface'], par.surface_factor_dict, np.nan)
+    highway_lookup = getCodeLookup(categories['proc_highway'], par.highway_factor_dict, 1)
+    way_type_codes = np.array(columns['way_type'], dtype=int)
+    data = {
+        'motor_vehicle_access': np.array(columns['motor_vehicle_access'], dtype=str),
+        'proc_width': np.array(columns['proc_width'], dtype=float),
+        'oneway': oneway_lookup[np.array(columns['proc_oneway'], dtype=int)],
+        'fac_smoothness': smoothness_lookup[np.array(columns['proc_smoothness'], dtype=int)],
+        'fac_surface': surface_lookup[np.array(columns['proc_surface'], dtype=int)],
+        'fac_highway': highway_lookup[np.array(columns['proc_highway'], dtype=int)],
+        'proc_maxspeed': np.array(columns['proc_maxspeed'], dtype=float),
+        'sidepath': np.array([value == 'yes' for value in columns['proc_sidepath']], dtype=bool),
+        'fac_4': np.array(columns['fac_4'], dtype=float)
+    }
+    scores = {}
+    for attr in ['base_index', 'fac_width', 'fac_surface', 'fac_highway', 'fac_maxspeed', 'fac_1', 'fac_2', 'fac_3', 'fac_4', 'index', 'index_10']:
+        scores[attr] = np.full(count, np.nan)
+    scores['weight'] = np.full(count, np.nan)
+    scores['restricted_access'] = np.zeros(count, dtype=bool)
+    scores['bonus'] = np.zeros(count, dtype=int)
+    scores['malus'] = np.zeros(count, dtype=int)
+
+    for way_type in np.unique(way_type_codes).tolist():
+        rows = np.flatnonzero(way_type_codes == way_type)
+        group = {}
+        for attr in data:
+            group[attr] = data[attr][rows]
+        result = calculateWayTypeGroup(categories['way_type']['values'][way_type], group, par)
+        for attr in result:
+            scores[attr][rows] = result[attr]
+    return(scores)
+
+
+
+#calculate the data incompleteness of all collected features at once: sum of the weights of all missing values (values missing repeatedly are weighted again)
+def calculateIncompletenessVectorized(columns, par):
+    flag_table = d.flag_tables['data_missing']
+    bits = np.array([flag_table['bits'][value] for value in flag_table['values']], dtype=int)
+    weights = np.array([par.data_incompleteness_dict[value] if value in par.data_incompleteness_dict else 0 for value in flag_table['values']], dtype=float)
+    incompleteness = np.zeros(len(columns['fid']))
+    for attr in ['data_missing', 'data_missing_repeated']:
+        masks = np.array(columns[attr], dtype=int)
+        incompleteness += ((masks[:, None] & bits) != 0) @ weights
+    return(incompleteness)
+
+
+
+#combine a list of boolean arrays into an array of bit masks (the bit of the n-th label of a flag table is set, if the n-th array is True)
+def getBitMask(mask_list, label_list, flag_table):
+    bits = np.zeros(len(mask_list[0]), dtype=int)
+    for n in range(len(mask_list)):
+        bits |= np.where(mask_list[n], flag_table['bits'][label_list[n]], 0)
+    return(bits)
+
+
+
+#convert a value from the vectorized calculation into an attribute value (NULL for NaN, optionally rounded)
+def getAttributeValue(value, digits = None, vartype = 'float'):
+    if value != value:
+        return(NULL)
+    if digits != None:
+        value = round(value, digits)
+    if vartype == 'int':
+        value = int(value)
+    return(value)
+
+
+
+#get the calculated attribute values of all features in the same form as the scalar calculation writes them: yield (feature id, {attribute: value})
+def iterScoringAttributes(columns, scores):
+    values = {}
+    for attr in ['base_index', 'fac_width', 'fac_surface', 'fac_highway', 'fac_maxspeed', 'fac_1', 'fac_2', 'fac_3', 'fac_4', 'index', 'index_10']:
+        values[attr] = scores[attr].tolist()
+    #bit masks of the factors are combined with the bit masks of the other attributes
+    values['data_bonus'] = (np.array(columns['data_bonus'], dtype=int) | scores['bonus']).tolist()
+    values['data_malus'] = (np.array(columns['data_malus'], dtype=int) | scores['malus']).tolist()
+    for i in range(len(columns['fid'])):
+        attributes = {
+            'base_index': getAttributeValue(values['base_index'][i], None, 'int'),
+            'fac_width': getAttributeValue(values['fac_width'][i]),
+            'fac_surface': getAttributeValue(values['fac_surface'][i]),
+            'fac_highway': getAttributeValue(values['fac_highway'][i]),
+            'fac_maxspeed': getAttributeValue(values['fac_maxspeed'][i]),
+            'index': getAttributeValue(values['index'][i], None, 'int'),
+            'index_10': getAttributeValue(values['index_10'][i], None, 'int')
+        }
+        if values['base_index'][i] == values['base_index'][i]:
+            for attr in ['fac_1', 'fac_2', 'fac_3', 'fac_4']:
+                attributes[attr] = getAttributeValue(values[attr][i], 2)
+
+        attributes['data_bonus'] = values['data_bonus'][i]
+        attributes['data_malus'] = values['data_malus'][i]
+        yield(columns['fid'][i], attributes)
+
+
+
+
+#parameters that can be varied in a parameter sweep (they only affect the vectorized calculation, all other attributes are derived once)
+sweep_parameter_list = [
+    'base_index_dict',
+    'motor_vehicle_access_index_dict',
+    'surface_factor_dict',
+    'smoothness_factor_dict',
+    'highway_factor_dict',
+    'highway_factor_dict_weights',
+    'maxspeed_factor_dict'
+]
+
+
+
+#get the parameters of a sweep variant: dict parameters are updated entry by entry, parameters not given in the variant are taken from the base parameters
+def getVariantParameters(par, variant):
+    parameters = types.SimpleNamespace(**{attr: getattr(par, attr) for attr in sweep_parameter_list})
+    for key in variant:
+        if key == 'name':
+            continue
+        if key not in sweep_parameter_list:
+            raise ValueError('Parameter "' + str(key) + '" of sweep variant "' + str(variant.get('name')) + '" can\'t be varied in a parameter sweep')
+        value = variant[key]
+        if type(value) == dict:
+            value = dict(getattr(par, key))
+            value.update(variant[key])
+        if key == 'maxspeed_factor_dict':
+            #maxspeed factors are thresholds and have to be checked in ascending order
+            value = dict(sorted(value.items()))
+        setattr(parameters, key, value)
+    return(parameters)
+
+
+
+#calculate the index for all collected features for every parameter variant: returns {variant name: index array}
+def calculateSweepIndex(columns, par, categories, variant_list):
+    sweep_index = {}
+    for variant in variant_list:
+        sweep_index[variant['name']] = calculateIndexVectorized(columns, getVariantParameters(par, variant), categories)['index']
+    return(sweep_index)
+
+
+
+#get summary statistics of index attributes of a layer, the first attribute is the reference for the differences
+def getSweepStatistics(layer, attribute_list):
+    values = {}
+    for attr in attribute_list:
+        values[attr] = []
+    for feature in layer.getFeatures():
+        for attr in attribute_list:
+            value = feature.attribute(attr)
+            values[attr].append(value if isinstance(value, (int, float)) else math.nan)
+    reference = np.array(values[attribute_list[0]], dtype=float)
+    statistics = []
+    for attr in attribute_list:
+        index = np.array(values[attr], dtype=float)
+        valid = ~np.isnan(index)
+        both = valid & ~np.isnan(reference)
+        row = {'attribute': attr, 'count': int(valid.sum()), 'mean': math.nan, 'median': math.nan, 'std': math.nan, 'changed': int((index[both] != reference[both]).sum()), 'mean_difference': math.nan}
+        if valid.any():
+            row['mean'] = round(float(np.mean(index[valid])), 2)
+            row['median'] = float(np.median(index[valid]))
+            row['std'] = round(float(np.std(index[valid])), 2)
+        if both.any():
+            row['mean_difference'] = round(float(np.mean(index[both] - reference[both])), 2)
+        #distribution of the index in classes of 10
+        for index_10 in range(11):
+            row['index_10_' + str(index_10)] = int((index[valid] // 10 == index_10).sum())
+        statistics.append(row)
+    return(statistics)
+
+
+
+#save summary statistics as csv file
+def saveStatistics(path, statistics):
+    with open(path, 'w', encoding='utf-8', newline='') as file:
+        writer = csv.DictWriter(file, fieldnames=list(statistics[0].keys()))
+        writer.writeheader()
+        writer.writerows(statistics)
+
+
+
+
+#get the factor of a threshold dict that applies to a value (the last threshold not greater than the value) - returns the threshold or None
+def getThreshold(value, threshold_dict):
+    threshold = None
+    for key in threshold_dict.keys():
+        if value >= key:
+            threshold = key
+    return(threshold)
+
+
+
+#gradient of the index after clipping it to 0 .. 100: 0 if the index is out of range or at the boundary and would leave it with an increasing parameter value
+def getClippedGradient(raw_index, gradient):
+    if raw_index < 0 or raw_index > 100 or (raw_index == 100 and gradient > 0) or (raw_index == 0 and gradient < 0):
+        return(0)
+    return(round(gradient, 3))
+
+
+
+#explain the index of all features with a base index: yield (feature id, json string) with
+#  - "base": parameter dict, entry and value of the base index
+#  - "factors": factors 1 to 4
+#  - "points": index points gained or lost by every factor (shares of the difference between index and base index according to the logarithm of the factors, so they add up exactly)
+#  - "gradient": [parameter dict, entry, value, gradient] for every parameter entry used: change of the index per unit of an increasing parameter value, derived analytically from the factors (see getClippedGradient)
+def explainIndexVectorized(columns, scores, par, categories):
+    values = {}
+    for attr in ['base_index', 'fac_width', 'fac_surface', 'fac_highway', 'fac_maxspeed', 'fac_1', 'fac_2', 'fac_3', 'fac_4', 'index', 'weight', 'restricted_access']:
+        values[attr] = scores[attr].tolist()
+    for i in range(len(columns['fid'])):
+        base = values['base_index'][i]
+        if base != base:
+            continue
+        way_type = categories['way_type']['values'][columns['way_type'][i]]
+        factors = [values['fac_1'][i], values['fac_2'][i], values['fac_3'][i], values['fac_4'][i]]
+        index = values['index'][i]
+        raw_index = base * factors[0] * factors[1] * factors[2] * factors[3]
+
+        explanation = {'factors': {}, 'points': {}, 'gradient': []}
+        if values['restricted_access'][i]:
+            explanation['base'] = ['motor_vehicle_access_index_dict', columns['motor_vehicle_access'][i], base]
+        else:
+            explanation['base'] = ['base_index_dict', way_type, base]
+        explanation['gradient'].append(explanation['base'] + [getClippedGradient(raw_index, factors[0] * factors[1] * factors[2] * factors[3])])
+
+        logs = [math.log(max(factor, 0.000001)) for factor in factors]
+        for n in range(4):
+            if abs(sum(logs)) > 0.000001:
+                points = (index - base) * logs[n] / sum(logs)
+            else:
+                points = base * (factors[n] - 1)
+            explanation['factors']['fac_' + str(n + 1)] = round(factors[n], 3)
+            explanation['points']['fac_' + str(n + 1)] = round(points, 2)
+
+        #surface or smoothness factor as part of factor 1
+        fac_width = values['fac_width'][i]
+        fac_surface = values['fac_surface'][i]
+        if fac_surface == fac_surface and fac_surface:
+            others = base * factors[1] * factors[2] * factors[3]
+            derivative = 1
+            if fac_width == fac_width and fac_width:
+                #factor 1 is a weighted mean of width and surface factor, with weights depending on the factors
+                weight_width = max(1 - fac_width, 0) + 0.5
+                weight_surface = max(1 - fac_surface, 0) + 0.5
+                weight_derivative = -1 if fac_surface < 1 else 0
+                derivative = (weight_surface + weight_derivative * (fac_surface - factors[0])) / (weight_width + weight_surface)
+            smoothness = categories['proc_smoothness']['values'][columns['proc_smoothness'][i]]
+            surface = categories['proc_surface']['values'][columns['proc_surface'][i]]
+            if columns['proc_smoothness'][i] and smoothness in par.smoothness_factor_dict:
+                entry = ['smoothness_factor_dict', smoothness, par.smoothness_factor_dict[smoothness]]
+            else:
+                entry = ['surface_factor_dict', surface, par.surface_factor_dict[surface]]
+            explanation['gradient'].append(entry + [getClippedGradient(raw_index, others * derivative)])
+
+        #highway factor, maxspeed factor and their weight as part of factor 2 (factor 2 = 1 - weight + weight * highway factor * maxspeed factor)
+        weight = values['weight'][i]
+        fac_highway = values['fac_highway'][i]
+        fac_maxspeed = values['fac_maxspeed'][i]
+        others = base * factors[0] * factors[2] * factors[3]
+        highway = categories['proc_highway']['values'][columns['proc_highway'][i]]
+        if columns['proc_highway'][i] and highway in par.highway_factor_dict:
+            explanation['gradient'].append(['highway_factor_dict', highway, par.highway_factor_dict[highway], getClippedGradient(raw_index, others * weight * fac_maxspeed)])
+        proc_maxspeed = columns['proc_maxspeed'][i]
+        if proc_maxspeed == proc_maxspeed and proc_maxspeed:
+            threshold = getThreshold(proc_maxspeed, par.maxspeed_factor_dict)
+            if threshold != None:
+                explanation['gradient'].append(['maxspeed_factor_dict', threshold, par.maxspeed_factor_dict[threshold], getClippedGradient(raw_index, others * weight * fac_highway)])
+        if way_type in par.highway_factor_dict_weights and (way_type not in sidepath_way_type_list or columns['proc_sidepath'][i] == 'yes'):
+            explanation['gradient'].append(['highway_factor_dict_weights', way_type, par.highway_factor_dict_weights[way_type], getClippedGradient(raw_index, others * (fac_highway * fac_maxspeed - 1))])
+        yield(columns['fid'][i], json.dumps(explanation))
+
+
+
+#aggregate the index gradients of all features of a layer: for every parameter entry, the change of the mean index (of all features with an index) per unit and per 10 % of the parameter value
+def getSensitivityStatistics(layer):
+    gradients = {}
+    count = 0
+    for feature in layer.getFeatures():
+        explanation = feature.attribute('index_explanation')
+        if not isinstance(explanation, str) or not explanation:
+            continue
+        count += 1
+        for parameter, entry, value, gradient in json.loads(explanation)['gradient']:
+            key = (parameter, str(entry))
+            if key not in gradients:
+                gradients[key] = {'parameter': parameter, 'entry': entry, 'value': value, 'ways': 0, 'gradient': 0}
+            gradients[key]['ways'] += 1
+            gradients[key]['gradient'] += gradient
+    statistics = []
+    for row in gradients.values():
+        row['mean_index_per_unit'] = round(row['gradient'] / count, 4)
+        row['mean_index_per_10_percent'] = round(row['gradient'] / count * row['value'] * 0.1, 4)
+        del row['gradient']
+        statistics.append(row)
+    statistics.sort(key=lambda row: -abs(row['mean_index_per_10_percent']))
+    return(statistics)